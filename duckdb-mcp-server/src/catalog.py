@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import duckdb
+
+from src.db import duckdb_conn, get_pool
+from src.settings import get_settings
+
+
+def load_schema_markdown(path: str | None) -> Dict[str, Dict[str, Any]]:
+    """Parse a Spark-exported schema markdown file into {table: {description, columns}}."""
+    if not path:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            tables: Dict[str, Dict[str, Any]] = {}
+            current_table = None
+            in_schema = False
+            for raw_line in handle:
+                line = raw_line.rstrip("\n")
+                if line.startswith("## Table:"):
+                    current_table = line.split(":", 1)[1].strip()
+                    tables.setdefault(current_table, {"description": None, "columns": {}})
+                    in_schema = False
+                    continue
+                if line.startswith("**Table Description:**") and current_table:
+                    desc = line.split(":", 1)[1].strip()
+                    tables[current_table]["description"] = desc.replace("**", "").strip()
+                    continue
+                if line.startswith("### Schema"):
+                    in_schema = True
+                    continue
+                if line.startswith("### Sample Data"):
+                    in_schema = False
+                    continue
+                if not in_schema or not current_table:
+                    continue
+                if line.startswith("| Column Name |") or not line.strip(" |-:"):
+                    continue
+                if not line.startswith("|"):
+                    continue
+                parts = [part.strip() for part in line.strip().strip("|").split("|")]
+                if len(parts) < 4:
+                    continue
+                col_name, col_type, nullable, comment = parts[:4]
+                tables[current_table]["columns"][col_name] = {
+                    "type": col_type,
+                    "nullable": nullable,
+                    "comment": comment,
+                }
+            return tables
+    except OSError:
+        return {}
+
+
+@dataclass
+class TableInfo:
+    name: str
+    description: str | None = None
+    # DuckDB column name -> DuckDB type, in table order
+    column_types: Dict[str, str] = field(default_factory=dict)
+    # Column details as served by /databases/structure (markdown comments merged in)
+    schema_details: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.column_types)
+
+
+class Catalog:
+    """Immutable snapshot of table/column metadata for one open database generation."""
+
+    def __init__(self, generation: int | None, tables: Dict[str, TableInfo]) -> None:
+        self.generation = generation
+        self.tables = tables
+        self.table_names = sorted(tables)
+
+    def has_table(self, table: str) -> bool:
+        return table in self.tables
+
+    def table(self, table: str) -> TableInfo:
+        return self.tables[table]
+
+    def column_types(self, table: str) -> Dict[str, str]:
+        info = self.tables.get(table)
+        return info.column_types if info else {}
+
+
+_CATALOG_SQL = """
+SELECT c.table_name, c.column_name, c.data_type, c.is_nullable
+FROM duckdb_columns() c
+JOIN (
+  SELECT database_name, schema_name, table_name FROM duckdb_tables() WHERE NOT internal
+  UNION ALL
+  -- Parquet snapshots are served as views
+  SELECT database_name, schema_name, view_name FROM duckdb_views() WHERE NOT internal
+) t
+  ON t.database_name = c.database_name AND t.schema_name = c.schema_name AND t.table_name = c.table_name
+WHERE c.database_name = current_database() AND c.schema_name = 'main'
+ORDER BY c.table_name, c.column_index
+"""
+
+
+def build_catalog(con: duckdb.DuckDBPyConnection, generation: int | None) -> Catalog:
+    schema_md = load_schema_markdown(get_settings().schema_markdown_path)
+    tables: Dict[str, TableInfo] = {}
+    for table, name, data_type, is_nullable in con.execute(_CATALOG_SQL).fetchall():
+        info = tables.get(table)
+        if info is None:
+            md_table = schema_md.get(table, {})
+            info = tables[table] = TableInfo(name=table, description=md_table.get("description"))
+        info.column_types[name] = str(data_type)
+        md_col = schema_md.get(table, {}).get("columns", {}).get(name, {})
+        info.schema_details.append(
+            {
+                "name": name,
+                "type": md_col.get("type") or str(data_type),
+                "nullable": md_col.get("nullable") or ("Yes" if is_nullable else "No"),
+                "comment": md_col.get("comment", ""),
+            }
+        )
+    return Catalog(generation, tables)
+
+
+_CATALOG: Catalog | None = None
+# Built while a new snapshot is warmed, before requests are routed to it
+_PRIMED: Catalog | None = None
+_CATALOG_LOCK = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """Return the catalog for the currently open database, rebuilding it after a reconnect."""
+    global _CATALOG, _PRIMED
+    generation = get_pool().generation()
+    catalog = _CATALOG
+    if catalog is not None and (generation is None or catalog.generation == generation):
+        return catalog
+    with _CATALOG_LOCK:
+        if _CATALOG is None or _CATALOG.generation != generation:
+            if _PRIMED is not None and _PRIMED.generation == generation:
+                _CATALOG, _PRIMED = _PRIMED, None
+            else:
+                with duckdb_conn() as con:
+                    _CATALOG = build_catalog(con, generation)
+        return _CATALOG
+
+
+def prime_catalog(generation: int, con: duckdb.DuckDBPyConnection) -> None:
+    """DuckDBPool warmer: build the catalog of a snapshot that is about to go live."""
+    global _PRIMED
+    primed = build_catalog(con, generation)
+    with _CATALOG_LOCK:
+        _PRIMED = primed
+
+
+def clear_catalog() -> None:
+    global _CATALOG, _PRIMED
+    with _CATALOG_LOCK:
+        _CATALOG = None
+        _PRIMED = None
@@ -0,0 +1,169 @@
+"""Response compression negotiated from Accept-Encoding: zstd, then brotli, then gzip.
+
+Replaces Starlette's GZipMiddleware. Bodies below ``minimum_size`` go out as-is,
+streamed responses (NDJSON, Arrow) are compressed chunk by chunk and flushed so
+clients can decode them as they arrive, and large chunks are compressed on a
+worker thread instead of the event loop.
+"""
+
+from __future__ import annotations
+
+import sys
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+import anyio
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+if sys.version_info >= (3, 14):
+    from compression import zstd
+else:
+    from backports import zstd
+
+# Server preference when the client accepts several encodings equally
+ENCODINGS = ("zstd", "br", "gzip")
+# Chunks at least this large are compressed off the event loop
+OFFLOAD_BYTES = 256 * 1024
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the encoding to use for an Accept-Encoding header, or None for identity."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = [(weights.get(coding, wildcard), -rank, coding) for rank, coding in enumerate(ENCODINGS)]
+    q, _, coding = max(candidates)
+    return coding if q > 0 else None
+
+
+class _Compressor:
+    """Incremental compressor: ``chunk(data)`` returns flushed output, ``finish(data)`` ends the stream."""
+
+    def __init__(self, encoding: str, zstd_level: int, brotli_quality: int, gzip_level: int) -> None:
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._zstd = zstd.ZstdCompressor(level=zstd_level)
+        elif encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "zstd":
+            return self._zstd.compress(data, zstd.ZstdCompressor.FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "zstd":
+            return self._zstd.compress(data, zstd.ZstdCompressor.FLUSH_FRAME)
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_FINISH)
+
+
+async def _run(fn: Callable[[bytes], bytes], data: bytes) -> bytes:
+    if len(data) >= OFFLOAD_BYTES:
+        return await anyio.to_thread.run_sync(fn, data)
+    return fn(data)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        zstd_level: int = 3,
+        brotli_quality: int = 4,
+        gzip_level: int = 6,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = (zstd_level, brotli_quality, gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressedResponder(send, encoding, self.minimum_size, self.levels)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressedResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int, levels: Tuple[int, int, int]) -> None:
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.levels = levels
+        self._start: Message | None = None
+        # Body held back until it reaches minimum_size or the response ends
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+        self._compressor: _Compressor | None = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            # Already encoded (or explicitly not to be): leave it alone
+            self._passthrough = "content-encoding" in Headers(raw=message["headers"])
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._compressor is None:
+            self._pending.append(body)
+            self._pending_size += len(body)
+            if more_body and self._pending_size < self.minimum_size:
+                return
+            body = b"".join(self._pending)
+            self._pending, self._pending_size = [], 0
+            if not more_body and len(body) < self.minimum_size:
+                # Small response: not worth the CPU or the header bytes
+                await self._flush_start()
+                await self._send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            self._compressor = _Compressor(self.encoding, *self.levels)
+            headers = MutableHeaders(raw=self._start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                data = await _run(self._compressor.finish, body)
+                headers["Content-Length"] = str(len(data))
+                await self._flush_start()
+                await self._send({"type": "http.response.body", "body": data, "more_body": False})
+                return
+        data = await _run(self._compressor.chunk if more_body else self._compressor.finish, body)
+        await self._flush_start()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _flush_start(self) -> None:
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self._send(start)
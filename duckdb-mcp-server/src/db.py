@@ -1,18 +1,497 @@
 from __future__ import annotations
 
-import duckdb
+import logging
+import os
+import threading
+import time
 from contextlib import contextmanager
-from typing import Iterator
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import duckdb
 
+from src.executor import current_job
+from src.parquet_store import manifest_path, open_parquet_database, read_manifest
+from src.service.errors import service_unavailable
 from src.settings import get_settings
 
+logger = logging.getLogger(__name__)
+
+# (device, inode, size, mtime_ns): changes whenever the file is replaced or rewritten
+FileFingerprint = Tuple[int, int, int, int]
+
+
+def file_fingerprint(path: str) -> FileFingerprint:
+    st = os.stat(path)
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+@dataclass(eq=False)
+class _Generation:
+    number: int
+    path: str
+    database: duckdb.DuckDBPyConnection
+    fingerprint: FileFingerprint
+    # Parquet mode: the manifest's table entries the views were created from
+    tables: Dict[str, Any] | None = None
+    borrowed: int = 0
+    # (cursor, monotonic time it was returned)
+    idle: List[Tuple[duckdb.DuckDBPyConnection, float]] = field(default_factory=list)
+
+    def close(self) -> None:
+        for cursor, _ in self.idle:
+            _close_quietly(cursor)
+        self.idle.clear()
+        _close_quietly(self.database)
+
+
+def _close_quietly(con: duckdb.DuckDBPyConnection) -> None:
+    try:
+        con.close()
+    except duckdb.Error:
+        pass
+
+
+class DuckDBPool:
+    """Cursors over one shared read-only DuckDB handle.
+
+    Every cursor is a DuckDB connection to the same database instance, so the
+    catalog and buffer cache are loaded once per process.  The file is
+    re-stat'ed at most every ``file_check_interval`` seconds.  When it now
+    resolves to a different file (a symlink flipped to a new snapshot, or
+    ``switch()`` called with a new path), the new snapshot is opened and
+    warmed beside the current one, on a background thread when the file
+    check noticed it, while requests keep using the current handle.  New
+    requests then move to it, and the old handle is closed once the cursors
+    borrowed from it have been returned.
+    A file replaced in place cannot be opened beside its predecessor (DuckDB
+    caches instances by path), so that handle is retired first and new
+    requests wait for it to drain.
+
+    With ``parquet_dir`` set, each handle is an in-memory database with views
+    over the Parquet snapshot, and the snapshot's manifest is the watched file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: int = 8,
+        acquire_timeout: float = 30.0,
+        probe_idle_seconds: float = 60.0,
+        file_check_interval: float = 2.0,
+        parquet_dir: str | None = None,
+        config: Dict[str, Any] | None = None,
+    ) -> None:
+        self.parquet_dir = parquet_dir
+        # DuckDB settings for every handle (threads, memory_limit)
+        self.config = dict(config or {})
+        self.path = str(manifest_path(parquet_dir)) if parquet_dir else path
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.probe_idle_seconds = probe_idle_seconds
+        self.file_check_interval = file_check_interval
+        # Called with (generation number, cursor) on every new handle before it serves requests
+        self.warmer: Callable[[int, duckdb.DuckDBPyConnection], None] | None = None
+        self.reconnects = 0
+        self.last_switch_ms: float | None = None
+        self._cond = threading.Condition()
+        self._switch_lock = threading.Lock()
+        self._switching = False
+        self._closed = False
+        self._current: _Generation | None = None
+        self._retiring: List[_Generation] = []
+        self._in_use = 0
+        self._next_number = 1
+        self._last_check = 0.0
+
+    def _instance_path(self) -> str:
+        # DuckDB keys its instance cache on the path it is given
+        return self.path if self.parquet_dir else os.path.realpath(self.path)
+
+    def _connect(self) -> Tuple[duckdb.DuckDBPyConnection, Dict[str, Any] | None]:
+        """A new handle, plus in Parquet mode the manifest tables it serves."""
+        if self.parquet_dir is not None:
+            manifest = read_manifest(self.parquet_dir)
+            return open_parquet_database(self.parquet_dir, self.config, manifest), manifest["tables"]
+        return duckdb.connect(database=self._instance_path(), read_only=True, config=self.config), None
+
+    def _warm(self, gen: _Generation) -> None:
+        cursor = gen.database.cursor()
+        try:
+            cursor.execute("SELECT 1").fetchone()
+            if self.warmer is not None:
+                self.warmer(gen.number, cursor)
+        finally:
+            _close_quietly(cursor)
+
+    # ---- handle lifecycle (call with self._cond held) ----
+    def _new_generation_locked(
+        self,
+        database: duckdb.DuckDBPyConnection,
+        fingerprint: FileFingerprint,
+        tables: Dict[str, Any] | None = None,
+    ) -> _Generation:
+        gen = _Generation(self._next_number, self._instance_path(), database, fingerprint, tables)
+        self._next_number += 1
+        return gen
+
+    def _publish_locked(self, gen: _Generation) -> None:
+        old = self._current
+        self._current = gen
+        if old is not None:
+            self._retire_locked(old)
+        if gen.number > 1:
+            self.reconnects += 1
+            logger.info("Opened DuckDB %s (generation %d)", gen.path, gen.number)
+        self._last_check = time.monotonic()
+        self._cond.notify_all()
+
+    def _open_locked(self) -> None:
+        if self.parquet_dir is None and any(g.path == self._instance_path() for g in self._retiring):
+            # Same-path reopen would hand back the cached (stale) instance.
+            return
+        fingerprint = file_fingerprint(self.path)
+        database, tables = self._connect()
+        self._publish_locked(self._new_generation_locked(database, fingerprint, tables))
+
+    def _retire_locked(self, gen: _Generation) -> None:
+        if gen is self._current:
+            self._current = None
+        for cursor, _ in gen.idle:
+            _close_quietly(cursor)
+        gen.idle.clear()
+        if gen.borrowed == 0:
+            gen.close()
+            if gen in self._retiring:
+                self._retiring.remove(gen)
+        elif gen not in self._retiring:
+            self._retiring.append(gen)
+
+    def _opens_beside_locked(self) -> bool:
+        """Whether the snapshot at self.path can be opened while the current handles stay open."""
+        if self.parquet_dir is not None:
+            return True
+        target = self._instance_path()
+        live = ([self._current] if self._current else []) + self._retiring
+        return all(g.path != target for g in live)
+
+    def _refresh_locked(self, allow_switch: bool = False) -> bool:
+        """Reopen if the watched file changed; True means the caller must run ``_switch()``."""
+        gen = self._current
+        if gen is not None:
+            now = time.monotonic()
+            if self._switching or now - self._last_check < self.file_check_interval:
+                return False
+            self._last_check = now
+            try:
+                changed = file_fingerprint(self.path) != gen.fingerprint
+            except OSError:
+                # Mid-replace or briefly missing: keep serving from the open handle.
+                return False
+            if not changed:
+                return False
+            if self._opens_beside_locked():
+                if not allow_switch:
+                    return False
+                self._switching = True
+                return True
+            logger.info("DuckDB file %s changed on disk; reconnecting", gen.path)
+            self._retire_locked(gen)
+        self._open_locked()
+        return False
+
+    def _refresh(self) -> None:
+        with self._cond:
+            stale = self._refresh_locked(allow_switch=True)
+        if stale:
+            logger.info("DuckDB snapshot %s changed on disk; switching in the background", self.path)
+            # The request that noticed the change goes on with the current handle
+            threading.Thread(target=self._switch_in_background, name="duckdb-snapshot-switch", daemon=True).start()
+
+    def _switch_in_background(self) -> None:
+        try:
+            self._switch()
+        except Exception as e:
+            # Keep serving the current snapshot; the next check retries.
+            logger.warning("Could not open new DuckDB snapshot %s: %s", self.path, e)
+
+    # ---- snapshot switching ----
+    def switch(self, path: str | None = None) -> Dict[str, Any]:
+        """Open ``path`` (default: the configured path again), warm it and route new requests to it.
+
+        In parquet mode ``path`` is a snapshot directory.  Requests already
+        running finish on the previous handle, which is closed afterwards.
+        """
+        with self._cond:
+            # Stops the file check from starting its own switch meanwhile
+            self._switching = True
+        return self._switch(path)
+
+    def _switch(self, path: str | None = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        with self._switch_lock:
+            previous = (self.path, self.parquet_dir)
+            try:
+                with self._cond:
+                    if path is not None:
+                        if self.parquet_dir is not None:
+                            self.parquet_dir = path
+                            self.path = str(manifest_path(path))
+                        else:
+                            self.path = path
+                    beside = self._opens_beside_locked()
+                    fingerprint = file_fingerprint(self.path)
+                if beside:
+                    # Open and warm outside the lock; requests keep using the current handle
+                    database, tables = self._connect()
+                    with self._cond:
+                        gen = self._new_generation_locked(database, fingerprint, tables)
+                    try:
+                        self._warm(gen)
+                    except BaseException:
+                        gen.close()
+                        raise
+                    with self._cond:
+                        if self._closed:
+                            gen.close()
+                        else:
+                            self._publish_locked(gen)
+                else:
+                    with self._cond:
+                        if self._current is not None:
+                            self._retire_locked(self._current)
+                        deadline = time.monotonic() + self.acquire_timeout
+                        while self._current is None:
+                            self._open_locked()
+                            remaining = deadline - time.monotonic()
+                            if self._current is None:
+                                if remaining <= 0:
+                                    raise PoolTimeout(
+                                        f"DuckDB handle for {self.path} did not drain within {self.acquire_timeout:g}s"
+                                    )
+                                self._cond.wait(remaining)
+                        gen = self._current
+                    self._warm(gen)
+            except BaseException:
+                with self._cond:
+                    if self._current is not None and self._current.path != self._instance_path():
+                        # The new snapshot never went live; keep watching the one that serves
+                        self.path, self.parquet_dir = previous
+                raise
+            finally:
+                with self._cond:
+                    self._switching = False
+                    self._last_check = time.monotonic()
+            self.last_switch_ms = round((time.monotonic() - started) * 1000, 2)
+        return self.stats()
+
+    # ---- borrowing ----
+    def acquire(self) -> Tuple[_Generation, duckdb.DuckDBPyConnection]:
+        deadline = time.monotonic() + self.acquire_timeout
+        self._refresh()
+        with self._cond:
+            while True:
+                self._refresh_locked()
+                gen = self._current
+                if gen is not None and self._in_use < self.size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No DuckDB connection available after {self.acquire_timeout:g}s "
+                        f"({self._in_use}/{self.size} in use)"
+                    )
+                self._cond.wait(remaining)
+            self._in_use += 1
+            gen.borrowed += 1
+            cursor, returned_at = gen.idle.pop() if gen.idle else (None, 0.0)
+        try:
+            if cursor is None:
+                cursor = gen.database.cursor()
+            elif time.monotonic() - returned_at > self.probe_idle_seconds:
+                cursor = self._probe(gen, cursor)
+        except Exception:
+            self.release(gen, None)
+            raise
+        return gen, cursor
+
+    def _probe(self, gen: _Generation, cursor: duckdb.DuckDBPyConnection) -> duckdb.DuckDBPyConnection:
+        try:
+            cursor.execute("SELECT 1").fetchone()
+            return cursor
+        except duckdb.Error:
+            _close_quietly(cursor)
+            return gen.database.cursor()
+
+    def release(
+        self,
+        gen: _Generation,
+        cursor: duckdb.DuckDBPyConnection | None,
+        broken: bool = False,
+    ) -> None:
+        with self._cond:
+            self._in_use -= 1
+            gen.borrowed -= 1
+            if cursor is not None and gen is self._current and not broken:
+                gen.idle.append((cursor, time.monotonic()))
+                cursor = None
+            if gen is not self._current and gen.borrowed == 0:
+                self._retire_locked(gen)
+            self._cond.notify_all()
+        if cursor is not None:
+            _close_quietly(cursor)
+
+    @contextmanager
+    def connection(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        gen, cursor = self.acquire()
+        broken = False
+        try:
+            yield cursor
+        except duckdb.ConnectionException:
+            broken = True
+            raise
+        finally:
+            self.release(gen, cursor, broken=broken)
+
+    # ---- maintenance ----
+    def generation(self) -> int | None:
+        """Number of the handle new requests will use (None while a reopen is pending)."""
+        self._refresh()
+        with self._cond:
+            return self._current.number if self._current else None
+
+    def fingerprint(self) -> FileFingerprint | None:
+        """Fingerprint of the file behind the handle new requests will use."""
+        self._refresh()
+        with self._cond:
+            return self._current.fingerprint if self._current else None
+
+    def warm(self) -> None:
+        with self.connection() as con:
+            con.execute("SELECT 1").fetchone()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            gen = self._current
+            return {
+                "path": self.path,
+                "open_path": gen.path if gen else None,
+                "mode": "parquet" if self.parquet_dir else "duckdb",
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(gen.idle) if gen else 0,
+                "generation": gen.number if gen else None,
+                "retiring": len(self._retiring),
+                "switching": self._switching,
+                "reconnects": self.reconnects,
+                "last_switch_ms": self.last_switch_ms,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            if self._current is not None:
+                self._retire_locked(self._current)
+            self._cond.notify_all()
+
+
+def _physical_memory() -> int | None:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def duckdb_config(settings: Any) -> Dict[str, Any]:
+    """DuckDB threads and memory_limit for one server process.
+
+    With several workers the file's pages are cached once by the OS and shared by
+    all of them, so each worker's own buffer pool only needs room for query
+    intermediates: unless set explicitly, workers split the CPUs and half the RAM.
+    """
+    config: Dict[str, Any] = {}
+    workers = max(1, settings.workers)
+    if settings.duckdb_threads is not None:
+        config["threads"] = settings.duckdb_threads
+    elif workers > 1:
+        config["threads"] = max(1, (os.cpu_count() or 1) // workers)
+    if settings.duckdb_memory_limit is not None:
+        config["memory_limit"] = settings.duckdb_memory_limit
+    elif workers > 1:
+        memory = _physical_memory()
+        if memory:
+            config["memory_limit"] = f"{max(64, memory // 2 // workers // (1024 * 1024))}MiB"
+    return config
+
+
+_POOL: DuckDBPool | None = None
+_POOL_LOCK = threading.Lock()
+# Background threads (stats precompute, search index prebuild) take turns on the one
+# cursor duckdb_pool_size reserves for them, so they never hold a lane's cursor
+_BACKGROUND_LOCK = threading.Lock()
+
+
+def get_pool() -> DuckDBPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            settings = get_settings()
+            _POOL = DuckDBPool(
+                settings.duckdb_path,
+                size=settings.duckdb_pool_size,
+                acquire_timeout=settings.duckdb_pool_acquire_timeout_seconds,
+                probe_idle_seconds=settings.duckdb_pool_probe_idle_seconds,
+                file_check_interval=settings.duckdb_file_check_interval_seconds,
+                parquet_dir=settings.duckdb_parquet_dir,
+                config=duckdb_config(settings),
+            )
+        return _POOL
+
+
+def close_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
+
 
 @contextmanager
-def duckdb_conn() -> Iterator[duckdb.DuckDBPyConnection]:
-    settings = get_settings()
-    # DuckDB connects directly to the file
-    con = duckdb.connect(database=settings.duckdb_path, read_only=True)
+def duckdb_snapshot_conn() -> Iterator[Tuple[_Generation, duckdb.DuckDBPyConnection]]:
+    """Pooled cursor plus the snapshot (generation) it reads."""
+    pool = get_pool()
     try:
-        yield con
+        gen, con = pool.acquire()
+    except PoolTimeout as e:
+        raise service_unavailable(str(e))
+    # On an executor worker, register the cursor so a timed-out request can interrupt it
+    job = current_job()
+    broken = False
+    try:
+        if job is not None:
+            job.attach(con)
+        yield gen, con
+    except duckdb.ConnectionException:
+        broken = True
+        raise
     finally:
-        con.close()
+        if job is not None:
+            job.detach(con)
+        pool.release(gen, con, broken=broken)
+
+
+@contextmanager
+def background_cursor() -> Iterator[None]:
+    """Hold the pool's reserved background cursor turn; wrap pool use outside the lanes."""
+    with _BACKGROUND_LOCK:
+        yield
+
+
+@contextmanager
+def duckdb_conn() -> Iterator[duckdb.DuckDBPyConnection]:
+    with duckdb_snapshot_conn() as (_, con):
+        yield con
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Literal, TypeVar
+
+import duckdb
+
+from src.metrics import current_request
+from src.service.errors import gateway_timeout, service_unavailable
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+LaneName = Literal["query", "metadata"]
+T = TypeVar("T")
+
+
+class ExecutionCancelled(RuntimeError):
+    pass
+
+
+class Job:
+    """One request's DuckDB work; tracks the cursors it has borrowed so it can be interrupted."""
+
+    def __init__(self, lane: "Lane | None" = None) -> None:
+        self.lane = lane
+        # time.monotonic() by which the request must finish (the lane's timeout)
+        self.deadline: float | None = None
+        self.cancelled = False
+        # Set when a streamed response takes over the job's lane slot
+        self.slot_kept = False
+        self._cursors: List[duckdb.DuckDBPyConnection] = []
+        self._on_abandon: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def attach(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise ExecutionCancelled("Request was cancelled before its query started")
+            self._cursors.append(cursor)
+
+    def detach(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            if cursor in self._cursors:
+                self._cursors.remove(cursor)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            try:
+                cursor.interrupt()
+            except duckdb.Error:
+                pass
+
+    def on_abandon(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` if the request gives up on the job's result (timeout or disconnect)."""
+        with self._lock:
+            self._on_abandon.append(callback)
+
+    def abandon(self) -> None:
+        with self._lock:
+            callbacks, self._on_abandon = self._on_abandon, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Cleanup of an abandoned DuckDB job failed")
+
+
+_LOCAL = threading.local()
+
+
+def current_job() -> Job | None:
+    """The job running on this worker thread (None outside the executor)."""
+    return getattr(_LOCAL, "job", None)
+
+
+class Lane:
+    """A fixed set of worker threads with a bounded wait queue.
+
+    Each job holds one of ``workers`` slots while it runs. A streamed response
+    keeps its job's slot (and pooled cursor) until its body has been sent, so
+    streams count against the lane; at most ``max_streams`` do so at once.
+    """
+
+    def __init__(
+        self, name: str, workers: int, max_queue: int, timeout: float, max_streams: int | None = None
+    ) -> None:
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_streams = workers if max_streams is None else min(max_streams, workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"duckdb-{name}")
+        self._slots = threading.Semaphore(workers)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.streaming = 0
+        self.rejected_streams = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._max_run_seconds = 0.0
+
+    def _acquire_slot(self, job: Job) -> bool:
+        # Slots held by streams can outlast their worker, so a free worker may still wait here
+        while not self._slots.acquire(timeout=0.05):
+            if job.cancelled:
+                return False
+        return True
+
+    def keep_slot(self, job: Job) -> Callable[[], None]:
+        """Keep ``job``'s slot after its handler returns; the returned function releases it (once)."""
+        with self._lock:
+            if self.streaming >= self.max_streams:
+                self.rejected_streams += 1
+                raise service_unavailable(
+                    f"Too many streamed {self.name} responses in progress ({self.streaming}); retry later"
+                )
+            self.streaming += 1
+            job.slot_kept = True
+        released = threading.Event()
+
+        def release() -> None:
+            with self._lock:
+                if released.is_set():
+                    return
+                released.set()
+                self.streaming -= 1
+            self._slots.release()
+
+        return release
+
+    def _work(self, job: Job, enqueued_at: float, fn: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        has_slot = self._acquire_slot(job)
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            waited = started - enqueued_at
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        request = current_request()
+        if request is not None:
+            request.add_phase("queue", waited)
+        ok = False
+        _LOCAL.job = job
+        try:
+            if job.cancelled or not has_slot:
+                raise ExecutionCancelled("Request was cancelled while queued")
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            _LOCAL.job = None
+            if has_slot and not job.slot_kept:
+                self._slots.release()
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.running -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._run_seconds += elapsed
+                self._max_run_seconds = max(self._max_run_seconds, elapsed)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise service_unavailable(
+                    f"DuckDB {self.name} queue is full ({self.queued} waiting, {self.running} running); retry later"
+                )
+            self.queued += 1
+        job = Job(self)
+        enqueued_at = time.monotonic()
+        job.deadline = enqueued_at + self.timeout
+        loop = asyncio.get_running_loop()
+        # Carry the request's context (metrics) onto the worker thread
+        context = contextvars.copy_context()
+        try:
+            future = loop.run_in_executor(
+                self._pool, context.run, self._work, job, enqueued_at, fn, args, kwargs
+            )
+        except RuntimeError:
+            with self._lock:
+                self.queued -= 1
+            raise service_unavailable("DuckDB executor is shut down")
+        try:
+            # shield: a timed-out job keeps its worker until DuckDB honours the interrupt
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            job.cancel()
+            # A result the handler still returns (e.g. a stream holding a cursor) is never sent
+            future.add_done_callback(lambda _: job.abandon())
+            with self._lock:
+                self.timeouts += 1
+            logger.warning("DuckDB %s request %s timed out after %gs", self.name, fn.__name__, self.timeout)
+            raise gateway_timeout(f"Query exceeded the {self.timeout:g}s time limit and was interrupted")
+        except asyncio.CancelledError:
+            job.cancel()
+            future.add_done_callback(lambda _: job.abandon())
+            with self._lock:
+                self.cancelled += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "streaming": self.streaming,
+                "max_streams": self.max_streams,
+                "rejected_streams": self.rejected_streams,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "cancelled": self.cancelled,
+                "avg_wait_ms": round(self._wait_seconds / finished * 1000, 2) if finished else None,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 2),
+                "avg_run_ms": round(self._run_seconds / finished * 1000, 2) if finished else None,
+                "max_run_ms": round(self._max_run_seconds * 1000, 2),
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class DuckDBExecutor:
+    """Dedicated worker lanes for DuckDB work.
+
+    Metadata endpoints (table lists, schemas, /health) get their own small
+    lane so they keep answering while the query lane is saturated by heavy
+    /tables/query or /tables/select calls.
+    """
+
+    def __init__(self, lanes: Dict[str, Lane]) -> None:
+        self.lanes = lanes
+
+    def lane(self, name: LaneName) -> Lane:
+        return self.lanes[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def shutdown(self) -> None:
+        for lane in self.lanes.values():
+            lane.shutdown()
+
+
+_EXECUTOR: DuckDBExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor() -> DuckDBExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            s = get_settings()
+            _EXECUTOR = DuckDBExecutor(
+                {
+                    "query": Lane("query", s.duckdb_query_workers, s.duckdb_query_queue_limit,
+                                  s.duckdb_query_timeout_seconds, s.duckdb_query_max_streams),
+                    "metadata": Lane("metadata", s.duckdb_metadata_workers, s.duckdb_metadata_queue_limit,
+                                     s.duckdb_metadata_timeout_seconds),
+                }
+            )
+        return _EXECUTOR
+
+
+def close_executor() -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def keep_lane_slot() -> Callable[[], None]:
+    """Keep the current job's lane slot past its handler (see ``Lane.keep_slot``); a no-op off the executor."""
+    job = current_job()
+    if job is None or job.lane is None:
+        return lambda: None
+    return job.lane.keep_slot(job)
+
+
+def offload(lane: LaneName) -> Callable[[Callable[..., T]], Callable[..., Any]]:
+    """Run a synchronous route handler on an executor lane instead of Starlette's threadpool."""
+
+    def decorator(fn: Callable[..., T]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def handler(*args: Any, **kwargs: Any) -> T:
+            result = await get_executor().lane(lane).run(fn, *args, **kwargs)
+            request = current_request()
+            if request is not None:
+                request.handler_done = time.perf_counter()
+            return result
+
+        return handler
+
+    return decorator
@@ -1,13 +1,68 @@
+import logging
 import os
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
-from fastapi.middleware.gzip import GZipMiddleware
 
-from src.routes import delta, health
+from src.catalog import clear_catalog, get_catalog, prime_catalog
+from src.compression import CompressionMiddleware
+from src.db import close_pool, get_pool
+from src.executor import close_executor
+from src.metrics import MetricsMiddleware, clear_metrics
+from src.prepared import clear_prepared_statements
+from src.provenance import clear_provenance_graph, prime_provenance_graph
+from src.result_cache import clear_result_cache
+from src.search_index import clear_search_index, prime_search_index, start_search_index_build
+from src.table_stats import clear_table_stats, start_stats_precompute
+from src.routes import admin, delta, health
 from src.service.models import ErrorResponse
 from src.settings import get_settings
 
 
+logger = logging.getLogger(__name__)
+
+
+def warm_snapshot(generation, con) -> None:
+    """DuckDBPool warmer: catalog, search index and provenance links of a snapshot about to go live.
+
+    The search index is only built ahead with SEARCH_INDEX_PREBUILD. Table statistics are
+    not warmed here; the precompute thread fills them once the snapshot is live.
+    """
+    prime_catalog(generation, con)
+    if get_settings().search_index_prebuild:
+        prime_search_index(generation, con)
+    prime_provenance_graph(generation, con)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Open the shared DuckDB handle and load the catalog up front so the first
+    # request is not a cold start.
+    pool = get_pool()
+    # New snapshots get their catalog and search index built before requests are routed to them
+    pool.warmer = warm_snapshot
+    try:
+        pool.warm()
+        get_catalog()
+    except Exception as e:
+        logger.warning("DuckDB warm-up failed: %s", e)
+    if get_settings().table_stats_precompute:
+        start_stats_precompute()
+    if get_settings().search_index_prebuild:
+        start_search_index_build()
+    yield
+    clear_search_index()
+    clear_provenance_graph()
+    clear_table_stats()
+    clear_catalog()
+    clear_result_cache()
+    close_executor()
+    close_pool()
+    clear_prepared_statements()
+    clear_metrics()
+
+
 def create_application() -> FastAPI:
     settings = get_settings()
 
@@ -19,22 +74,49 @@ def create_application() -> FastAPI:
             "4XX": {"model": ErrorResponse},
             "5XX": {"model": ErrorResponse},
         },
+        # Lifespan events only run on the outermost app
+        lifespan=None if settings.service_root_path else lifespan,
     )
 
-    app.add_middleware(GZipMiddleware)
+    if settings.metrics_enabled:
+        # Inside compression: response sizes are measured before encoding
+        app.add_middleware(MetricsMiddleware)
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        zstd_level=settings.compression_zstd_level,
+        brotli_quality=settings.compression_brotli_quality,
+        gzip_level=settings.compression_gzip_level,
+    )
     app.include_router(health.router)
     app.include_router(delta.router)
+    app.include_router(admin.router)
 
     # Mount at /apis/mcp like the BERDL server does
     if settings.service_root_path:
-        root_app = FastAPI()
+        root_app = FastAPI(lifespan=lifespan)
         root_app.mount(settings.service_root_path, app)
         return root_app
 
     return app
 
 
-if __name__ == "__main__":
-    app_instance = create_application()
+def run() -> None:
+    """Serve on HOST:PORT with WORKERS processes.
 
-    uvicorn.run(app_instance, host="10.2.2.14", port=80)
+    Each worker builds its own application (pool, catalog, caches) from the
+    environment, and opens the DuckDB file read-only with its share of the
+    threads and memory (see ``src.db.duckdb_config``).
+    """
+    settings = get_settings()
+    uvicorn.run(
+        "src.main:create_application",
+        factory=True,
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+    )
+
+
+if __name__ == "__main__":
+    run()
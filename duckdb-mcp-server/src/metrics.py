@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("duckdb_mcp.slow_query")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Coarser buckets for the per-table series: there are ~1000 CORAL tables
+TABLE_LATENCY_BUCKETS = (0.01, 0.1, 1.0, 10.0, 60.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (1024, 16384, 131072, 1048576, 8388608, 67108864, 536870912)
+
+SLOW_QUERY_HISTORY = 200
+MAX_LOGGED_TEXT = 4000
+
+
+@dataclass
+class RequestMetrics:
+    """What one HTTP request spent its time on; filled in by the handler, recorded by the middleware."""
+
+    method: str
+    started: float = field(default_factory=time.perf_counter)
+    table: str | None = None
+    rows: int | None = None
+    # phase -> seconds ("queue", "duckdb", "serialize", "respond")
+    phases: Dict[str, float] = field(default_factory=dict)
+    # Last statement run for the request, for the slow-query log and EXPLAIN ANALYZE
+    sql: str | None = None
+    params: List[Any] | None = None
+    handler_done: float | None = None
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+_CURRENT: ContextVar[RequestMetrics | None] = ContextVar("duckdb_mcp_request_metrics", default=None)
+
+
+def current_request() -> RequestMetrics | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def timed(phase: str, sql: str | None = None, params: Sequence[Any] | None = None) -> Iterator[None]:
+    """Add the block's wall time to ``phase`` of the current request (no-op outside a request)."""
+    request = _CURRENT.get()
+    if request is None:
+        yield
+        return
+    if sql is not None:
+        request.sql = sql
+        request.params = list(params or [])
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        request.add_phase(phase, time.perf_counter() - started)
+
+
+def record_table(table: str) -> None:
+    request = _CURRENT.get()
+    if request is not None:
+        request.table = table
+
+
+def record_rows(rows: int) -> None:
+    request = _CURRENT.get()
+    if request is not None:
+        request.rows = (request.rows or 0) + rows
+
+
+# ---- Prometheus text exposition ----
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> ([count per bucket], sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, values: Sequence[str], amount: float) -> None:
+        key = tuple(values)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * len(self.buckets), [0.0, 0.0])
+        counts, totals = series
+        for i, bound in enumerate(self.buckets):
+            if amount <= bound:
+                counts[i] += 1
+        totals[0] += amount
+        totals[1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key in sorted(self._series):
+            counts, (total, count) = self._series[key]
+            for bound, n in zip(self.buckets, counts):
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {n}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, inf)} {int(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {int(count)}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, values: Sequence[str], amount: float = 1.0) -> None:
+        key = tuple(values)
+        self._series[key] = self._series.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key in sorted(self._series):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(self._series[key])}")
+        return lines
+
+
+def render_gauges(name: str, help_text: str, labels: Sequence[str], series: Dict[Tuple[str, ...], float]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for key in sorted(series):
+        value = series[key]
+        if value is not None:
+            lines.append(f"{name}{_format_labels(labels, key)} {_format_value(value)}")
+    return lines
+
+
+class Metrics:
+    """Request metrics for /metrics plus the slow-query log."""
+
+    def __init__(self, slow_query_seconds: float, explain_analyze: bool) -> None:
+        self.slow_query_seconds = slow_query_seconds
+        self.explain_analyze = explain_analyze
+        self._lock = threading.Lock()
+        self.request_seconds = Histogram(
+            "duckdb_mcp_request_duration_seconds", "Time from request start to last response byte.",
+            ("route", "method", "status"), LATENCY_BUCKETS,
+        )
+        self.phase_seconds = Histogram(
+            "duckdb_mcp_request_phase_seconds",
+            "Time per phase: queue (executor wait), duckdb (execute and fetch), serialize, "
+            "respond (handler return to last byte).",
+            ("route", "phase"), LATENCY_BUCKETS,
+        )
+        self.table_seconds = Histogram(
+            "duckdb_mcp_table_request_duration_seconds", "Request time per table.",
+            ("route", "table"), TABLE_LATENCY_BUCKETS,
+        )
+        self.rows = Histogram("duckdb_mcp_rows_returned", "Rows returned per request.", ("route",), ROW_BUCKETS)
+        self.table_rows = Counter("duckdb_mcp_table_rows_returned_total", "Rows returned per table.", ("route", "table"))
+        self.response_bytes = Histogram(
+            "duckdb_mcp_response_bytes", "Serialized response size before compression.", ("route",), BYTE_BUCKETS,
+        )
+        self.slow_queries = Counter("duckdb_mcp_slow_requests_total", "Requests over the slow-query threshold.", ("route",))
+        self.slow_log: deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="duckdb-explain")
+        self._explain_pending = False
+
+    def observe_request(
+        self,
+        request: RequestMetrics,
+        route: str,
+        status: int,
+        nbytes: int,
+        body: bytes,
+    ) -> None:
+        finished = time.perf_counter()
+        elapsed = finished - request.started
+        if request.handler_done is not None:
+            request.add_phase("respond", finished - request.handler_done)
+        with self._lock:
+            self.request_seconds.observe((route, request.method, str(status)), elapsed)
+            for phase, seconds in request.phases.items():
+                self.phase_seconds.observe((route, phase), seconds)
+            self.response_bytes.observe((route,), nbytes)
+            if request.rows is not None:
+                self.rows.observe((route,), request.rows)
+            if request.table is not None:
+                self.table_seconds.observe((route, request.table), elapsed)
+                if request.rows is not None:
+                    self.table_rows.inc((route, request.table), request.rows)
+        if self.slow_query_seconds > 0 and elapsed >= self.slow_query_seconds:
+            self._log_slow(request, route, status, nbytes, body, elapsed)
+
+    def _log_slow(
+        self,
+        request: RequestMetrics,
+        route: str,
+        status: int,
+        nbytes: int,
+        body: bytes,
+        elapsed: float,
+    ) -> None:
+        entry: Dict[str, Any] = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "route": route,
+            "status": status,
+            "table": request.table,
+            "duration_ms": round(elapsed * 1000, 2),
+            "phases_ms": {k: round(v * 1000, 2) for k, v in request.phases.items()},
+            "rows": request.rows,
+            "bytes": nbytes,
+            "request": body[:MAX_LOGGED_TEXT].decode("utf-8", "replace"),
+            "sql": request.sql[:MAX_LOGGED_TEXT] if request.sql else None,
+        }
+        with self._lock:
+            self.slow_queries.inc((route,))
+            self.slow_log.append(entry)
+        slow_query_logger.warning(json.dumps(entry, default=str))
+        if self.explain_analyze and request.sql and status < 400:
+            self._schedule_explain(entry, request.sql, request.params or [])
+
+    def _schedule_explain(self, entry: Dict[str, Any], sql: str, params: List[Any]) -> None:
+        # One profile at a time: EXPLAIN ANALYZE re-runs the query
+        with self._lock:
+            if self._explain_pending:
+                return
+            self._explain_pending = True
+        try:
+            self._explain_pool.submit(self._explain, entry, sql, params)
+        except RuntimeError:
+            with self._lock:
+                self._explain_pending = False
+
+    def _explain(self, entry: Dict[str, Any], sql: str, params: List[Any]) -> None:
+        from src.db import duckdb_conn
+
+        try:
+            with duckdb_conn() as con:
+                rows = con.execute(f"EXPLAIN ANALYZE {sql}", params).fetchall()
+            profile = "\n".join(str(r[-1]) for r in rows)
+            with self._lock:
+                entry["profile"] = profile
+            slow_query_logger.warning("EXPLAIN ANALYZE for %s (%s ms):\n%s", entry["route"], entry["duration_ms"], profile)
+        except Exception as e:
+            logger.warning("EXPLAIN ANALYZE of slow query failed: %s", e)
+        finally:
+            with self._lock:
+                self._explain_pending = False
+
+    def recent_slow_queries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(e) for e in reversed(self.slow_log)]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            lines: List[str] = []
+            for metric in (
+                self.request_seconds, self.phase_seconds, self.table_seconds, self.rows,
+                self.table_rows, self.response_bytes, self.slow_queries,
+            ):
+                lines.extend(metric.render())
+            return lines
+
+    def close(self) -> None:
+        self._explain_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_METRICS: Metrics | None = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    global _METRICS
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            settings = get_settings()
+            _METRICS = Metrics(settings.slow_query_seconds, settings.slow_query_explain_analyze)
+            if settings.slow_query_log_path and not any(
+                isinstance(h, logging.FileHandler) for h in slow_query_logger.handlers
+            ):
+                slow_query_logger.addHandler(logging.FileHandler(settings.slow_query_log_path))
+        return _METRICS
+
+
+def clear_metrics() -> None:
+    global _METRICS
+    with _METRICS_LOCK:
+        metrics, _METRICS = _METRICS, None
+    if metrics is not None:
+        metrics.close()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, size and phase timings of every HTTP request."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = RequestMetrics(method=scope["method"])
+        token = _CURRENT.set(request)
+        status = 500
+        nbytes = 0
+        body = bytearray()
+
+        async def receive_wrapper() -> Dict[str, Any]:
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < MAX_LOGGED_TEXT:
+                body.extend(message.get("body", b"")[: MAX_LOGGED_TEXT - len(body)])
+            return message
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status, nbytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                nbytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _CURRENT.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up the series count
+            label = getattr(route, "path", None) or "unmatched"
+            try:
+                get_metrics().observe_request(request, label, status, nbytes, bytes(body))
+            except Exception as e:
+                logger.warning("Could not record request metrics: %s", e)
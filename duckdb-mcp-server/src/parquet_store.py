@@ -0,0 +1,233 @@
+"""Parquet snapshot of the DuckDB database, and the in-memory views that serve it.
+
+Build: ``python -m src.parquet_store --duckdb PATH --out DIR [--table T ...]``.
+Serve: set ``DUCKDB_PARQUET_DIR=DIR``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import duckdb
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_ROW_GROUP_SIZE = 122880
+DEFAULT_FILE_SIZE = "512MB"
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_TABLES_SQL = """
+SELECT table_name
+FROM duckdb_tables()
+WHERE database_name = current_database() AND schema_name = 'main' AND NOT internal
+ORDER BY table_name
+"""
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def manifest_path(directory: str | os.PathLike) -> Path:
+    return Path(directory) / MANIFEST_NAME
+
+
+def read_manifest(directory: str | os.PathLike) -> Dict[str, Any]:
+    path = manifest_path(directory)
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "tables": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported Parquet manifest version in {path}: {manifest.get('version')}")
+    return manifest
+
+
+def _write_manifest(directory: Path, manifest: Dict[str, Any]) -> None:
+    path = manifest_path(directory)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _sort_key(table: str, columns: List[str]) -> str | None:
+    """Column to cluster rows by so row-group min/max statistics prune the common lookups."""
+    if f"{table}_id" in columns:
+        return f"{table}_id"
+    if table.startswith("ddt_brick") and columns:
+        # Brick rows are fetched by their leading dimension (e.g. sdt_sample_name)
+        return columns[0]
+    return None
+
+
+def _export_table(
+    con: duckdb.DuckDBPyConnection,
+    table: str,
+    directory: Path,
+    row_group_size: int,
+    file_size: str,
+    sort: bool,
+) -> Dict[str, Any]:
+    columns = [r[0] for r in con.execute(f'DESCRIBE "{table}"').fetchall()]
+    sort_key = _sort_key(table, columns) if sort else None
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    target = directory / table / version
+    target.parent.mkdir(parents=True, exist_ok=True)
+    query = f'SELECT * FROM "{table}"' + (f' ORDER BY "{sort_key}"' if sort_key else "")
+    con.execute(
+        f"COPY ({query}) TO {_sql_string(str(target))} "
+        f"(FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE {int(row_group_size)}, "
+        f"FILE_SIZE_BYTES {_sql_string(file_size)}, FILENAME_PATTERN 'part_{{i}}')"
+    )
+    files = sorted(p.relative_to(directory).as_posix() for p in target.glob("*.parquet"))
+    rows = con.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    return {
+        "files": files,
+        "rows": int(rows),
+        "columns": columns,
+        "sort_key": sort_key,
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def _prune_versions(directory: Path, table: str, keep: int) -> None:
+    """Drop all but the newest ``keep`` exports of a table (servers may still read the previous one)."""
+    versions = sorted((p for p in (directory / table).iterdir() if p.is_dir()), reverse=True)
+    for old in versions[keep:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def export_database(
+    duckdb_path: str,
+    out_dir: str | os.PathLike,
+    tables: Iterable[str] | None = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    file_size: str = DEFAULT_FILE_SIZE,
+    sort: bool = True,
+    keep_versions: int = 2,
+) -> Dict[str, Any]:
+    """Export tables from a DuckDB file to Parquet and update the manifest after each one."""
+    directory = Path(out_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(directory)
+    con = duckdb.connect(duckdb_path, read_only=True)
+    try:
+        available = [r[0] for r in con.execute(_TABLES_SQL).fetchall()]
+        selected = list(tables) if tables else available
+        unknown = sorted(set(selected) - set(available))
+        if unknown:
+            raise ValueError(f"Tables not found in {duckdb_path}: {', '.join(unknown)}")
+        for table in selected:
+            if not _IDENTIFIER.match(table):
+                print(f"[warn] skipping table with unsupported name: {table}", file=sys.stderr)
+                continue
+            started = time.monotonic()
+            manifest["tables"][table] = _export_table(con, table, directory, row_group_size, file_size, sort)
+            manifest["source"] = os.path.abspath(duckdb_path)
+            manifest["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            _write_manifest(directory, manifest)
+            _prune_versions(directory, table, keep_versions)
+            entry = manifest["tables"][table]
+            print(
+                f"[info] {table}: {entry['rows']} rows in {len(entry['files'])} file(s) "
+                f"({time.monotonic() - started:.1f}s)",
+                file=sys.stderr,
+            )
+        if not tables:
+            # Full export: tables dropped from the source disappear from the snapshot too
+            for table in sorted(set(manifest["tables"]) - set(available)):
+                del manifest["tables"][table]
+            _write_manifest(directory, manifest)
+    finally:
+        con.close()
+    return manifest
+
+
+def open_parquet_database(
+    directory: str | os.PathLike,
+    config: Dict[str, Any] | None = None,
+    manifest: Dict[str, Any] | None = None,
+) -> duckdb.DuckDBPyConnection:
+    """In-memory DuckDB with one view per manifest table, restricted to reading ``directory``.
+
+    ``manifest`` defaults to the one currently in ``directory``.
+    """
+    root = Path(directory).resolve()
+    if manifest is None:
+        manifest = read_manifest(root)
+    con = duckdb.connect(":memory:", config=dict(config or {}))
+    try:
+        for table, entry in sorted(manifest["tables"].items()):
+            if not _IDENTIFIER.match(table) or not entry.get("files"):
+                continue
+            files: List[str] = [_sql_string(str(root / f)) for f in entry["files"]]
+            con.execute(f'CREATE VIEW "{table}" AS SELECT * FROM read_parquet([{", ".join(files)}])')
+        # Views read the Parquet files lazily; nothing outside the snapshot directory is reachable
+        con.execute(f"SET allowed_directories = [{_sql_string(str(root) + os.sep)}]")
+        con.execute("SET enable_external_access = false")
+        con.execute("SET lock_configuration = true")
+    except BaseException:
+        con.close()
+        raise
+    return con
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export the DuckDB database to a Parquet snapshot directory.")
+    parser.add_argument("--duckdb", required=True, help="Source DuckDB file.")
+    parser.add_argument("--out", required=True, help="Snapshot directory (manifest.json and one folder per table).")
+    parser.add_argument(
+        "--table",
+        action="append",
+        dest="tables",
+        help="Export only this table (repeatable); other tables keep their current files.",
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=DEFAULT_ROW_GROUP_SIZE,
+        help=f"Rows per Parquet row group (default: {DEFAULT_ROW_GROUP_SIZE}).",
+    )
+    parser.add_argument(
+        "--file-size",
+        default=DEFAULT_FILE_SIZE,
+        help=f"Start a new file once a table's current file reaches this size (default: {DEFAULT_FILE_SIZE}).",
+    )
+    parser.add_argument("--no-sort", action="store_true", help="Write rows in table order instead of clustering them.")
+    parser.add_argument(
+        "--keep-versions",
+        type=int,
+        default=2,
+        help="Exports kept per table, including the current one (default: 2).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    export_database(
+        args.duckdb,
+        args.out,
+        tables=args.tables,
+        row_group_size=args.row_group_size,
+        file_size=args.file_size,
+        sort=not args.no_sort,
+        keep_versions=max(1, args.keep_versions),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import itertools
+import math
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence
+
+import duckdb
+
+from src.settings import get_settings
+
+_PLACEHOLDER = re.compile(r"\?")
+_NAMES = itertools.count(1)
+
+
+def sql_literal(value: Any) -> str | None:
+    """Render a JSON-sourced parameter as a DuckDB literal, or None when it has no safe literal form."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if math.isfinite(value):
+            return repr(value)
+        return f"'{value}'::DOUBLE"
+    if isinstance(value, str) and "\x00" not in value:
+        # Standard SQL string: only the quote character is special
+        return "'" + value.replace("'", "''") + "'"
+    return None
+
+
+def _numbered(sql: str) -> str:
+    counter = itertools.count(1)
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql)
+
+
+class PreparedStatements:
+    """Per-cursor LRU of server-side prepared statements keyed by SQL shape.
+
+    The builders emit SQL with ``?`` placeholders, so the SQL text is the
+    query shape: requests that differ only in filter values, limit or offset
+    map to the same statement. The first call on a cursor runs
+    ``PREPARE``; later calls ``EXECUTE`` it with the values rendered as
+    literals, skipping DuckDB's parse/bind/plan of the full query. Values
+    without a literal form and statements DuckDB cannot prepare fall back to
+    a plain parameterized execute.
+    """
+
+    def __init__(self, max_per_connection: int) -> None:
+        self.max_per_connection = max_per_connection
+        # cursor -> {sql: statement name, or None when DuckDB refused to prepare it}
+        self._by_cursor: weakref.WeakKeyDictionary[duckdb.DuckDBPyConnection, OrderedDict[str, str | None]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.reuses = 0
+        self.fallbacks = 0
+        self.evictions = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _statements(self, con: duckdb.DuckDBPyConnection) -> OrderedDict[str, str | None]:
+        with self._lock:
+            statements = self._by_cursor.get(con)
+            if statements is None:
+                statements = self._by_cursor[con] = OrderedDict()
+            return statements
+
+    def execute(self, con: duckdb.DuckDBPyConnection, sql: str, params: Sequence[Any]) -> duckdb.DuckDBPyConnection:
+        """Run ``sql`` on ``con`` (a cursor borrowed by one thread); results are fetched from ``con``."""
+        literals = [sql_literal(p) for p in params]
+        if self.max_per_connection <= 0 or any(lit is None for lit in literals):
+            self._count("fallbacks")
+            return con.execute(sql, list(params))
+
+        # A cursor is only used by the thread that borrowed it, so its map needs no lock.
+        statements = self._statements(con)
+        if sql in statements:
+            name = statements[sql]
+            statements.move_to_end(sql)
+            if name is None:
+                self._count("fallbacks")
+                return con.execute(sql, list(params))
+            self._count("reuses")
+        else:
+            name = f"select_shape_{next(_NAMES)}"
+            try:
+                con.execute(f"PREPARE {name} AS {_numbered(sql)}")
+            except duckdb.InterruptException:
+                raise
+            except duckdb.Error:
+                statements[sql] = None
+                self._count("fallbacks")
+                return con.execute(sql, list(params))
+            statements[sql] = name
+            self._count("prepares")
+            while len(statements) > self.max_per_connection:
+                _, evicted = statements.popitem(last=False)
+                if evicted is not None:
+                    con.execute(f"DEALLOCATE {evicted}")
+                self._count("evictions")
+        args = f"({', '.join(literals)})" if literals else ""
+        return con.execute(f"EXECUTE {name}{args}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            executions = self.prepares + self.reuses
+            return {
+                "connections": len(self._by_cursor),
+                "statements": sum(len(s) for s in self._by_cursor.values()),
+                "prepares": self.prepares,
+                "reuses": self.reuses,
+                "reuse_ratio": round(self.reuses / executions, 4) if executions else None,
+                "fallbacks": self.fallbacks,
+                "evictions": self.evictions,
+            }
+
+
+_PREPARED: PreparedStatements | None = None
+_PREPARED_LOCK = threading.Lock()
+
+
+def get_prepared_statements() -> PreparedStatements:
+    global _PREPARED
+    with _PREPARED_LOCK:
+        if _PREPARED is None:
+            _PREPARED = PreparedStatements(get_settings().duckdb_prepared_statements_per_connection)
+        return _PREPARED
+
+
+def clear_prepared_statements() -> None:
+    global _PREPARED
+    with _PREPARED_LOCK:
+        _PREPARED = None
+
+
+def execute_prepared(con: duckdb.DuckDBPyConnection, sql: str, params: List[Any]) -> duckdb.DuckDBPyConnection:
+    return get_prepared_statements().execute(con, sql, params)
@@ -0,0 +1,215 @@
+"""Process/object link tables for lineage walks, one copy per snapshot.
+
+``sys_process_input`` and ``sys_process_output`` hold one row per (process,
+object) link, with the object in whichever ``<table>_id`` column matches its
+type. They are flattened into ``inputs`` and ``outputs`` tables of
+``(object, process)`` pairs, objects written as ``<table>:<id>`` tokens, in a
+private in-memory DuckDB database. A lineage walk is then a recursive CTE over
+those two tables.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import duckdb
+
+from src.db import duckdb_snapshot_conn, get_pool
+
+logger = logging.getLogger(__name__)
+
+LINK_TABLES = {"inputs": "sys_process_input", "outputs": "sys_process_output"}
+# Response field -> sys_process column
+PROCESS_COLUMNS = {
+    "process_term_name": "process_sys_oterm_name",
+    "person_term_name": "person_sys_oterm_name",
+    "protocol": "sdt_protocol_name",
+    "date_end": "date_end",
+}
+
+_COLUMNS_SQL = """
+SELECT table_name, column_name
+FROM duckdb_columns()
+WHERE database_name = current_database() AND schema_name = 'main' AND list_contains(?, table_name)
+ORDER BY table_name, column_index
+"""
+
+# Anchor: processes linked to the start object. Step: processes linked to the
+# objects on the far side of the processes already reached. Walking one level
+# past max_depth tells the caller whether the limit cut the lineage short.
+_WALK_SQL = """
+WITH RECURSIVE walk(process, depth) AS (
+  SELECT process, 1 FROM {near} WHERE object = ?
+  UNION
+  SELECT n.process, w.depth + 1
+  FROM walk w
+  JOIN {far} f ON f.process = w.process
+  JOIN {near} n ON n.object = f.object
+  WHERE w.depth <= ?
+),
+reached AS (
+  SELECT process, MIN(depth) AS depth FROM walk GROUP BY process
+  ORDER BY depth, process
+  LIMIT ?
+)
+SELECT r.process, r.depth, {metadata},
+  (SELECT list(object ORDER BY object) FROM inputs i WHERE i.process = r.process) AS inputs,
+  (SELECT list(object ORDER BY object) FROM outputs o WHERE o.process = r.process) AS outputs
+FROM reached r LEFT JOIN processes p USING (process)
+ORDER BY r.depth, r.process
+"""
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class ProvenanceGraph:
+    """Immutable link tables for one database generation.
+
+    Replaced graphs are not closed: in-flight walks may still hold a cursor on
+    them, and the in-memory database is freed with the last reference.
+    """
+
+    def __init__(self, generation: int | None, con: duckdb.DuckDBPyConnection, build_seconds: float) -> None:
+        self.generation = generation
+        self._con = con
+        self.build_seconds = build_seconds
+        self.links = con.execute(
+            "SELECT (SELECT COUNT(*) FROM inputs) + (SELECT COUNT(*) FROM outputs)"
+        ).fetchone()[0]
+
+    @classmethod
+    def build(cls, source: duckdb.DuckDBPyConnection, generation: int | None) -> "ProvenanceGraph | None":
+        """Copy the link tables out of the snapshot; None when it has no link tables."""
+        started = time.monotonic()
+        wanted = [*LINK_TABLES.values(), "sys_process"]
+        columns: Dict[str, List[str]] = {}
+        for table, column in source.execute(_COLUMNS_SQL, [wanted]).fetchall():
+            columns.setdefault(table, []).append(column)
+        if any("sys_process_id" not in columns.get(t, []) for t in LINK_TABLES.values()):
+            return None
+        con = duckdb.connect(":memory:")
+        try:
+            for name, table in LINK_TABLES.items():
+                selects = [
+                    f"SELECT {_sql_string(column[:-3] + ':')} || CAST({_q(column)} AS VARCHAR) AS object, "
+                    f"sys_process_id AS process FROM {_q(table)} WHERE {_q(column)} IS NOT NULL"
+                    for column in columns[table]
+                    if column.endswith("_id") and column != "sys_process_id"
+                ] or ["SELECT NULL::VARCHAR AS object, NULL::VARCHAR AS process WHERE FALSE"]
+                links = source.execute(" UNION ALL ".join(selects)).fetch_arrow_table()
+                con.register("links", links)
+                # Sorted by object so the start lookup reads a handful of row groups
+                con.execute(f"CREATE TABLE {name} AS SELECT DISTINCT object, process FROM links ORDER BY object")
+                con.unregister("links")
+            process_columns = columns.get("sys_process", [])
+            exprs = [
+                f"CAST({_q(column)} AS VARCHAR) AS {field}"
+                if column in process_columns
+                else f"NULL::VARCHAR AS {field}"
+                for field, column in PROCESS_COLUMNS.items()
+            ]
+            if "sys_process_id" in process_columns:
+                processes = source.execute(
+                    f"SELECT sys_process_id AS process, {', '.join(exprs)} FROM sys_process"
+                ).fetch_arrow_table()
+                con.register("source_processes", processes)
+                con.execute("CREATE TABLE processes AS SELECT * FROM source_processes")
+                con.unregister("source_processes")
+            else:
+                con.execute(
+                    f"CREATE TABLE processes AS SELECT NULL::VARCHAR AS process, {', '.join(exprs)} WHERE FALSE"
+                )
+        except BaseException:
+            con.close()
+            raise
+        return cls(generation, con, time.monotonic() - started)
+
+    def walk(
+        self, start: str, direction: str, max_depth: int, max_processes: int
+    ) -> Tuple[List[Dict[str, Any]], bool, bool]:
+        """Processes upstream or downstream of ``start``: (processes, depth_limited, truncated)."""
+        # Upstream: who produced the object, then who produced their inputs
+        near, far = ("outputs", "inputs") if direction == "upstream" else ("inputs", "outputs")
+        metadata = ", ".join(f"p.{field}" for field in PROCESS_COLUMNS)
+        sql = _WALK_SQL.format(near=near, far=far, metadata=metadata)
+        rows = self._con.cursor().execute(sql, [start, max_depth, max_processes + 1]).fetchall()
+        depth_limited = any(row[1] > max_depth for row in rows)
+        rows = [row for row in rows if row[1] <= max_depth]
+        truncated = len(rows) > max_processes
+        fields = ["id", "depth", *PROCESS_COLUMNS, "inputs", "outputs"]
+        processes = [dict(zip(fields, row)) for row in rows[:max_processes]]
+        for process in processes:
+            process["inputs"] = process["inputs"] or []
+            process["outputs"] = process["outputs"] or []
+        return processes, depth_limited, truncated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "links": self.links,
+            "build_seconds": round(self.build_seconds, 3),
+        }
+
+    def close(self) -> None:
+        self._con.close()
+
+
+# Generation -> graph (or None when that snapshot has no link tables)
+_GRAPH: Tuple[int | None, ProvenanceGraph | None] | None = None
+# Built while a new snapshot is warmed, before requests are routed to it
+_PRIMED: Tuple[int | None, ProvenanceGraph | None] | None = None
+_GRAPH_LOCK = threading.Lock()
+
+
+def _build_for(generation: int | None, con: duckdb.DuckDBPyConnection) -> ProvenanceGraph | None:
+    graph = ProvenanceGraph.build(con, generation)
+    if graph is not None:
+        logger.info(
+            "Provenance links ready: %d links (generation %s, %.1fs)",
+            graph.links, generation, graph.build_seconds,
+        )
+    return graph
+
+
+def get_provenance_graph() -> ProvenanceGraph | None:
+    """Return the link tables of the currently open database, rebuilding them after a switch."""
+    global _GRAPH, _PRIMED
+    generation = get_pool().generation()
+    current = _GRAPH
+    if current is not None and (generation is None or current[0] == generation):
+        return current[1]
+    with _GRAPH_LOCK:
+        if _GRAPH is None or _GRAPH[0] != generation:
+            if _PRIMED is not None and _PRIMED[0] == generation:
+                _GRAPH, _PRIMED = _PRIMED, None
+            else:
+                with duckdb_snapshot_conn() as (gen, con):
+                    _GRAPH = (gen.number, _build_for(gen.number, con))
+        return _GRAPH[1]
+
+
+def prime_provenance_graph(generation: int, con: duckdb.DuckDBPyConnection) -> None:
+    """DuckDBPool warmer: copy the link tables of a snapshot that is about to go live."""
+    global _PRIMED
+    primed = (generation, _build_for(generation, con))
+    with _GRAPH_LOCK:
+        _PRIMED = primed
+
+
+def clear_provenance_graph() -> None:
+    global _GRAPH, _PRIMED
+    with _GRAPH_LOCK:
+        for entry in (_GRAPH, _PRIMED):
+            if entry is not None and entry[1] is not None:
+                entry[1].close()
+        _GRAPH = None
+        _PRIMED = None
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from src.db import FileFingerprint, get_pool
+from src.service.serialization import dump_json, json_response
+from src.settings import get_settings
+
+
+@dataclass
+class _Entry:
+    body: bytes
+    expires_at: float
+
+
+class ResultCache:
+    """LRU of serialized JSON responses bounded by total body bytes.
+
+    Entries expire ``ttl_seconds`` after they are stored.  Keys include the
+    DuckDB file fingerprint; the first lookup that sees a new fingerprint
+    drops every entry, so a rebuilt database never serves old results.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._fingerprint: FileFingerprint | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _pop_locked(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def _check_fingerprint_locked(self, fingerprint: FileFingerprint | None) -> None:
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._fingerprint = fingerprint
+
+    def get(self, key: Hashable, fingerprint: FileFingerprint | None) -> bytes | None:
+        with self._lock:
+            self._check_fingerprint_locked(fingerprint)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._pop_locked(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.body
+
+    def put(
+        self,
+        key: Hashable,
+        fingerprint: FileFingerprint | None,
+        body: bytes,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        if len(body) > self.max_bytes:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                # Computed against a file another request has already seen replaced
+                return
+            if key in self._entries:
+                self._pop_locked(key)
+            self._entries[key] = _Entry(body, time.monotonic() + ttl)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._pop_locked(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+_CACHE: ResultCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            settings = get_settings()
+            _CACHE = ResultCache(settings.result_cache_max_bytes, settings.result_cache_ttl_seconds)
+        return _CACHE
+
+
+def clear_result_cache() -> None:
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = None
+
+
+def request_key(endpoint: str, req: BaseModel) -> str:
+    """Canonical form of a request body: field order and defaults do not matter."""
+    return endpoint + "\n" + json.dumps(req.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+
+
+def cached_json_response(endpoint: str, req: BaseModel, compute: Callable[[], BaseModel]) -> Response:
+    """Serve ``compute()`` as JSON, reusing the serialized body for repeated identical requests."""
+    cache = get_result_cache()
+    if not cache.enabled:
+        return json_response(compute())
+    key = request_key(endpoint, req)
+    fingerprint = get_pool().fingerprint()
+    body = cache.get(key, fingerprint)
+    if body is not None:
+        return Response(body, media_type="application/json", headers={"X-Cache": "HIT"})
+    body = dump_json(compute())
+    cache.put(key, fingerprint, body)
+    return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
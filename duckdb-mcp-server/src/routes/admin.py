@@ -0,0 +1,82 @@
+import hmac
+import os
+from typing import Any, Dict, List
+
+import duckdb
+from fastapi import APIRouter, Header, status
+
+from src.db import PoolTimeout, get_pool
+from src.metrics import get_metrics
+from src.parquet_store import manifest_path
+from src.service.errors import bad_request, forbidden, service_unavailable
+from src.service.models import SnapshotReloadRequest, SnapshotResponse
+from src.settings import get_settings
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _check_token(token: str | None) -> None:
+    expected = get_settings().admin_token
+    if not expected:
+        raise forbidden("Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if token is None or not hmac.compare_digest(token, expected):
+        raise forbidden("Invalid admin token")
+
+
+@router.get(
+    "/snapshot",
+    response_model=SnapshotResponse,
+    summary="Current database snapshot",
+    operation_id="get_snapshot",
+)
+def get_snapshot(x_admin_token: str | None = Header(default=None)) -> SnapshotResponse:
+    _check_token(x_admin_token)
+    return SnapshotResponse(**get_pool().stats())
+
+
+@router.post(
+    "/snapshot/reload",
+    response_model=SnapshotResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Switch to a new database snapshot",
+    description="Opens the snapshot, builds its catalog, then routes new requests to it. "
+                "Requests already running finish on the previous snapshot, which is closed afterwards. "
+                "A new path is rejected when the server runs several worker processes.",
+    operation_id="reload_snapshot",
+)
+def reload_snapshot(
+    req: SnapshotReloadRequest,
+    x_admin_token: str | None = Header(default=None),
+) -> SnapshotResponse:
+    _check_token(x_admin_token)
+    pool = get_pool()
+    if req.path is not None and get_settings().workers > 1:
+        # Only the worker process that received the request would switch
+        raise bad_request(
+            "Switching to a new path needs WORKERS=1; with several workers, replace the file "
+            "(or flip the symlink) at DUCKDB_PATH and every worker switches within "
+            "DUCKDB_FILE_CHECK_INTERVAL_SECONDS"
+        )
+    if req.path is not None:
+        target = str(manifest_path(req.path)) if pool.parquet_dir else req.path
+        if not os.path.isfile(target):
+            raise bad_request(f"Snapshot not found: {target}")
+    try:
+        return SnapshotResponse(**pool.switch(req.path))
+    except PoolTimeout as e:
+        raise service_unavailable(str(e))
+    except (duckdb.Error, OSError, ValueError) as e:
+        # The previous snapshot keeps serving
+        raise bad_request(f"Could not open snapshot: {e}")
+
+
+@router.get(
+    "/slow-queries",
+    summary="Recent slow requests",
+    description="Most recent requests over SLOW_QUERY_SECONDS, newest first, with their last SQL statement "
+                "and (with SLOW_QUERY_EXPLAIN_ANALYZE) its profile.",
+    operation_id="get_slow_queries",
+)
+def get_slow_queries(x_admin_token: str | None = Header(default=None)) -> List[Dict[str, Any]]:
+    _check_token(x_admin_token)
+    return get_metrics().recent_slow_queries()
@@ -1,36 +1,50 @@
 from __future__ import annotations
 
+import json
 import re
-from functools import lru_cache
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Tuple
 
-import sqlparse
+import duckdb
 from fastapi import APIRouter, status
-
-from src.db import duckdb_conn
+from fastapi.responses import Response
+
+from src.catalog import Catalog, TableInfo, get_catalog
+from src.db import duckdb_conn, duckdb_snapshot_conn
+from src.executor import offload
+from src.metrics import record_rows, record_table, timed
+from src.prepared import execute_prepared
+from src.result_cache import cached_json_response
+from src.service.budget import TRUNCATED_HEADER, QueryBudget, run_budgeted_query
 from src.service.errors import bad_request, not_found
 from src.service.models import (
     DatabaseListRequest, DatabaseListResponse,
     DatabaseStructureRequest, DatabaseStructureResponse,
     TableCountRequest, TableCountResponse,
+    TableLookupRequest, TableLookupResponse,
     TableListRequest, TableListResponse,
     TableQueryRequest, TableQueryResponse,
     TableSampleRequest, TableSampleResponse,
     TableSchemaRequest, TableSchemaResponse,
     TableSelectRequest, TableSelectResponse,
+    TableStatsRequest, TableStatsResponse,
     PaginationInfo,
+    ProvenanceRequest, ProvenanceResponse,
+    SearchRequest, SearchResponse,
+)
+from src.service.pagination import (
+    CountCache, KeyColumn, decode_cursor, encode_cursor, estimate_count, keyset_predicate, query_shape,
 )
+from src.service.serialization import trusted
+from src.service.sql_validation import check_query_is_valid_select_only, check_where_clause
+from src.service.streaming import STREAMING_RESPONSES, stream_query
+from src.provenance import get_provenance_graph
+from src.search_index import get_search_index
 from src.settings import get_settings
+from src.table_stats import get_table_stats_store
 
 router = APIRouter(prefix="/delta", tags=["Delta Lake"])
 
-# ---- Safety checks (modeled after BERDL delta_service.py) ----
-FORBIDDEN_KEYWORDS = {
-    "drop", "truncate", "delete", "insert", "update", "create", "alter", "merge", "replace", "rename", "vacuum",
-}
-DISALLOW_SQL_META_CHARS = {"--", "/*", "*/", ";", "\\"}
-ALLOWED_STATEMENTS = {"select"}
-
 VALID_IDENTIFIER_PATTERN = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
 
 def _require_enigma_coral(db: str) -> None:
@@ -43,54 +57,14 @@ def _q_ident(name: str) -> str:
         raise bad_request(f"Invalid identifier: {name}")
     return f'"{name}"'
 
-def _q_any_ident(name: str) -> str:
-    # Use for DuckDB-generated column names (e.g., from DESCRIBE); escape quotes defensively.
-    safe = name.replace('"', '""')
-    return f'"{safe}"'
-
-def _check_query_is_valid_select_only(query: str) -> None:
-    try:
-        statements = sqlparse.parse(query)
-    except Exception as e:
-        raise bad_request(f"Query is not valid SQL: {e}")
-    if len(statements) != 1:
-        raise bad_request("Query must contain exactly one statement")
-    st = statements[0]
-    if st.get_type().lower() not in ALLOWED_STATEMENTS:
-        raise bad_request(f"Only SELECT statements are allowed (got {st.get_type()})")
-    qlow = query.lower()
-    if any(schema in qlow for schema in ("pg_", "pg_catalog", "information_schema")):
-        # keep parity with BERDL’s “forbidden schemas” spirit
-        raise bad_request("Query references forbidden system schema")
-    if any(m in query for m in DISALLOW_SQL_META_CHARS):
-        bad = ", ".join(sorted([m for m in DISALLOW_SQL_META_CHARS if m in query]))
-        raise bad_request(f"Query contains disallowed metacharacter(s): {bad}")
-    if any(k in qlow for k in FORBIDDEN_KEYWORDS):
-        bad = ", ".join(sorted([k for k in FORBIDDEN_KEYWORDS if k in qlow]))
-        raise bad_request(f"Query contains forbidden keyword(s): {bad}")
-
 # ---- Metadata helpers ----
-def _list_tables() -> List[str]:
-    with duckdb_conn() as con:
-        rows = con.execute(
-            "SELECT table_name FROM information_schema.tables WHERE table_schema='main' AND table_type='BASE TABLE' ORDER BY table_name"
-        ).fetchall()
-    return [r[0] for r in rows]
-
-def _table_exists(table: str) -> bool:
-    return table in set(_list_tables())
-
-def _table_columns(table: str) -> List[str]:
-    with duckdb_conn() as con:
-        rows = con.execute(f"PRAGMA table_info({_q_ident(table)})").fetchall()
-    # PRAGMA table_info returns: cid, name, type, notnull, dflt_value, pk
-    return [r[1] for r in rows]
-
-@lru_cache(maxsize=256)
-def _table_column_types(table: str) -> Dict[str, str]:
-    with duckdb_conn() as con:
-        rows = con.execute(f"PRAGMA table_info({_q_ident(table)})").fetchall()
-    return {r[1]: str(r[2]) for r in rows}
+def _require_table(catalog: Catalog, db: str, table: str, label: str = "Table") -> TableInfo:
+    _require_enigma_coral(db)
+    if not catalog.has_table(table):
+        raise not_found(f"{label} [{table}] not found in database [{db}]")
+    if label == "Table":
+        record_table(table)
+    return catalog.table(table)
 
 def _is_float_type(type_name: str) -> bool:
     t = type_name.strip().lower()
@@ -114,76 +88,6 @@ def _select_expr_for_column(
     return ref
 
 
-@lru_cache(maxsize=1)
-def _load_schema_markdown() -> Dict[str, Dict[str, Any]]:
-    settings = get_settings()
-    path = settings.schema_markdown_path
-    if not path:
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as handle:
-            tables: Dict[str, Dict[str, Any]] = {}
-            current_table = None
-            in_schema = False
-            for raw_line in handle:
-                line = raw_line.rstrip("\n")
-                if line.startswith("## Table:"):
-                    current_table = line.split(":", 1)[1].strip()
-                    tables.setdefault(current_table, {"description": None, "columns": {}})
-                    in_schema = False
-                    continue
-                if line.startswith("**Table Description:**") and current_table:
-                    desc = line.split(":", 1)[1].strip()
-                    tables[current_table]["description"] = desc.replace("**", "").strip()
-                    continue
-                if line.startswith("### Schema"):
-                    in_schema = True
-                    continue
-                if line.startswith("### Sample Data"):
-                    in_schema = False
-                    continue
-                if not in_schema or not current_table:
-                    continue
-                if line.startswith("| Column Name |"):
-                    continue
-                if not line.startswith("|"):
-                    continue
-                parts = [part.strip() for part in line.strip().strip("|").split("|")]
-                if len(parts) < 4:
-                    continue
-                col_name, col_type, nullable, comment = parts[:4]
-                tables[current_table]["columns"][col_name] = {
-                    "type": col_type,
-                    "nullable": nullable,
-                    "comment": comment,
-                }
-            return tables
-    except OSError:
-        return {}
-
-
-def _table_schema_details(table: str) -> List[Dict[str, Any]]:
-    schema_md = _load_schema_markdown()
-    with duckdb_conn() as con:
-        rows = con.execute(f"PRAGMA table_info({_q_ident(table)})").fetchall()
-    # cid, name, type, notnull, dflt_value, pk
-    results: List[Dict[str, Any]] = []
-    for _, name, data_type, notnull, _default, _pk in rows:
-        md_table = schema_md.get(table, {})
-        md_col = md_table.get("columns", {}).get(name, {})
-        nullable = md_col.get("nullable") or ("No" if notnull else "Yes")
-        comment = md_col.get("comment", "")
-        col_type = md_col.get("type") or data_type
-        results.append(
-            {
-                "name": name,
-                "type": col_type,
-                "nullable": nullable,
-                "comment": comment,
-            }
-        )
-    return results
-
 # ---- Routes ----
 @router.post(
     "/databases/list",
@@ -204,9 +108,10 @@ def list_databases(_: DatabaseListRequest) -> DatabaseListResponse:
     description="Lists all tables in the single DuckDB-backed database (enigma_coral).",
     operation_id="list_database_tables",
 )
+@offload("metadata")
 def list_database_tables(req: TableListRequest) -> TableListResponse:
     _require_enigma_coral(req.database)
-    return TableListResponse(tables=_list_tables())
+    return TableListResponse(tables=get_catalog().table_names)
 
 @router.post(
     "/databases/tables/schema",
@@ -216,11 +121,10 @@ def list_database_tables(req: TableListRequest) -> TableListResponse:
     description="Gets the schema (column names) of a specific table.",
     operation_id="get_table_schema",
 )
+@offload("metadata")
 def get_table_schema(req: TableSchemaRequest) -> TableSchemaResponse:
-    _require_enigma_coral(req.database)
-    if not _table_exists(req.table):
-        raise not_found(f"Table [{req.table}] not found in database [{req.database}]")
-    return TableSchemaResponse(columns=_table_columns(req.table))
+    info = _require_table(get_catalog(), req.database, req.table)
+    return TableSchemaResponse(columns=info.columns)
 
 @router.post(
     "/databases/structure",
@@ -230,46 +134,20 @@ def get_table_schema(req: TableSchemaRequest) -> TableSchemaResponse:
     description="Gets structure of enigma_coral; optionally includes table schemas.",
     operation_id="get_database_structure",
 )
+@offload("metadata")
 def get_database_structure(req: DatabaseStructureRequest) -> DatabaseStructureResponse:
     db = get_settings().berdl_database_name
-    tables = _list_tables()
-    schema_md = _load_schema_markdown()
-    if not req.with_schema:
-        return DatabaseStructureResponse(
-            structure={
-                db: {
-                    "tables": [
-                        {
-                            "name": t,
-                            **(
-                                {"description": schema_md.get(t, {}).get("description")}
-                                if schema_md.get(t, {}).get("description")
-                                else {}
-                            ),
-                        }
-                        for t in tables
-                    ]
-                }
-            }
-        )
-    return DatabaseStructureResponse(
-        structure={
-            db: {
-                "tables": [
-                    {
-                        "name": t,
-                        "columns": _table_schema_details(t),
-                        **(
-                            {"description": schema_md.get(t, {}).get("description")}
-                            if schema_md.get(t, {}).get("description")
-                            else {}
-                        ),
-                    }
-                    for t in tables
-                ]
-            }
-        }
-    )
+    catalog = get_catalog()
+    tables = []
+    for t in catalog.table_names:
+        info = catalog.table(t)
+        entry: Dict[str, Any] = {"name": t}
+        if req.with_schema:
+            entry["columns"] = info.schema_details
+        if info.description:
+            entry["description"] = info.description
+        tables.append(entry)
+    return DatabaseStructureResponse(structure={db: {"tables": tables}})
 
 @router.post(
     "/tables/count",
@@ -279,12 +157,15 @@ def get_database_structure(req: DatabaseStructureRequest) -> DatabaseStructureRe
     description="Counts rows in a table (DuckDB).",
     operation_id="count_delta_table",
 )
-def count_table(req: TableCountRequest) -> TableCountResponse:
-    _require_enigma_coral(req.database)
-    if not _table_exists(req.table):
-        raise not_found(f"Table [{req.table}] not found in database [{req.database}]")
-    with duckdb_conn() as con:
-        count = con.execute(f"SELECT COUNT(*) FROM {_q_ident(req.table)}").fetchone()[0]
+@offload("query")
+def count_table(req: TableCountRequest) -> Response:
+    _require_table(get_catalog(), req.database, req.table)
+    return cached_json_response("/tables/count", req, lambda: _count_rows(req))
+
+def _count_rows(req: TableCountRequest) -> TableCountResponse:
+    sql = f"SELECT COUNT(*) FROM {_q_ident(req.table)}"
+    with duckdb_conn() as con, timed("duckdb", sql):
+        count = con.execute(sql).fetchone()[0]
     return TableCountResponse(count=int(count))
 
 @router.post(
@@ -295,63 +176,56 @@ def count_table(req: TableCountRequest) -> TableCountResponse:
     description="Returns a small sample of rows from a table (DuckDB).",
     operation_id="sample_delta_table",
 )
-def sample_table(req: TableSampleRequest) -> TableSampleResponse:
-    _require_enigma_coral(req.database)
-    if not _table_exists(req.table):
-        raise not_found(f"Table [{req.table}] not found in database [{req.database}]")
-
-    type_map = _table_column_types(req.table)
-    cols = req.columns
-    if cols:
-        cols_sql = ", ".join(
-            [_select_expr_for_column(req.table, c, None, type_map.get(c)) for c in cols]
-        )
-    else:
-        cols_sql = ", ".join(
-            [_select_expr_for_column(req.table, c, None, type_map.get(c)) for c in _table_columns(req.table)]
-        )
+@offload("query")
+def sample_table(req: TableSampleRequest) -> Response:
+    return cached_json_response("/tables/sample", req, lambda: _sample_rows(req))
+
+def _sample_rows(req: TableSampleRequest) -> TableSampleResponse:
+    info = _require_table(get_catalog(), req.database, req.table)
+
+    type_map = info.column_types
+    cols = req.columns or info.columns
+    cols_sql = ", ".join(
+        [_select_expr_for_column(req.table, c, None, type_map.get(c)) for c in cols]
+    )
 
     where_sql = ""
     if req.where_clause:
-        # Validate by constructing a SELECT-only query; disallow metas, forbidden keywords
-        test_query = f"SELECT 1 FROM {_q_ident(req.table)} WHERE {req.where_clause} LIMIT 1"
-        _check_query_is_valid_select_only(test_query)
-        where_sql = f" WHERE {req.where_clause}"
+        # Parsed in the same parentheses it runs in, so it cannot reach past the WHERE
+        check_where_clause(_q_ident(req.table), req.where_clause)
+        where_sql = f" WHERE ({req.where_clause})"
 
     q = f"SELECT {cols_sql} FROM {_q_ident(req.table)}{where_sql} LIMIT ?"
-    with duckdb_conn() as con:
+    with duckdb_conn() as con, timed("duckdb", q, [req.limit]):
         rows = con.execute(q, [req.limit]).fetchall()
         colnames = [d[0] for d in con.description]
+    record_rows(len(rows))
     result = [dict(zip(colnames, r)) for r in rows]
-    return TableSampleResponse(sample=result)
+    return trusted(TableSampleResponse, sample=result)
 
 @router.post(
     "/tables/query",
     response_model=TableQueryResponse,
     status_code=status.HTTP_200_OK,
     summary="Query a Delta table",
-    description="Executes a raw SELECT query (DuckDB).",
+    description="Executes a raw SELECT query (DuckDB). JSON results are capped by the server's row, byte "
+                "and time budgets and flagged 'truncated' when cut short; set format to 'ndjson' or "
+                "'arrow' to stream large results.",
     operation_id="query_delta_table",
+    responses=STREAMING_RESPONSES,
 )
-def query_table(req: TableQueryRequest) -> TableQueryResponse:
-    _check_query_is_valid_select_only(req.query)
+@offload("query")
+def query_table(req: TableQueryRequest) -> Response:
+    check_query_is_valid_select_only(req.query)
+    # Single execution: FLOAT/REAL values already come back as Python floats, and
+    # the streamed path widens them to DOUBLE on the Arrow batches.
+    if req.format != "json":
+        return stream_query(req.format, req.query, normalize=True)
     with duckdb_conn() as con:
-        desc_rows = con.execute(f"DESCRIBE SELECT * FROM ({req.query}) AS subq").fetchall()
-        if desc_rows:
-            select_exprs = []
-            for name, type_name, *_rest in desc_rows:
-                ref = _q_any_ident(str(name))
-                if _is_float_type(str(type_name)):
-                    select_exprs.append(f"CAST({ref} AS DOUBLE) AS {_q_any_ident(str(name))}")
-                else:
-                    select_exprs.append(ref)
-            wrapped = f"SELECT {', '.join(select_exprs)} FROM ({req.query}) AS subq"
-            rows = con.execute(wrapped).fetchall()
-        else:
-            rows = con.execute(req.query).fetchall()
-        colnames = [d[0] for d in con.description]
-    result = [dict(zip(colnames, r)) for r in rows]
-    return TableQueryResponse(result=result)
+        result = run_budgeted_query(con, req.query, QueryBudget.from_settings(get_settings()))
+    record_rows(result.rows)
+    headers = {TRUNCATED_HEADER: result.truncated} if result.truncated else None
+    return Response(result.body, media_type="application/json", headers=headers)
 
 # ---- Structured SELECT builder (/tables/select) ----
 def _build_filter_sql(f, params: List[Any]) -> str:
@@ -377,16 +251,53 @@ def _build_filter_sql(f, params: List[Any]) -> str:
     params.append(f.value)
     return f"{col} {op} ?"
 
-def _build_select(req: TableSelectRequest) -> Tuple[str, List[Any], str, List[Any]]:
-    _require_enigma_coral(req.database)
-    if not _table_exists(req.table):
-        raise not_found(f"Table [{req.table}] not found in database [{req.database}]")
+@dataclass
+class _SelectPlan:
+    sql: str                 # page query ending in LIMIT ? OFFSET ?
+    params: List[Any]        # parameters without the LIMIT/OFFSET values
+    count_sql: str           # COUNT(*) over the filtered rows, ignoring the cursor
+    count_params: List[Any]
+    shape: str               # digest binding cursors to this query
+    cursor_columns: List[str] = field(default_factory=list)  # hidden columns holding keyset values
+    cursor_token: Dict[str, Any] | None = None
+
+CURSOR_COLUMN_PREFIX = "__cursor_key_"
+_PAGING_FIELDS = {"cursor", "limit", "offset", "format", "count_mode", "pagination_mode"}
+_COUNT_CACHE = CountCache(get_settings().select_count_cache_size)
+
+def _keyset_columns(
+    req: TableSelectRequest,
+    base_info: TableInfo,
+    join_type_maps: Dict[str, Dict[str, str]],
+) -> List[KeyColumn] | None:
+    """ORDER BY keys for keyset pagination: the requested order plus the table's *_id tiebreaker."""
+    if req.aggregations or req.group_by or req.distinct:
+        return None
+    id_col = f"{req.table}_id"
+    if id_col not in base_info.column_types:
+        return None
+    keys: List[KeyColumn] = []
+    for o in req.order_by or []:
+        if o.column in base_info.column_types:
+            type_name = base_info.column_types[o.column]
+        else:
+            matches = [m[o.column] for m in join_type_maps.values() if o.column in m]
+            if len(matches) != 1:
+                # Output aliases cannot be used in the keyset WHERE clause
+                return None
+            type_name = matches[0]
+        keys.append((_q_ident(o.column), type_name, o.direction.upper()))
+    if not any(o.column == id_col for o in req.order_by or []):
+        keys.append((_q_table_col(req.table, id_col), base_info.column_types[id_col], "ASC"))
+    return keys
+
+def _build_select(req: TableSelectRequest, catalog: Catalog) -> _SelectPlan:
+    base_info = _require_table(catalog, req.database, req.table)
 
     params: List[Any] = []
-    base_type_map = _table_column_types(req.table)
+    base_type_map = base_info.column_types
     join_tables = [j.table for j in req.joins] if req.joins else []
-    join_type_maps = {t: _table_column_types(t) for t in join_tables}
-
+    join_type_maps = {t: catalog.column_types(t) for t in join_tables}
     # SELECT list
     parts: List[str] = ["SELECT"]
     if req.distinct:
@@ -427,53 +338,92 @@ def _build_select(req: TableSelectRequest) -> Tuple[str, List[Any], str, List[An
         else:
             select_exprs = [
                 _select_expr_for_column(req.table, c, None, base_type_map.get(c))
-                for c in _table_columns(req.table)
+                for c in base_info.columns
             ]
 
-    parts.append(", ".join(select_exprs))
+    # Keyset pagination: cursor mode, or any ordered select (advertised via next_cursor).
+    # Queries that cannot be keyed fall back to LIMIT/OFFSET without a next_cursor.
+    keys: List[KeyColumn] | None = None
+    if req.cursor or req.pagination_mode == "cursor" or req.order_by:
+        keys = _keyset_columns(req, base_info, join_type_maps)
+        if keys is None and req.cursor:
+            raise bad_request(
+                f"Cursor pagination needs a [{req.table}_id] column and is not supported with "
+                "aggregations, GROUP BY, DISTINCT or ORDER BY on output aliases"
+            )
+    if req.cursor and req.offset:
+        raise bad_request("offset must be 0 when a cursor is given")
+    shape = query_shape(req.model_dump(exclude=_PAGING_FIELDS))
+    token = decode_cursor(req.cursor, shape, len(keys)) if req.cursor and keys else None
+    cursor_columns: List[str] = []
+    if keys and req.format == "json":
+        cursor_columns = [f"{CURSOR_COLUMN_PREFIX}{i}" for i in range(len(keys))]
+        select_list = select_exprs + [
+            f"{expr} AS {_q_ident(name)}" for (expr, _t, _d), name in zip(keys, cursor_columns)
+        ]
+    else:
+        select_list = select_exprs
+
+    parts.append(", ".join(select_list))
     parts.append(f"FROM {_q_ident(req.table)}")
 
     # JOINs
     if req.joins:
         for j in req.joins:
-            _require_enigma_coral(j.database)
-            if not _table_exists(j.table):
-                raise not_found(f"Join table [{j.table}] not found in database [{j.database}]")
+            _require_table(catalog, j.database, j.table, label="Join table")
             jt = j.join_type.upper()
             parts.append(f"{jt} JOIN {_q_ident(j.table)} ON {_q_ident(j.on_left_column)} = {_q_ident(j.on_right_column)}")
 
     # WHERE
-    if req.filters:
-        where_params: List[Any] = []
-        clauses = [_build_filter_sql(f, where_params) for f in req.filters]
+    where_params: List[Any] = []
+    clauses = [_build_filter_sql(f, where_params) for f in req.filters or []]
+    count_parts = list(parts)
+    count_params = list(params)
+    if clauses:
+        count_parts.append("WHERE " + " AND ".join(clauses))
+        count_params.extend(where_params)
+    if token is not None:
+        predicate, predicate_params = keyset_predicate(keys, token["k"])
+        clauses.append(predicate)
+        where_params.extend(predicate_params)
+    if clauses:
         parts.append("WHERE " + " AND ".join(clauses))
         params.extend(where_params)
 
     # GROUP BY / HAVING
+    tail: List[str] = []
+    tail_params: List[Any] = []
     if req.group_by:
-        parts.append("GROUP BY " + ", ".join([_q_ident(c) for c in req.group_by]))
+        tail.append("GROUP BY " + ", ".join([_q_ident(c) for c in req.group_by]))
     if req.having:
-        having_params: List[Any] = []
-        clauses = [_build_filter_sql(f, having_params) for f in req.having]
-        parts.append("HAVING " + " AND ".join(clauses))
-        params.extend(having_params)
+        clauses = [_build_filter_sql(f, tail_params) for f in req.having]
+        tail.append("HAVING " + " AND ".join(clauses))
+    parts.extend(tail)
+    params.extend(tail_params)
+    count_parts.extend(tail)
+    count_params.extend(tail_params)
 
     # ORDER BY
-    if req.order_by:
+    if keys:
+        parts.append("ORDER BY " + ", ".join([f"{expr} {direction} NULLS LAST" for expr, _t, direction in keys]))
+    elif req.order_by:
         parts.append(
             "ORDER BY " + ", ".join([f"{_q_ident(o.column)} {o.direction.upper()}" for o in req.order_by])
         )
 
-    # Base query (no LIMIT/OFFSET) for COUNT(*)
-    base_sql = " ".join(parts)
-    base_params = list(params)
-
     # Pagination
     parts.append("LIMIT ? OFFSET ?")
-    params.extend([req.limit, req.offset])
 
-    sql = " ".join(parts)
-    return sql, params, base_sql, base_params
+    return _SelectPlan(
+        sql=" ".join(parts),
+        params=params,
+        count_sql=f"SELECT COUNT(*) FROM ({' '.join(count_parts)}) AS subq",
+        count_params=count_params,
+        shape=shape,
+        cursor_columns=cursor_columns,
+        cursor_token=token,
+    )
+
 
 @router.post(
     "/tables/select",
@@ -482,19 +432,211 @@ def _build_select(req: TableSelectRequest) -> Tuple[str, List[Any], str, List[An
     summary="Execute a structured SELECT query",
     description="Builds and executes a SELECT query from structured parameters, with pagination metadata.",
     operation_id="select_delta_table",
+    responses=STREAMING_RESPONSES,
 )
-def select_table(req: TableSelectRequest) -> TableSelectResponse:
-    sql, params, base_sql, base_params = _build_select(req)
+@offload("query")
+def select_table(req: TableSelectRequest) -> Response:
+    catalog = get_catalog()
+    plan = _build_select(req, catalog)
+    if req.format == "json":
+        return cached_json_response("/tables/select", req, lambda: _select_page(req, plan, catalog))
 
     with duckdb_conn() as con:
-        # total_count
-        count_sql = f"SELECT COUNT(*) FROM ({base_sql}) AS subq"
-        total_count = int(con.execute(count_sql, base_params).fetchone()[0])
-
-        rows = con.execute(sql, params).fetchall()
+        total_count, _ = _select_total_count(con, req, plan, catalog.generation)
+    offset = plan.cursor_token["o"] if plan.cursor_token else req.offset
+    headers = {}
+    if total_count is not None:
+        headers["X-Total-Count"] = str(total_count)
+        headers["X-Has-More"] = str((offset + req.limit) < total_count).lower()
+    return stream_query(req.format, plan.sql, plan.params + [req.limit, req.offset], headers=headers)
+
+def _select_page(req: TableSelectRequest, plan: _SelectPlan, catalog: Catalog) -> TableSelectResponse:
+    token = plan.cursor_token
+    offset = token["o"] if token else req.offset
+    with duckdb_conn() as con:
+        total_count, estimated = _select_total_count(con, req, plan, catalog.generation)
+        # One extra row tells us whether another page exists without needing the count
+        params = plan.params + [req.limit + 1, req.offset]
+        with timed("duckdb", plan.sql, params):
+            rows = execute_prepared(con, plan.sql, params).fetchall()
         colnames = [d[0] for d in con.description]
 
+    has_more = len(rows) > req.limit
+    rows = rows[:req.limit]
+    record_rows(len(rows))
     data = [dict(zip(colnames, r)) for r in rows]
-    has_more = (req.offset + req.limit) < total_count
-    pagination = PaginationInfo(limit=req.limit, offset=req.offset, total_count=total_count, has_more=has_more)
-    return TableSelectResponse(data=data, pagination=pagination)
+    next_cursor = None
+    if plan.cursor_columns:
+        for row in data:
+            values = [row.pop(name) for name in plan.cursor_columns]
+        if has_more:
+            next_cursor = encode_cursor(plan.shape, values, offset + len(rows), total_count, estimated)
+    pagination = PaginationInfo(
+        limit=req.limit,
+        offset=offset,
+        total_count=total_count,
+        has_more=has_more,
+        total_count_estimated=estimated,
+        next_cursor=next_cursor,
+    )
+    return trusted(TableSelectResponse, data=data, pagination=pagination)
+
+def _select_total_count(
+    con: duckdb.DuckDBPyConnection,
+    req: TableSelectRequest,
+    plan: _SelectPlan,
+    generation: int | None,
+) -> Tuple[int | None, bool]:
+    """total_count for a select page and whether it is an estimate."""
+    if req.count_mode == "none":
+        return None, False
+    token = plan.cursor_token
+    if token is not None and token.get("n") is not None:
+        # Counted once on the first page and carried along in the cursor
+        return int(token["n"]), bool(token.get("e"))
+    key = (get_settings().duckdb_path, generation, plan.count_sql, json.dumps(plan.count_params, sort_keys=True, default=str))
+    cached = _COUNT_CACHE.get(key)
+    if cached is not None:
+        return cached, False
+    if req.count_mode == "estimate":
+        with timed("duckdb"):
+            estimate = estimate_count(con, plan.count_sql, plan.count_params)
+        if estimate is not None:
+            return estimate, True
+    with timed("duckdb"):
+        count = int(execute_prepared(con, plan.count_sql, plan.count_params).fetchone()[0])
+    _COUNT_CACHE.put(key, count)
+    return count, False
+
+# ---- Batch key lookup (/tables/lookup) ----
+LOOKUP_KEY_COLUMN = "__lookup_key"
+
+@router.post(
+    "/tables/lookup",
+    response_model=TableLookupResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Fetch rows for many keys",
+    description="Returns the rows whose key column matches any of the given keys, grouped by key, in one query.",
+    operation_id="lookup_delta_table",
+)
+@offload("query")
+def lookup_table(req: TableLookupRequest) -> Response:
+    info = _require_table(get_catalog(), req.database, req.table)
+    return cached_json_response("/tables/lookup", req, lambda: _lookup_rows(req, info))
+
+def _lookup_rows(req: TableLookupRequest, info: TableInfo) -> TableLookupResponse:
+    type_map = info.column_types
+    for col in [req.key_column] + (req.columns or []):
+        if col not in type_map:
+            raise bad_request(f"Column [{col}] not found in table [{req.table}]")
+    cols = req.columns or info.columns
+    select_exprs = [_select_expr_for_column(req.table, c, None, type_map[c]) for c in cols]
+    key_expr = _q_table_col(req.table, req.key_column)
+    keys = list(dict.fromkeys(req.keys))
+    # One list parameter keeps the statement shape independent of the number of keys
+    sql = (
+        f"SELECT {key_expr} AS {_q_ident(LOOKUP_KEY_COLUMN)}, {', '.join(select_exprs)} "
+        f"FROM {_q_ident(req.table)} "
+        f"WHERE {key_expr} IN (SELECT UNNEST(CAST(? AS {type_map[req.key_column]}[])))"
+    )
+    with duckdb_conn() as con, timed("duckdb", sql, [keys]):
+        rows = con.execute(sql, [keys]).fetchall()
+        colnames = [d[0] for d in con.description]
+    record_rows(len(rows))
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        row = dict(zip(colnames, r))
+        results.setdefault(str(row.pop(LOOKUP_KEY_COLUMN)), []).append(row)
+    missing = [k for k in keys if str(k) not in results]
+    return trusted(TableLookupResponse, results=results, missing=missing)
+
+# ---- Precomputed table statistics (/tables/stats) ----
+@router.post(
+    "/tables/stats",
+    response_model=TableStatsResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get table statistics",
+    description="Row count and per-column null counts, distinct estimates, min/max and top values. "
+                "Computed once per snapshot and served from the stats cache afterwards.",
+    operation_id="get_table_stats",
+)
+@offload("query")
+def table_stats(req: TableStatsRequest) -> TableStatsResponse:
+    catalog = get_catalog()
+    info = _require_table(catalog, req.database, req.table)
+    store = get_table_stats_store()
+    stats = store.cached(catalog.generation, req.table) if catalog.generation is not None else None
+    if stats is None:
+        with duckdb_snapshot_conn() as (gen, con), timed("duckdb"):
+            stats = store.get(gen, con, req.table, info.column_types)
+    return TableStatsResponse.model_validate(stats)
+
+# ---- Name and description search (/search) ----
+@router.post(
+    "/search",
+    response_model=SearchResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Search object names and descriptions",
+    description="Ranked fuzzy matches of sdt_* object names (table, id, name) and of schema table/column "
+                "descriptions, from a trigram index built once per snapshot.",
+    operation_id="search_delta",
+)
+@offload("query")
+def search(req: SearchRequest) -> SearchResponse:
+    _require_enigma_coral(req.database)
+    catalog = get_catalog()
+    for table in req.tables or []:
+        if not catalog.has_table(table):
+            raise not_found(f"Table [{table}] not found in database [{req.database}]")
+    with timed("search"):
+        index = get_search_index()
+        hits = index.search(req.query, tables=req.tables, kinds=req.kinds, limit=req.limit, min_score=req.min_score)
+    record_rows(len(hits))
+    return SearchResponse.model_validate({"hits": hits})
+
+# ---- Lineage walks (/provenance/upstream, /provenance/downstream) ----
+def _walk_provenance(req: ProvenanceRequest, direction: str) -> ProvenanceResponse:
+    _require_table(get_catalog(), req.database, req.table)
+    graph = get_provenance_graph()
+    if graph is None:
+        raise not_found(f"Provenance link tables are not available in database [{req.database}]")
+    start = f"{req.table}:{req.id}"
+    with timed("duckdb"):
+        processes, depth_limited, truncated = graph.walk(start, direction, req.max_depth, req.max_processes)
+    record_rows(len(processes))
+    return ProvenanceResponse.model_validate(
+        {
+            "start": start,
+            "direction": direction,
+            "processes": processes,
+            "depth_limited": depth_limited,
+            "truncated": truncated,
+        }
+    )
+
+@router.post(
+    "/provenance/upstream",
+    response_model=ProvenanceResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Walk provenance upstream",
+    description="Processes that produced the object, the processes that produced their inputs, and so on, "
+                "up to max_depth levels, from sys_process_input/sys_process_output.",
+    operation_id="provenance_upstream",
+)
+@offload("query")
+def provenance_upstream(req: ProvenanceRequest) -> ProvenanceResponse:
+    return _walk_provenance(req, "upstream")
+
+@router.post(
+    "/provenance/downstream",
+    response_model=ProvenanceResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Walk provenance downstream",
+    description="Processes that used the object as input, the processes that used their outputs, and so on, "
+                "up to max_depth levels, from sys_process_input/sys_process_output.",
+    operation_id="provenance_downstream",
+)
+@offload("query")
+def provenance_downstream(req: ProvenanceRequest) -> ProvenanceResponse:
+    return _walk_provenance(req, "downstream")
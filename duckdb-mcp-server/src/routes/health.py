@@ -1,7 +1,12 @@
 import time
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 
-from src.db import duckdb_conn
+from src.db import duckdb_conn, get_pool
+from src.executor import get_executor
+from src.metrics import get_metrics, render_gauges
+from src.prepared import get_prepared_statements
+from src.result_cache import get_result_cache
 from src.service.models import ComponentHealth, DeepHealthResponse
 
 router = APIRouter(tags=["health"])
@@ -32,7 +37,64 @@ async def health_check() -> DeepHealthResponse:
             con.execute("SELECT 1").fetchone()
         return True
 
-    components = [_timed("duckdb", check_duckdb)]
+    async def check_duckdb_on_lane():
+        # Same lane as the metadata endpoints: a saturated query lane does not block /health
+        start = time.time()
+        try:
+            return await get_executor().lane("metadata").run(_timed, "duckdb", check_duckdb)
+        except Exception as e:
+            latency_ms = (time.time() - start) * 1000
+            detail = getattr(e, "detail", None) or str(e)
+            return ComponentHealth(
+                name="duckdb", status="unhealthy", message=str(detail)[:200], latency_ms=round(latency_ms, 2)
+            )
+
+    def check_executor():
+        stats = get_executor().stats()
+        full = [name for name, lane in stats.items() if lane["queued"] >= lane["max_queue"]]
+        if full:
+            return f"queue full: {', '.join(full)}"
+        return True
+
+    def check_pool():
+        stats = get_pool().stats()
+        if stats["in_use"] >= stats["size"]:
+            return f"all {stats['size']} connections in use"
+        return True
+
+    duckdb = await check_duckdb_on_lane()
+    executor = _timed("duckdb_executor", check_executor)
+    executor.details = get_executor().stats()
+    result_cache = ComponentHealth(name="result_cache", status="healthy", details=get_result_cache().stats())
+    prepared = ComponentHealth(name="prepared_statements", status="healthy", details=get_prepared_statements().stats())
+    components = [duckdb, _timed("duckdb_pool", check_pool), executor, result_cache, prepared]
     statuses = [c.status for c in components]
     overall = "healthy" if all(s == "healthy" for s in statuses) else ("degraded" if any(s == "degraded" for s in statuses) else "unhealthy")
     return DeepHealthResponse(status=overall, components=components)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    description="Request latency, phase, row and size histograms per route and table, plus executor, "
+                "pool and cache state, in the Prometheus text format.",
+)
+def metrics() -> PlainTextResponse:
+    lines = get_metrics().render()
+    lanes = get_executor().stats()
+    for key, help_text in (("queued", "Requests waiting for a worker."), ("running", "Requests running.")):
+        lines += render_gauges(
+            f"duckdb_mcp_executor_{key}", help_text, ("lane",), {(name,): s[key] for name, s in lanes.items()}
+        )
+    pool = get_pool().stats()
+    lines += render_gauges("duckdb_mcp_pool_connections", "Pooled cursors by state.", ("state",),
+                           {("in_use",): pool["in_use"], ("idle",): pool["idle"]})
+    lines += render_gauges("duckdb_mcp_snapshot_generation", "Handle number of the served snapshot.", (),
+                           {(): pool["generation"]})
+    cache = get_result_cache().stats()
+    lines += render_gauges("duckdb_mcp_result_cache_events", "Result cache lookups and evictions since startup.",
+                           ("event",), {(k,): cache[k] for k in ("hits", "misses", "evictions", "invalidations")})
+    lines += render_gauges("duckdb_mcp_result_cache_bytes", "Bytes held by the result cache.", (),
+                           {(): cache["bytes"]})
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
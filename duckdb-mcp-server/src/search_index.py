@@ -0,0 +1,281 @@
+"""Trigram search over object names and schema descriptions, one index per snapshot.
+
+Every ``sdt_<x>`` table with an ``sdt_<x>_name`` column contributes one document per
+row; the schema markdown contributes one document per table and column description.
+Documents and their trigrams live in a private in-memory DuckDB database, so a lookup
+is a filtered scan of a sorted gram column instead of a LIKE over every table.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Set
+
+import duckdb
+
+from src.catalog import load_schema_markdown
+from src.db import background_cursor, duckdb_snapshot_conn, get_pool
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Description hits are ranked below close name matches
+DESCRIPTION_WEIGHT = 0.8
+
+_NAME_COLUMNS_SQL = """
+SELECT c.table_name,
+       MAX(CASE WHEN c.column_name = c.table_name || '_id' THEN c.column_name END) AS id_column
+FROM duckdb_columns() c
+JOIN (
+  SELECT database_name, schema_name, table_name FROM duckdb_tables() WHERE NOT internal
+  UNION ALL
+  SELECT database_name, schema_name, view_name FROM duckdb_views() WHERE NOT internal
+) t
+  ON t.database_name = c.database_name AND t.schema_name = c.schema_name AND t.table_name = c.table_name
+WHERE c.database_name = current_database() AND c.schema_name = 'main' AND c.table_name LIKE 'sdt\\_%' ESCAPE '\\'
+GROUP BY c.table_name
+HAVING COUNT(*) FILTER (WHERE c.column_name = c.table_name || '_name') > 0
+ORDER BY c.table_name
+"""
+
+_SERVED_TABLES_SQL = """
+SELECT table_name FROM duckdb_tables() WHERE NOT internal
+UNION ALL
+SELECT view_name FROM duckdb_views() WHERE NOT internal
+"""
+
+_SCHEMA_SQL = """
+CREATE TABLE docs (
+  doc INTEGER, kind VARCHAR, tbl VARCHAR, id VARCHAR, name VARCHAR, description VARCHAR, text VARCHAR
+);
+CREATE TABLE staged (kind VARCHAR, tbl VARCHAR, id VARCHAR, name VARCHAR, description VARCHAR, text VARCHAR);
+"""
+
+# Same padding as pg_trgm: two leading blanks and one trailing, so short words still
+# produce grams and prefixes weigh more than the middle of a word
+_GRAMS_SQL = "list_distinct([substr(p, i, 3) FOR i IN range(1, length(p) - 1)])"
+
+_BUILD_SQL = f"""
+INSERT INTO docs SELECT row_number() OVER () - 1, kind, tbl, id, name, description, lower(text) FROM staged;
+DROP TABLE staged;
+CREATE TABLE doc_grams AS
+SELECT doc, {_GRAMS_SQL} AS grams FROM (SELECT doc, '  ' || text || ' ' AS p FROM docs);
+CREATE TABLE grams AS
+SELECT unnest(grams) AS gram, doc FROM doc_grams ORDER BY gram;
+ALTER TABLE docs ADD COLUMN gram_count INTEGER;
+UPDATE docs SET gram_count = len(g.grams) FROM doc_grams g WHERE docs.doc = g.doc;
+DROP TABLE doc_grams;
+"""
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def query_grams(text: str) -> Set[str]:
+    padded = "  " + text.lower() + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Immutable trigram index for one database generation.
+
+    Replaced indexes are not closed: in-flight searches may still hold a cursor on
+    them, and the in-memory database is freed with the last reference.
+    """
+
+    def __init__(self, generation: int | None, con: duckdb.DuckDBPyConnection, build_seconds: float) -> None:
+        self.generation = generation
+        self._con = con
+        self.build_seconds = build_seconds
+        self.tables = sorted(r[0] for r in con.execute("SELECT DISTINCT tbl FROM docs").fetchall())
+        self.documents = con.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    @classmethod
+    def build(
+        cls,
+        source: duckdb.DuckDBPyConnection,
+        generation: int | None,
+        schema_md: Dict[str, Dict[str, Any]],
+    ) -> "SearchIndex":
+        started = time.monotonic()
+        con = duckdb.connect(":memory:")
+        try:
+            con.execute(_SCHEMA_SQL)
+            for table, id_column in source.execute(_NAME_COLUMNS_SQL).fetchall():
+                name = _q(f"{table}_name")
+                id_expr = f"CAST({_q(id_column)} AS VARCHAR)" if id_column else "NULL"
+                batch = source.execute(
+                    f"SELECT {id_expr} AS id, CAST({name} AS VARCHAR) AS name "
+                    f"FROM {_q(table)} WHERE {name} IS NOT NULL"
+                ).fetch_arrow_table()
+                con.register("object_names", batch)
+                con.execute(
+                    "INSERT INTO staged SELECT 'object', ?, id, name, NULL, name FROM object_names", [table]
+                )
+                con.unregister("object_names")
+            served = {r[0] for r in source.execute(_SERVED_TABLES_SQL).fetchall()}
+            rows = list(_description_rows(schema_md, served))
+            if rows:
+                con.executemany("INSERT INTO staged VALUES (?, ?, NULL, ?, ?, ?)", rows)
+            con.execute(_BUILD_SQL)
+        except BaseException:
+            con.close()
+            raise
+        return cls(generation, con, time.monotonic() - started)
+
+    def search(
+        self,
+        query: str,
+        tables: Iterable[str] | None = None,
+        kinds: Iterable[str] | None = None,
+        limit: int = 20,
+        min_score: float = 0.3,
+    ) -> List[Dict[str, Any]]:
+        text = " ".join(query.lower().split())
+        if not text:
+            return []
+        grams = sorted(query_grams(text))
+        n = len(grams)
+        params: List[Any] = [text, *grams]
+        filters = ""
+        for column, values in (("tbl", tables), ("kind", kinds)):
+            if values is not None:
+                values = list(values)
+                filters += f" AND d.{column} IN ({', '.join('?' * len(values))})" if values else " AND FALSE"
+                params += values
+        # No hit can reach min_score with fewer shared grams than this, except a substring
+        # match, which may miss only the query's three padded grams
+        shared = max(1, min(math.ceil(min_score * n - 1e-9), n - 3))
+        params += [min_score, limit]
+        # Names: Jaccard similarity of the gram sets, lifted for prefix and substring
+        # matches (an exact match scores 1). Descriptions: share of the query's grams found.
+        sql = f"""
+        WITH q AS (SELECT ?::VARCHAR AS text),
+        hits AS (
+          SELECT doc, COUNT(*) AS shared FROM grams
+          WHERE gram IN ({', '.join('?' * n)})
+          GROUP BY doc HAVING COUNT(*) >= {shared}
+        ),
+        scored AS (
+          SELECT d.kind, d.tbl, d.id, d.name, d.description,
+            CASE
+              WHEN d.kind <> 'object' THEN {DESCRIPTION_WEIGHT} * h.shared / {n}
+              WHEN d.text = q.text THEN 1.0
+              WHEN starts_with(d.text, q.text) THEN 0.6 + 0.4 * h.shared / ({n} + d.gram_count - h.shared)
+              WHEN contains(d.text, q.text) THEN 0.5 + 0.5 * h.shared / ({n} + d.gram_count - h.shared)
+              ELSE h.shared / ({n} + d.gram_count - h.shared)
+            END AS score
+          FROM hits h JOIN docs d USING (doc), q
+          WHERE TRUE{filters}
+        )
+        SELECT kind, tbl, id, name, description, score FROM scored WHERE score >= ?
+        ORDER BY score DESC, kind <> 'object', tbl, name, id
+        LIMIT ?
+        """
+        rows = self._con.cursor().execute(sql, params).fetchall()
+        return [
+            {
+                "kind": kind,
+                "table": tbl,
+                "id": id_,
+                "name": name,
+                "description": description,
+                "score": round(float(score), 4),
+            }
+            for kind, tbl, id_, name, description, score in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "documents": self.documents,
+            "tables": len(self.tables),
+            "build_seconds": round(self.build_seconds, 3),
+        }
+
+    def close(self) -> None:
+        self._con.close()
+
+
+def _description_rows(schema_md: Dict[str, Dict[str, Any]], served: Set[str]):
+    for table, entry in sorted(schema_md.items()):
+        if table not in served:
+            continue
+        if entry.get("description"):
+            yield ("table", table, table, entry["description"], f"{table} {entry['description']}")
+        for column, details in entry.get("columns", {}).items():
+            comment = details.get("comment")
+            if comment:
+                yield ("column", table, column, comment, f"{column} {comment}")
+
+
+_INDEX: SearchIndex | None = None
+# Built while a new snapshot is warmed, before requests are routed to it
+_PRIMED: SearchIndex | None = None
+_INDEX_LOCK = threading.Lock()
+
+
+def _build_for(generation: int | None, con: duckdb.DuckDBPyConnection) -> SearchIndex:
+    index = SearchIndex.build(con, generation, load_schema_markdown(get_settings().schema_markdown_path))
+    logger.info(
+        "Search index ready: %d documents from %d tables (generation %s, %.1fs)",
+        index.documents, len(index.tables), generation, index.build_seconds,
+    )
+    return index
+
+
+def get_search_index() -> SearchIndex:
+    """Return the index for the currently open database, rebuilding it after a switch."""
+    global _INDEX, _PRIMED
+    generation = get_pool().generation()
+    index = _INDEX
+    if index is not None and (generation is None or index.generation == generation):
+        return index
+    with _INDEX_LOCK:
+        if _INDEX is None or _INDEX.generation != generation:
+            if _PRIMED is not None and _PRIMED.generation == generation:
+                _INDEX, _PRIMED = _PRIMED, None
+            else:
+                with duckdb_snapshot_conn() as (gen, con):
+                    _INDEX = _build_for(gen.number, con)
+        return _INDEX
+
+
+def prime_search_index(generation: int, con: duckdb.DuckDBPyConnection) -> None:
+    """DuckDBPool warmer: index a snapshot that is about to go live."""
+    global _PRIMED
+    primed = _build_for(generation, con)
+    with _INDEX_LOCK:
+        _PRIMED = primed
+
+
+def start_search_index_build() -> None:
+    """Build the index for the open snapshot in the background."""
+
+    def run() -> None:
+        try:
+            with background_cursor():
+                get_search_index()
+        except Exception as e:
+            logger.warning("Search index build failed: %s", e)
+
+    threading.Thread(target=run, name="duckdb-search-index", daemon=True).start()
+
+
+def search_index_stats() -> Dict[str, Any] | None:
+    index = _INDEX
+    return index.stats() if index is not None else None
+
+
+def clear_search_index() -> None:
+    global _INDEX, _PRIMED
+    with _INDEX_LOCK:
+        for index in (_INDEX, _PRIMED):
+            if index is not None:
+                index.close()
+        _INDEX = None
+        _PRIMED = None
@@ -0,0 +1,135 @@
+"""Row, byte and time budgets for JSON /tables/query results.
+
+The row budget is pushed into DuckDB as a LIMIT one row past the budget, so a
+runaway join stops producing rows early and the extra row shows the result was
+cut. The time budget interrupts the running statement. Rows are serialized batch
+by batch as they are fetched, so the byte budget is checked against the bytes
+that will be sent, and nothing beyond it is kept in memory.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, List
+
+import duckdb
+import pydantic_core
+
+from src.metrics import timed
+from src.service.errors import gateway_timeout
+from src.service.streaming import dedupe_column_names
+
+# Response header naming the budget that cut the result short
+TRUNCATED_HEADER = "X-Query-Truncated"
+FETCH_BATCH_ROWS = 2048
+
+_PREFIX = b'{"result":['
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """Per-request limits; 0 disables a limit."""
+
+    max_rows: int = 0
+    max_bytes: int = 0
+    max_seconds: float = 0.0
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "QueryBudget":
+        return cls(settings.query_max_rows, settings.query_max_bytes, settings.query_max_seconds)
+
+
+@dataclass
+class BudgetedResult:
+    body: bytes
+    rows: int
+    # "rows", "bytes" or "time" when a budget cut the result short
+    truncated: str | None = None
+
+
+class _Deadline:
+    """Interrupts the statement running on ``con`` once ``seconds`` have passed."""
+
+    def __init__(self, con: duckdb.DuckDBPyConnection, seconds: float) -> None:
+        self._con = con
+        self._lock = threading.Lock()
+        self._active = True
+        self.expired = False
+        self._timer = threading.Timer(seconds, self._expire) if seconds > 0 else None
+
+    def _expire(self) -> None:
+        with self._lock:
+            if self._active:
+                self.expired = True
+                self._con.interrupt()
+
+    def __enter__(self) -> "_Deadline":
+        if self._timer is not None:
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        with self._lock:
+            self._active = False
+        if self._timer is not None:
+            self._timer.cancel()
+
+
+def _rows_json(colnames: List[str], rows: List[tuple]) -> bytes:
+    # Same encoding as dump_json on the response model, without the enclosing brackets
+    return pydantic_core.to_json([dict(zip(colnames, r)) for r in rows], inf_nan_mode="null")[1:-1]
+
+
+def run_budgeted_query(con: duckdb.DuckDBPyConnection, query: str, budget: QueryBudget) -> BudgetedResult:
+    """Run a validated SELECT and serialize its rows as a TableQueryResponse body within ``budget``."""
+    relation = con.sql(query)
+    if budget.max_rows:
+        relation = relation.limit(budget.max_rows + 1)
+    colnames = dedupe_column_names(relation.columns)
+    parts: List[bytes] = []
+    size = len(_PREFIX) + 2
+    rows = 0
+    truncated: str | None = None
+    with _Deadline(con, budget.max_seconds) as deadline:
+        try:
+            while truncated is None:
+                with timed("duckdb", query if rows == 0 else None):
+                    batch = relation.fetchmany(FETCH_BATCH_ROWS)
+                if not batch:
+                    break
+                if budget.max_rows and rows + len(batch) > budget.max_rows:
+                    batch = batch[: budget.max_rows - rows]
+                    truncated = "rows"
+                with timed("serialize"):
+                    chunk = _rows_json(colnames, batch)
+                    if budget.max_bytes and size + len(chunk) + 1 > budget.max_bytes:
+                        # Keep the rows that still fit, one at a time
+                        truncated = "bytes"
+                        kept = []
+                        for row in batch:
+                            encoded = _rows_json(colnames, [row])
+                            if size + len(encoded) + 1 > budget.max_bytes:
+                                break
+                            kept.append(encoded)
+                            size += len(encoded) + 1
+                        batch = batch[: len(kept)]
+                        chunk = b",".join(kept)
+                    else:
+                        size += len(chunk) + 1
+                if batch:
+                    parts.append(chunk)
+                    rows += len(batch)
+        except duckdb.InterruptException:
+            if not deadline.expired:
+                raise
+            if rows == 0:
+                raise gateway_timeout(
+                    f"Query exceeded the {budget.max_seconds:g}s time budget and was interrupted"
+                )
+            truncated = "time"
+    body = _PREFIX + b",".join(parts) + b"]"
+    if truncated is not None:
+        body += b',"truncated":true,"truncated_reason":"' + truncated.encode("ascii") + b'"'
+    return BudgetedResult(body + b"}", rows, truncated)
@@ -5,5 +5,17 @@ def bad_request(msg: str) -> HTTPException:
     return HTTPException(status_code=400, detail=msg)
 
 
+def forbidden(msg: str) -> HTTPException:
+    return HTTPException(status_code=403, detail=msg)
+
+
 def not_found(msg: str) -> HTTPException:
     return HTTPException(status_code=404, detail=msg)
+
+
+def service_unavailable(msg: str) -> HTTPException:
+    return HTTPException(status_code=503, detail=msg)
+
+
+def gateway_timeout(msg: str) -> HTTPException:
+    return HTTPException(status_code=504, detail=msg)
@@ -13,6 +13,7 @@ class ComponentHealth(BaseModel):
     status: Annotated[Literal["healthy", "unhealthy", "degraded"], Field(description="Component health status")]
     message: Annotated[str | None, Field(description="Optional status message")] = None
     latency_ms: Annotated[float | None, Field(description="Response time in milliseconds")] = None
+    details: Annotated[Dict[str, Any] | None, Field(description="Component-specific counters")] = None
 
 
 class DeepHealthResponse(BaseModel):
@@ -62,12 +63,25 @@ class DatabaseStructureResponse(BaseModel):
     structure: Annotated[Dict[str, Any], Field(description="Database structure with tables and optionally schemas")]
 
 
+ResponseFormat = Literal["json", "ndjson", "arrow"]
+
+
 class TableQueryRequest(BaseModel):
     query: Annotated[str, Field(description="SQL query to execute (SELECT-only)")]
+    format: Annotated[
+        ResponseFormat,
+        Field(description="Response format: 'json' (default), or stream rows as 'ndjson' or an 'arrow' IPC stream"),
+    ] = "json"
 
 
 class TableQueryResponse(BaseModel):
     result: Annotated[List[Any], Field(description="List of rows returned by the query, each as a dictionary")]
+    truncated: Annotated[
+        bool | None, Field(description="Present (true) only when a row, byte or time budget cut the result short")
+    ] = None
+    truncated_reason: Annotated[
+        Literal["rows", "bytes", "time"] | None, Field(description="Which budget cut the result short")
+    ] = None
 
 
 class TableCountRequest(BaseModel):
@@ -129,8 +143,15 @@ class OrderBySpec(BaseModel):
 class PaginationInfo(BaseModel):
     limit: Annotated[int, Field(description="Rows requested")]
     offset: Annotated[int, Field(description="Rows skipped")]
-    total_count: Annotated[int, Field(description="Total matching rows")]
+    total_count: Annotated[int | None, Field(description="Total matching rows (null when count_mode is 'none')")]
     has_more: Annotated[bool, Field(description="More rows beyond this page")]
+    total_count_estimated: Annotated[
+        bool, Field(description="True when total_count is an optimizer estimate")
+    ] = False
+    next_cursor: Annotated[
+        str | None,
+        Field(description="Opaque token for the next page; pass it back as 'cursor' instead of increasing offset"),
+    ] = None
 
 
 class TableSelectRequest(BaseModel):
@@ -146,8 +167,146 @@ class TableSelectRequest(BaseModel):
     order_by: Annotated[List[OrderBySpec] | None, Field(description="ORDER BY")] = None
     limit: Annotated[int, Field(description="LIMIT", gt=0, le=10000)] = 100
     offset: Annotated[int, Field(description="OFFSET", ge=0)] = 0
+    cursor: Annotated[
+        str | None, Field(description="Continuation token from pagination.next_cursor (keyset pagination)")
+    ] = None
+    pagination_mode: Annotated[
+        Literal["offset", "cursor"],
+        Field(description="'cursor' orders by the table's *_id column when order_by is not given "
+                          "and returns next_cursor tokens (falls back to offset paging for "
+                          "aggregations, GROUP BY or DISTINCT)"),
+    ] = "offset"
+    count_mode: Annotated[
+        Literal["exact", "estimate", "none"],
+        Field(description="How total_count is computed: exact (cached per query), optimizer estimate, or skipped"),
+    ] = "exact"
+    format: Annotated[
+        ResponseFormat,
+        Field(description="Response format: 'json' (default), or stream rows as 'ndjson' or an 'arrow' IPC stream "
+                          "with pagination in X-Total-Count / X-Has-More headers"),
+    ] = "json"
 
 
 class TableSelectResponse(BaseModel):
     data: Annotated[List[Dict[str, Any]], Field(description="Rows")]
     pagination: Annotated[PaginationInfo, Field(description="Pagination metadata")]
+
+
+MAX_LOOKUP_KEYS = 10000
+
+
+class TableLookupRequest(BaseModel):
+    database: Annotated[str, Field(description="Name of the database containing the table")]
+    table: Annotated[str, Field(description="Table to read")]
+    key_column: Annotated[str, Field(description="Column matched against keys, e.g. sdt_reads_id")]
+    keys: Annotated[
+        List[Any],
+        Field(description="Values to look up (duplicates are ignored)", min_length=1, max_length=MAX_LOOKUP_KEYS),
+    ]
+    columns: Annotated[List[str] | None, Field(description="Columns to return (None => all)")] = None
+
+
+class TableLookupResponse(BaseModel):
+    results: Annotated[
+        Dict[str, List[Dict[str, Any]]],
+        Field(description="Matching rows grouped by key (keys rendered as strings)"),
+    ]
+    missing: Annotated[List[Any], Field(description="Requested keys with no matching row")]
+
+
+class TableStatsRequest(BaseModel):
+    database: Annotated[str, Field(description="Name of the database containing the table")]
+    table: Annotated[str, Field(description="Table to describe")]
+
+
+class ColumnStats(BaseModel):
+    name: Annotated[str, Field(description="Column name")]
+    type: Annotated[str, Field(description="DuckDB type")]
+    null_count: Annotated[int, Field(description="Rows where the column is NULL")]
+    distinct_estimate: Annotated[int, Field(description="Approximate distinct values (HyperLogLog)")]
+    min: Annotated[Any, Field(description="Smallest value (None for nested/binary columns)")] = None
+    max: Annotated[Any, Field(description="Largest value (None for nested/binary columns)")] = None
+    top_values: Annotated[List[Any], Field(description="Most frequent values, approximate, most frequent first")] = []
+
+
+class TableStatsResponse(BaseModel):
+    table: Annotated[str, Field(description="Table name")]
+    row_count: Annotated[int, Field(description="Total number of rows in the table")]
+    columns: Annotated[List[ColumnStats], Field(description="Per-column statistics, in table order")]
+    computed_at: Annotated[str, Field(description="When the statistics were computed (UTC, ISO 8601)")]
+
+
+class SearchRequest(BaseModel):
+    database: Annotated[str, Field(description="Name of the database to search")]
+    query: Annotated[str, Field(description="Name or words to look for (case-insensitive, typos tolerated)",
+                                min_length=1, max_length=200)]
+    tables: Annotated[
+        List[str] | None,
+        Field(description="Only return hits from these tables, e.g. ['sdt_strain'] (None => all)"),
+    ] = None
+    kinds: Annotated[
+        List[Literal["object", "table", "column"]] | None,
+        Field(description="object: sdt_* rows by name; table/column: schema descriptions (None => all)"),
+    ] = None
+    limit: Annotated[int, Field(description="Maximum number of hits", ge=1, le=500)] = 20
+    min_score: Annotated[float, Field(description="Drop hits scoring below this (0-1)", ge=0, le=1)] = 0.3
+
+
+class SearchHit(BaseModel):
+    kind: Annotated[Literal["object", "table", "column"], Field(description="What matched")]
+    table: Annotated[str, Field(description="Table the hit belongs to")]
+    id: Annotated[str | None, Field(description="Row id ({table}_id) for object hits")] = None
+    name: Annotated[str, Field(description="Object name, or the table/column name for description hits")]
+    description: Annotated[str | None, Field(description="Schema description for table/column hits")] = None
+    score: Annotated[float, Field(description="1 for an exact name match; higher is better")]
+
+
+class SearchResponse(BaseModel):
+    hits: Annotated[List[SearchHit], Field(description="Hits, best first")]
+
+
+class ProvenanceRequest(BaseModel):
+    database: Annotated[str, Field(description="Name of the database containing the object")]
+    table: Annotated[str, Field(description="Table of the start object, e.g. sdt_assembly")]
+    id: Annotated[str, Field(description="Id of the start object, e.g. Assembly0000001")]
+    max_depth: Annotated[int, Field(description="Process levels to follow from the start object", ge=1, le=200)] = 50
+    max_processes: Annotated[
+        int, Field(description="Maximum number of processes returned (nearest first)", ge=1, le=100000)
+    ] = 10000
+
+
+class ProvenanceProcess(BaseModel):
+    id: Annotated[str, Field(description="sys_process_id")]
+    depth: Annotated[int, Field(description="Process levels between the start object and this process (1 = direct)")]
+    process_term_name: Annotated[str | None, Field(description="Process type")] = None
+    person_term_name: Annotated[str | None, Field(description="Person or lab that performed the process")] = None
+    protocol: Annotated[str | None, Field(description="Protocol name")] = None
+    date_end: Annotated[str | None, Field(description="End date (YYYY[-MM[-DD]])")] = None
+    inputs: Annotated[List[str], Field(description="Input objects as <table>:<id> tokens")]
+    outputs: Annotated[List[str], Field(description="Output objects as <table>:<id> tokens")]
+
+
+class ProvenanceResponse(BaseModel):
+    start: Annotated[str, Field(description="Start object as a <table>:<id> token")]
+    direction: Annotated[Literal["upstream", "downstream"], Field(description="Walk direction")]
+    processes: Annotated[List[ProvenanceProcess], Field(description="Processes in the lineage, nearest first")]
+    depth_limited: Annotated[bool, Field(description="True when processes exist beyond max_depth")]
+    truncated: Annotated[bool, Field(description="True when more than max_processes processes were reached")]
+
+
+class SnapshotReloadRequest(BaseModel):
+    path: Annotated[
+        str | None,
+        Field(description="DuckDB file (or Parquet snapshot directory in Parquet mode) to switch to; "
+                          "None reopens the configured path"),
+    ] = None
+
+
+class SnapshotResponse(BaseModel):
+    path: Annotated[str, Field(description="Configured snapshot path (file, symlink or Parquet manifest)")]
+    open_path: Annotated[str | None, Field(description="File behind the handle serving new requests")] = None
+    mode: Annotated[Literal["duckdb", "parquet"], Field(description="Storage backend")]
+    generation: Annotated[int | None, Field(description="Handle number; increases with every switch")] = None
+    retiring: Annotated[int, Field(description="Previous handles still finishing in-flight requests")]
+    reconnects: Annotated[int, Field(description="Snapshot switches since startup")]
+    last_switch_ms: Annotated[float | None, Field(description="Time spent opening and warming the last switch")] = None
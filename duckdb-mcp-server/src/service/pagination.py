@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+
+import duckdb
+import pydantic_core
+
+from src.service.errors import bad_request
+
+# (quoted column expression, DuckDB type, "ASC" | "DESC")
+KeyColumn = Tuple[str, str, str]
+
+CURSOR_VERSION = 1
+
+
+def query_shape(payload: Dict[str, Any]) -> str:
+    """Digest of a select request minus its paging fields; binds a cursor to one query."""
+    raw = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def encode_cursor(
+    shape: str,
+    values: Sequence[Any],
+    offset: int,
+    total_count: int | None,
+    count_estimated: bool,
+) -> str:
+    token = {
+        "v": CURSOR_VERSION,
+        "q": shape,
+        "k": pydantic_core.to_jsonable_python(list(values)),
+        "o": offset,
+        "n": total_count,
+        "e": count_estimated,
+    }
+    raw = json.dumps(token, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, shape: str, key_count: int) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        token = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise bad_request("Invalid cursor")
+    if not isinstance(token, dict) or token.get("v") != CURSOR_VERSION:
+        raise bad_request("Invalid cursor")
+    if token.get("q") != shape:
+        raise bad_request("Cursor does not belong to this query")
+    if not isinstance(token.get("k"), list) or len(token["k"]) != key_count:
+        raise bad_request("Invalid cursor")
+    return token
+
+
+def keyset_predicate(keys: Sequence[KeyColumn], values: Sequence[Any]) -> Tuple[str, List[Any]]:
+    """WHERE clause selecting rows strictly after ``values`` in ``ORDER BY keys NULLS LAST``."""
+    params: List[Any] = []
+    branches: List[str] = []
+    prefix: List[str] = []
+    prefix_params: List[Any] = []
+    for (expr, type_name, direction), value in zip(keys, values):
+        if value is not None:
+            op = ">" if direction == "ASC" else "<"
+            # NULLs sort last, so they always come after a non-NULL value
+            branches.append(" AND ".join(prefix + [f"({expr} {op} CAST(? AS {type_name}) OR {expr} IS NULL)"]))
+            params.extend(prefix_params + [value])
+            prefix.append(f"{expr} = CAST(? AS {type_name})")
+            prefix_params.append(value)
+        else:
+            prefix.append(f"{expr} IS NULL")
+    if not branches:
+        return "FALSE", []
+    return "(" + " OR ".join(f"({b})" for b in branches) + ")", params
+
+
+def estimate_count(con: duckdb.DuckDBPyConnection, sql: str, params: List[Any]) -> int | None:
+    """Optimizer row estimate for ``sql`` from EXPLAIN, without running the query."""
+    rows = con.execute(f"EXPLAIN (FORMAT JSON) {sql}", params).fetchall()
+    if not rows:
+        return None
+    try:
+        nodes = json.loads(rows[0][-1])
+    except ValueError:
+        return None
+    while nodes:
+        node = nodes[0]
+        estimate = (node.get("extra_info") or {}).get("Estimated Cardinality")
+        if estimate is not None:
+            try:
+                return int(estimate)
+            except (TypeError, ValueError):
+                return None
+        nodes = node.get("children") or []
+    return None
+
+
+class CountCache:
+    """Small LRU of exact COUNT(*) results keyed by database generation and base query."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> int | None:
+        with self._lock:
+            count = self._entries.get(key)
+            if count is not None:
+                self._entries.move_to_end(key)
+            return count
+
+    def put(self, key: Hashable, count: int) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = count
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Iterator
+
+import duckdb
+
+from src.service.errors import bad_request
+
+# ---- Safety rules (modeled after BERDL delta_service.py, enforced on DuckDB's parse tree) ----
+FORBIDDEN_SCHEMAS = {"information_schema", "pg_catalog"}
+FORBIDDEN_TABLE_PREFIXES = ("pg_",)
+# Table functions allowed in FROM; everything else (read_csv, query, duckdb_settings, ...) is rejected
+ALLOWED_TABLE_FUNCTIONS = {"range", "generate_series", "unnest"}
+FORBIDDEN_FUNCTIONS = {"getenv", "current_setting", "set_config"}
+# Replacement scans (FROM 'data.parquet') show up as base tables with path-like names
+TABLE_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+VALIDATION_CACHE_SIZE = 4096
+
+# json_serialize_sql only parses; a private in-memory database keeps it off the data pool.
+_PARSER = duckdb.connect(":memory:")
+_PARSER_LOCK = threading.Lock()
+
+
+def _nodes(tree: Any) -> Iterator[dict]:
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def _check_node(node: dict) -> str | None:
+    kind = node.get("type")
+    if kind == "BASE_TABLE":
+        schema = (node.get("schema_name") or "").lower()
+        catalog = (node.get("catalog_name") or "").lower()
+        table = node.get("table_name") or ""
+        if FORBIDDEN_SCHEMAS & {schema, catalog} or table.lower().startswith(FORBIDDEN_TABLE_PREFIXES):
+            return "Query references forbidden system schema"
+        if not TABLE_NAME_PATTERN.match(table):
+            return f"Query may only read tables (got {table!r})"
+    elif kind == "TABLE_FUNCTION":
+        name = (node.get("function") or {}).get("function_name", "")
+        if name.lower() not in ALLOWED_TABLE_FUNCTIONS:
+            return f"Table function {name}() is not allowed"
+    elif kind == "SHOW_REF":
+        return "Only SELECT statements are allowed (got DESCRIBE/SUMMARIZE)"
+    elif node.get("class") == "FUNCTION":
+        name = (node.get("function_name") or "").lower()
+        if (node.get("schema") or "").lower() in FORBIDDEN_SCHEMAS:
+            return "Query references forbidden system schema"
+        if name in FORBIDDEN_FUNCTIONS:
+            return f"Function {name}() is not allowed"
+    return None
+
+
+def _parse(query: str) -> tuple[dict | None, str | None]:
+    """The single statement of ``query`` and None, or None and why it was rejected."""
+    with _PARSER_LOCK:
+        serialized = _PARSER.execute("SELECT json_serialize_sql(?)", [query]).fetchone()[0]
+    tree = json.loads(serialized)
+    if tree.get("error"):
+        if tree.get("error_type") == "not implemented":
+            return None, "Only SELECT statements are allowed"
+        return None, f"Query is not valid SQL: {tree.get('error_message')}"
+    statements = tree.get("statements") or []
+    if len(statements) != 1:
+        return None, "Query must contain exactly one statement"
+    for node in _nodes(statements[0]):
+        problem = _check_node(node)
+        if problem:
+            return None, problem
+    return statements[0], None
+
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def validation_error(query: str) -> str | None:
+    """Why ``query`` is not an allowed single read-only SELECT, or None when it is."""
+    return _parse(query)[1]
+
+
+def check_query_is_valid_select_only(query: str) -> None:
+    problem = validation_error(query)
+    if problem:
+        raise bad_request(problem)
+
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def where_clause_error(table_sql: str, clause: str) -> str | None:
+    """Why ``clause`` is not a plain boolean filter on ``table_sql``, or None when it is.
+
+    The clause is parsed in place, as ``SELECT 1 FROM <table> WHERE (<clause>)``: it
+    must not close the parenthesis, comment out the rest, or add a LIMIT, ORDER BY,
+    GROUP BY, set operation or second statement.
+    """
+    statement, problem = _parse(f"SELECT 1 FROM {table_sql} WHERE ({clause})")
+    if problem:
+        return f"Invalid where_clause: {problem}"
+    node = statement.get("node") or {}
+    if (
+        node.get("type") != "SELECT_NODE"
+        or node.get("modifiers")
+        or (node.get("cte_map") or {}).get("map")
+        or node.get("group_expressions")
+        or node.get("group_sets")
+        or node.get("having") is not None
+        or node.get("qualify") is not None
+        or node.get("sample") is not None
+        or len(node.get("select_list") or []) != 1
+        or (node.get("from_table") or {}).get("type") != "BASE_TABLE"
+        or node.get("where_clause") is None
+    ):
+        return "Invalid where_clause: it must be a single filter expression"
+    return None
+
+
+def check_where_clause(table_sql: str, clause: str) -> None:
+    problem = where_clause_error(table_sql, clause)
+    if problem:
+        raise bad_request(problem)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import io
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, List
+
+import duckdb
+
+import pyarrow as pa
+import pydantic_core
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from src.db import duckdb_conn
+from src.executor import current_job, keep_lane_slot
+from src.metrics import record_rows, timed
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+STREAMING_RESPONSES: Dict[int | str, Dict[str, Any]] = {
+    200: {
+        "content": {
+            NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "description": "One JSON object per row"}},
+            ARROW_STREAM_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        },
+        "description": "Rows as JSON (default), newline-delimited JSON or an Arrow IPC stream",
+    }
+}
+
+
+def dedupe_column_names(names: List[str]) -> List[str]:
+    """Rename duplicate (case-insensitive) column names the way DuckDB's binder does: x, x_1, x_2, ..."""
+    seen: set[str] = set()
+    counters: Dict[str, int] = {}
+    result: List[str] = []
+    for name in names:
+        key = name.lower()
+        if key in seen:
+            n = counters.get(key, 1)
+            candidate = f"{name}_{n}"
+            while candidate.lower() in seen:
+                n += 1
+                candidate = f"{name}_{n}"
+            counters[key] = n + 1
+            name = candidate
+        seen.add(name.lower())
+        result.append(name)
+    return result
+
+
+def _normalized_schema(schema: pa.Schema) -> pa.Schema | None:
+    """Deduplicated names and FLOAT/HALF widened to DOUBLE, or None when nothing changes."""
+    names = dedupe_column_names(schema.names)
+    fields = []
+    for field, name in zip(schema, names):
+        if pa.types.is_float16(field.type) or pa.types.is_float32(field.type):
+            field = field.with_type(pa.float64())
+        fields.append(field.with_name(name))
+    normalized = pa.schema(fields, metadata=schema.metadata)
+    return None if normalized.equals(schema) else normalized
+
+
+def _normalized_reader(reader: pa.RecordBatchReader) -> pa.RecordBatchReader:
+    target = _normalized_schema(reader.schema)
+    if target is None:
+        return reader
+    batches = (batch.rename_columns(target.names).cast(target) for batch in reader)
+    return pa.RecordBatchReader.from_batches(target, batches)
+
+
+class StreamTimeout(RuntimeError):
+    pass
+
+
+class _StreamResources:
+    """The pooled cursor and query-lane slot behind one streamed response.
+
+    Released exactly once, by whichever comes first: the end of the body, the
+    response's background task (body never iterated), an abandoned job or the
+    request's deadline, which also interrupts a batch being fetched.
+    """
+
+    def __init__(self) -> None:
+        self.stack = ExitStack()
+        self.expired = False
+        self._closed = False
+        # Held while a batch is fetched; _state guards expired/_closed
+        self._lock = threading.Lock()
+        self._state = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            with self._state:
+                self._closed = True
+            self.stack.close()
+
+    def set_deadline(self, con: duckdb.DuckDBPyConnection, seconds: float) -> None:
+        timer = threading.Timer(max(0.0, seconds), self._expire, args=(con, seconds))
+        timer.daemon = True
+        timer.start()
+        self.stack.callback(timer.cancel)
+
+    def _expire(self, con: duckdb.DuckDBPyConnection, seconds: float) -> None:
+        with self._state:
+            if self._closed:
+                return
+            logger.warning("Streamed DuckDB response exceeded its %gs time limit; interrupting it", seconds)
+            self.expired = True
+            # Under _state: once closed, the cursor may already serve another request
+            try:
+                con.interrupt()
+            except duckdb.Error:
+                pass
+        # Waits for a fetch in progress to notice the interrupt
+        self.close()
+
+    @contextmanager
+    def fetching(self) -> Iterator[None]:
+        """Hold the cursor for one batch fetch; raises StreamTimeout once the deadline has passed."""
+        with self._lock:
+            if self.expired:
+                raise StreamTimeout("Streamed response exceeded its time limit and was interrupted")
+            try:
+                yield
+            except Exception as e:
+                if self.expired:
+                    raise StreamTimeout("Streamed response exceeded its time limit and was interrupted") from e
+                raise
+
+
+def _timed_batches(reader: pa.RecordBatchReader, resources: _StreamResources) -> Iterator[pa.RecordBatch]:
+    """Batches of ``reader``, counting fetch time and rows toward the request's metrics."""
+    batches = iter(reader)
+    while True:
+        with resources.fetching(), timed("duckdb"):
+            batch = next(batches, None)
+        if batch is None:
+            return
+        record_rows(batch.num_rows)
+        yield batch
+
+
+def _ndjson_chunks(reader: pa.RecordBatchReader, resources: _StreamResources) -> Iterator[bytes]:
+    for batch in _timed_batches(reader, resources):
+        # pydantic_core serializes Decimal, dates and NaN the same way the JSON responses do
+        with timed("serialize"):
+            chunk = b"".join(pydantic_core.to_json(row, inf_nan_mode="null") + b"\n" for row in batch.to_pylist())
+        yield chunk
+
+
+def _arrow_chunks(reader: pa.RecordBatchReader, resources: _StreamResources) -> Iterator[bytes]:
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, reader.schema) as writer:
+        yield drain()
+        for batch in _timed_batches(reader, resources):
+            with timed("serialize"):
+                writer.write_batch(batch)
+            yield drain()
+    yield drain()
+
+
+def stream_query(
+    fmt: str,
+    sql: str,
+    params: List[Any] | None = None,
+    headers: Dict[str, str] | None = None,
+    normalize: bool = False,
+) -> StreamingResponse:
+    """Execute ``sql`` and stream its record batches as NDJSON or Arrow IPC.
+
+    The query runs before the response starts, so SQL errors still surface as
+    HTTP errors; the pooled connection and the request's query-lane slot stay
+    held until the body has been sent (or the client has gone away), at most
+    until the request's lane timeout, which interrupts the fetch. With
+    ``normalize``, duplicate column names are made unique and FLOAT columns are
+    widened to DOUBLE batch by batch.
+    """
+    resources = _StreamResources()
+    stack = resources.stack
+    # Rejects the stream (503) before borrowing a cursor when too many are in progress
+    stack.callback(keep_lane_slot())
+    try:
+        con = stack.enter_context(duckdb_conn())
+        with timed("duckdb", sql, params):
+            con.execute(sql, params or [])
+        reader = con.fetch_record_batch(get_settings().stream_batch_rows)
+        if normalize:
+            reader = _normalized_reader(reader)
+    except BaseException:
+        resources.close()
+        raise
+    job = current_job()
+    if job is not None:
+        job.on_abandon(resources.close)
+    if job is not None and job.deadline is not None:
+        remaining = job.deadline - time.monotonic()
+    else:
+        remaining = get_settings().duckdb_query_timeout_seconds
+    resources.set_deadline(con, remaining)
+
+    chunks = _arrow_chunks if fmt == "arrow" else _ndjson_chunks
+    media_type = ARROW_STREAM_MEDIA_TYPE if fmt == "arrow" else NDJSON_MEDIA_TYPE
+
+    def body() -> Iterator[bytes]:
+        try:
+            yield from chunks(reader, resources)
+        finally:
+            resources.close()
+
+    return StreamingResponse(
+        body(), media_type=media_type, headers=headers, background=BackgroundTask(resources.close)
+    )
@@ -13,9 +13,101 @@ class Settings(BaseSettings):
     # Single “database” in BERDL terms
     berdl_database_name: str = Field(default="enigma_coral")
 
+    # Listen address for `python -m src.main`. With workers > 1, uvicorn forks that many
+    # processes; each opens the DuckDB file read-only, so they share the OS page cache.
+    host: str = Field(default="10.2.2.14")
+    port: int = Field(default=80, ge=0, le=65535)
+    workers: int = Field(default=1, ge=1)
+
     # DuckDB file path
     duckdb_path: str = Field(default="/scratch/jmc/linkml-coral/cdm_store_bricks_full.db")
 
+    # Serve a Parquet snapshot (src.parquet_store) instead of duckdb_path: each table is a
+    # view over the files listed in <dir>/manifest.json, reloaded when the manifest changes
+    duckdb_parquet_dir: str | None = Field(default=None)
+
+    # Connection pool: cursors share one read-only database handle per process. The default
+    # covers both lanes' workers plus one cursor for background threads (stats precompute,
+    # search index prebuild), which take turns on it
+    duckdb_pool_size: int = Field(default=9, ge=1)
+    duckdb_pool_acquire_timeout_seconds: float = Field(default=30.0, gt=0)
+    # Idle cursors older than this are probed with SELECT 1 before reuse
+    duckdb_pool_probe_idle_seconds: float = Field(default=60.0, ge=0)
+    # Per-process DuckDB threads and buffer memory (e.g. "4GB"). Unset: DuckDB's defaults
+    # with one worker; with several, the CPUs and half the RAM are split between them.
+    duckdb_threads: int | None = Field(default=None, ge=1)
+    duckdb_memory_limit: str | None = Field(default=None)
+    # How often to stat the DuckDB file to notice that it was replaced
+    duckdb_file_check_interval_seconds: float = Field(default=2.0, ge=0)
+
+    # Prepared /tables/select statements kept per pooled cursor, keyed by SQL shape; 0 disables
+    duckdb_prepared_statements_per_connection: int = Field(default=256, ge=0)
+
+    # Dedicated DuckDB worker lanes. Workers across both lanes should stay below
+    # duckdb_pool_size by one (the background cursor); requests beyond the queue limit get a 503 immediately.
+    # A streamed (ndjson/arrow) response holds its query worker slot and cursor until its
+    # body is sent; at most duckdb_query_max_streams do so at once, the rest get a 503.
+    duckdb_query_workers: int = Field(default=6, ge=1)
+    duckdb_query_max_streams: int = Field(default=4, ge=1)
+    duckdb_query_queue_limit: int = Field(default=64, ge=0)
+    duckdb_query_timeout_seconds: float = Field(default=300.0, gt=0)
+    duckdb_metadata_workers: int = Field(default=2, ge=1)
+    duckdb_metadata_queue_limit: int = Field(default=64, ge=0)
+    duckdb_metadata_timeout_seconds: float = Field(default=30.0, gt=0)
+
+    # JSON /tables/query budgets: rows and serialized bytes returned, and seconds of DuckDB
+    # execution. A result cut short by one is flagged "truncated" (body and X-Query-Truncated
+    # header); a query interrupted before its first row gets a 504. 0 disables a budget.
+    # Streamed (ndjson/arrow) results are exempt: their memory is bounded per batch, and
+    # duckdb_query_timeout_seconds interrupts them, body included.
+    query_max_rows: int = Field(default=100000, ge=0)
+    query_max_bytes: int = Field(default=128 * 1024 * 1024, ge=0)
+    query_max_seconds: float = Field(default=120.0, ge=0)
+
+    # Rows per Arrow record batch for streamed (ndjson/arrow) responses
+    stream_batch_rows: int = Field(default=10000, ge=1)
+
+    # Exact /tables/select total counts kept per database generation and base query
+    select_count_cache_size: int = Field(default=1024, ge=0)
+
+    # Serialized /tables/select, /tables/count and /tables/sample responses cached per
+    # request body and DuckDB file; 0 bytes disables the cache
+    result_cache_max_bytes: int = Field(default=64 * 1024 * 1024, ge=0)
+    result_cache_ttl_seconds: float = Field(default=600.0, gt=0)
+
+    # /delta/tables/stats: per-table statistics computed once per snapshot and stored as JSON
+    # files (default: <duckdb file>.stats/ or <parquet dir>/_stats/); precompute fills them
+    # for every table in the background after each snapshot opens, on the background cursor
+    # and without a timeout (full scans; turn it off for very large snapshots)
+    table_stats_dir: str | None = Field(default=None)
+    table_stats_top_k: int = Field(default=10, ge=0)
+    table_stats_precompute: bool = Field(default=True)
+    # Seconds a request waits while another worker process computes the same table's stats
+    # before it gets a 503 (it holds a DuckDB cursor and query worker while it waits)
+    table_stats_lock_wait_seconds: float = Field(default=5.0, ge=0)
+
+    # /delta/search: trigram index over sdt_* names and schema descriptions, rebuilt per
+    # snapshot. Prebuild indexes the open snapshot in the background at startup.
+    search_index_prebuild: bool = Field(default=True)
+
+    # Response compression: zstd, brotli or gzip, whichever the client accepts (in that
+    # order of preference); responses smaller than the minimum size are sent uncompressed
+    compression_minimum_size: int = Field(default=1024, ge=0)
+    compression_zstd_level: int = Field(default=3, ge=1, le=22)
+    compression_brotli_quality: int = Field(default=4, ge=0, le=11)
+    compression_gzip_level: int = Field(default=6, ge=1, le=9)
+
+    # Prometheus-style /metrics and the slow-query log (logger "duckdb_mcp.slow_query").
+    # Requests slower than slow_query_seconds are logged (0 disables); with
+    # slow_query_explain_analyze their last statement is re-run under EXPLAIN ANALYZE.
+    metrics_enabled: bool = Field(default=True)
+    slow_query_seconds: float = Field(default=5.0, ge=0)
+    slow_query_log_path: str | None = Field(default=None)
+    slow_query_explain_analyze: bool = Field(default=False)
+
+    # Shared secret for /admin endpoints (X-Admin-Token header); unset disables them
+    admin_token: str | None = Field(default=None)
+
     # Optional schema markdown for column comments (Spark-export format)
     schema_markdown_path: str | None = Field(default=None)
 
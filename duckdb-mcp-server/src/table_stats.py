@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import duckdb
+import pydantic_core
+
+from src.catalog import get_catalog
+from src.db import background_cursor, duckdb_snapshot_conn
+from src.service.errors import service_unavailable
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+STATS_VERSION = 1
+# Nested and binary columns get null and distinct counts only
+_NON_SCALAR = re.compile(r"(\[\]|^STRUCT|^MAP|^UNION|^BLOB)", re.IGNORECASE)
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def compute_table_stats(
+    con: duckdb.DuckDBPyConnection,
+    table: str,
+    column_types: Dict[str, str],
+    top_k: int,
+) -> Dict[str, Any]:
+    """Row count and per-column null count, distinct estimate, min/max and top values in one scan."""
+    exprs = ["COUNT(*)"]
+    layout: List[Tuple[str, bool]] = []
+    for name, type_name in column_types.items():
+        col = _q(name)
+        scalar = not _NON_SCALAR.search(type_name)
+        exprs += [f"COUNT({col})", f"approx_count_distinct({col})"]
+        if scalar:
+            exprs += [f"MIN({col})", f"MAX({col})", f"approx_top_k({col}, {int(top_k)})"]
+        layout.append((name, scalar))
+    row = con.execute(f"SELECT {', '.join(exprs)} FROM {_q(table)}").fetchone()
+    row_count = int(row[0])
+    values = iter(row[1:])
+    columns = []
+    for name, scalar in layout:
+        non_null = int(next(values))
+        entry: Dict[str, Any] = {
+            "name": name,
+            "type": column_types[name],
+            "null_count": row_count - non_null,
+            "distinct_estimate": int(next(values) or 0),
+            "min": None,
+            "max": None,
+            "top_values": [],
+        }
+        if scalar:
+            entry["min"], entry["max"] = next(values), next(values)
+            entry["top_values"] = list(next(values) or []) if top_k > 0 else []
+        columns.append(entry)
+    return pydantic_core.to_jsonable_python(
+        {
+            "table": table,
+            "row_count": row_count,
+            "columns": columns,
+            "computed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        inf_nan_mode="null",
+    )
+
+
+class TableStatsStore:
+    """Per-table statistics, kept in memory and persisted as one JSON file per table.
+
+    Each file records the snapshot it was computed from: the DuckDB file's
+    size and mtime, or in Parquet mode the table's entry in the manifest the
+    generation was opened from, so a Parquet table refresh only invalidates
+    that table.
+    """
+
+    def __init__(self, stats_dir: str | None, top_k: int, lock_wait_seconds: float = 5.0) -> None:
+        self.stats_dir = stats_dir
+        self.top_k = top_k
+        # How long to wait for another worker process computing the same table
+        self.lock_wait_seconds = lock_wait_seconds
+        # (generation, table) -> stats
+        self._memory: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._unwritable: set[str] = set()
+        self.computed = 0
+        self.loaded = 0
+        self.hits = 0
+
+    def directory(self, gen: Any) -> Path:
+        if self.stats_dir:
+            return Path(self.stats_dir)
+        if gen.tables is not None:
+            # gen.path is the snapshot's manifest.json
+            return Path(gen.path).parent / "_stats"
+        # Next to the snapshot file itself, so each snapshot keeps its own stats
+        return Path(gen.path + ".stats")
+
+    @staticmethod
+    def snapshot_key(gen: Any, table: str) -> str:
+        """Key of the data ``gen`` serves for ``table``, not of whatever is on disk now."""
+        if gen.tables is not None:
+            entry = gen.tables.get(table, {})
+            raw = json.dumps(entry.get("files", []), sort_keys=True)
+            return "parquet:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+        # size and mtime survive copying the file together with its stats directory
+        return f"duckdb:{gen.fingerprint[2]}:{gen.fingerprint[3]}"
+
+    def cached(self, generation: int, table: str) -> Dict[str, Any] | None:
+        with self._lock:
+            stats = self._memory.get((generation, table))
+            if stats is not None:
+                self.hits += 1
+            return stats
+
+    def get(
+        self,
+        gen: Any,
+        con: duckdb.DuckDBPyConnection,
+        table: str,
+        column_types: Dict[str, str],
+    ) -> Dict[str, Any]:
+        stats = self.cached(gen.number, table)
+        if stats is not None:
+            return stats
+        key = self.snapshot_key(gen, table)
+        path = self.directory(gen) / f"{table}.json"
+        stats = self._load(path, key)
+        if stats is None:
+            with self._compute_lock(path, table):
+                # Another worker process may have written it while this one waited
+                stats = self._load(path, key)
+                if stats is None:
+                    stats = compute_table_stats(con, table, column_types, self.top_k)
+                    with self._lock:
+                        self.computed += 1
+                    self._save(path, key, stats)
+        with self._lock:
+            self._memory[(gen.number, table)] = stats
+            # Only the snapshot being served needs to stay in memory
+            for stale in [k for k in self._memory if k[0] < gen.number - 1]:
+                del self._memory[stale]
+        return stats
+
+    @contextmanager
+    def _compute_lock(self, path: Path, table: str) -> Iterator[None]:
+        """File lock shared by all worker processes, so only one of them scans a table.
+
+        Waits at most ``lock_wait_seconds`` (the caller holds a cursor and a lane
+        worker meanwhile), then gives up with a 503.
+        """
+        if str(path.parent) in self._unwritable:
+            yield
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle = open(path.with_suffix(".lock"), "a")
+        except OSError:
+            yield
+            return
+        with handle:
+            deadline = time.monotonic() + self.lock_wait_seconds
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise service_unavailable(
+                            f"Statistics for {table} are being computed by another worker; retry later"
+                        )
+                    time.sleep(0.05)
+            yield
+
+    def _load(self, path: Path, key: str) -> Dict[str, Any] | None:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != STATS_VERSION or data.get("snapshot") != key:
+            return None
+        with self._lock:
+            self.loaded += 1
+        return data.get("stats")
+
+    def _save(self, path: Path, key: str, stats: Dict[str, Any]) -> None:
+        directory = str(path.parent)
+        if directory in self._unwritable:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump({"version": STATS_VERSION, "snapshot": key, "stats": stats}, handle)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Read-only snapshot location: keep the stats in memory only
+            logger.warning("Cannot persist table stats under %s: %s", directory, e)
+            self._unwritable.add(directory)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tables_in_memory": len(self._memory),
+                "hits": self.hits,
+                "loaded": self.loaded,
+                "computed": self.computed,
+            }
+
+
+class StatsPrecomputer:
+    """Background thread that fills the store for every table of each new snapshot."""
+
+    def __init__(self, store: TableStatsStore, poll_seconds: float = 5.0) -> None:
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="duckdb-table-stats", daemon=True)
+        self.completed_generation: int | None = None
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                catalog = get_catalog()
+                if catalog.generation != self.completed_generation:
+                    started = time.monotonic()
+                    for table in catalog.table_names:
+                        if self._stop.is_set():
+                            return
+                        with background_cursor(), duckdb_snapshot_conn() as (gen, con):
+                            if gen.number != catalog.generation:
+                                # A newer snapshot went live; start over on it
+                                break
+                            self.store.get(gen, con, table, catalog.table(table).column_types)
+                    else:
+                        self.completed_generation = catalog.generation
+                        logger.info(
+                            "Table stats ready for %d tables (generation %s, %.1fs)",
+                            len(catalog.table_names), catalog.generation, time.monotonic() - started,
+                        )
+            except Exception as e:
+                logger.warning("Table stats precompute failed: %s", e)
+            self._stop.wait(self.poll_seconds)
+
+
+_STORE: TableStatsStore | None = None
+_PRECOMPUTER: StatsPrecomputer | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_table_stats_store() -> TableStatsStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            settings = get_settings()
+            _STORE = TableStatsStore(
+                settings.table_stats_dir, settings.table_stats_top_k, settings.table_stats_lock_wait_seconds
+            )
+        return _STORE
+
+
+def start_stats_precompute() -> None:
+    global _PRECOMPUTER
+    store = get_table_stats_store()
+    with _STORE_LOCK:
+        if _PRECOMPUTER is None:
+            _PRECOMPUTER = StatsPrecomputer(store)
+            _PRECOMPUTER.start()
+
+
+def clear_table_stats() -> None:
+    global _STORE, _PRECOMPUTER
+    with _STORE_LOCK:
+        if _PRECOMPUTER is not None:
+            _PRECOMPUTER.stop()
+        _STORE, _PRECOMPUTER = None, None
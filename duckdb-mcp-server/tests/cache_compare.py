@@ -4,6 +4,9 @@ Compare cached BERDL MCP responses against a target MCP base URL.
 
 Usage:
   uv run python duckdb-mcp-server/tests/cache_compare.py --cache-dir /path/to/.berdl_cache --base-url http://10.2.2.14/apis/mcp
+
+Reads the cache.sqlite3 database that tools/berdl_client.py keeps in the cache
+directory, plus any <sha256>.json files it has not imported yet.
 """
 
 from __future__ import annotations
@@ -11,7 +14,9 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import sqlite3
 import sys
+import zlib
 from decimal import Decimal, InvalidOperation
 from dataclasses import dataclass
 from pathlib import Path
@@ -21,9 +26,12 @@ from urllib.parse import urlparse
 import requests
 
 
+CACHE_DB_NAME = "cache.sqlite3"
+
+
 @dataclass
 class CacheEntry:
-    path: Path
+    name: str
     url: str
     payload: Dict[str, Any]
     response: Any
@@ -53,7 +61,12 @@ def parse_args() -> argparse.Namespace:
         "--max-files",
         type=int,
         default=None,
-        help="Optional limit on number of cache files to compare.",
+        help="Optional limit on number of cache entries to compare.",
+    )
+    parser.add_argument(
+        "--table",
+        default=None,
+        help="Only compare entries for this table.",
     )
     parser.add_argument(
         "--auth-token",
@@ -63,9 +76,34 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def iter_cache_files(cache_dir: Path) -> Iterable[Path]:
+def iter_sqlite_entries(db_path: Path, table: Optional[str]) -> Iterable[CacheEntry]:
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        query = "SELECT key, url, payload, response FROM responses WHERE url IS NOT NULL"
+        params: Tuple[Any, ...] = ()
+        if table:
+            query += " AND table_name = ?"
+            params = (table,)
+        for key, url, payload, blob in con.execute(query + " ORDER BY key", params):
+            try:
+                response = json.loads(zlib.decompress(blob))
+                payload_data = json.loads(payload)
+            except (zlib.error, ValueError):
+                continue
+            if isinstance(payload_data, dict):
+                yield CacheEntry(name=key, url=url, payload=payload_data, response=response)
+    finally:
+        con.close()
+
+
+def iter_cache_entries(cache_dir: Path, table: Optional[str] = None) -> Iterable[CacheEntry]:
+    db_path = cache_dir / CACHE_DB_NAME
+    if db_path.exists():
+        yield from iter_sqlite_entries(db_path, table)
     for path in sorted(cache_dir.glob("*.json")):
-        yield path
+        entry = load_cache_entry(path)
+        if entry is not None and (table is None or entry.payload.get("table") == table):
+            yield entry
 
 
 def load_cache_entry(path: Path) -> Optional[CacheEntry]:
@@ -80,7 +118,7 @@ def load_cache_entry(path: Path) -> Optional[CacheEntry]:
         url = query.get("url")
         payload = query.get("payload")
         if isinstance(url, str) and isinstance(payload, dict):
-            return CacheEntry(path=path, url=url, payload=payload, response=data.get("response"))
+            return CacheEntry(name=path.name, url=url, payload=payload, response=data.get("response"))
         return None
 
     return None
@@ -225,35 +263,32 @@ def main() -> int:
     total = 0
     matched = 0
 
-    for idx, path in enumerate(iter_cache_files(cache_dir)):
+    for idx, entry in enumerate(iter_cache_entries(cache_dir, args.table)):
         if args.max_files is not None and idx >= args.max_files:
             break
-        entry = load_cache_entry(path)
-        if entry is None:
-            continue
         total += 1
         url = rebuild_url(args.base_url, entry.url)
         try:
             resp = requests.post(url, json=entry.payload, headers=headers, timeout=args.timeout)
         except Exception as exc:
-            errors.append(f"{path.name}: request error: {exc}")
+            errors.append(f"{entry.name}: request error: {exc}")
             continue
 
         if resp.status_code == 404:
-            errors.append(f"{path.name}: 404 Not Found url={url} payload={entry.payload}")
+            errors.append(f"{entry.name}: 404 Not Found url={url} payload={entry.payload}")
             continue
 
         if resp.status_code >= 400:
             body = resp.text[:500] if resp.text else ""
             errors.append(
-                f"{path.name}: HTTP {resp.status_code} url={url} payload={entry.payload} body={body}"
+                f"{entry.name}: HTTP {resp.status_code} url={url} payload={entry.payload} body={body}"
             )
             continue
 
         try:
             actual = resp.json()
         except Exception as exc:
-            errors.append(f"{path.name}: JSON decode error: {exc}")
+            errors.append(f"{entry.name}: JSON decode error: {exc}")
             continue
 
         same, reason = compare_responses(entry.response, actual)
@@ -262,7 +297,7 @@ def main() -> int:
             continue
 
         mismatch_detail = (
-            f"{path.name}: url={url}\n"
+            f"{entry.name}: url={url}\n"
             f"payload={normalize_json(entry.payload)}\n"
             f"diff={reason}\n"
             f"expected={summarize_json(entry.response)}\n"
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compare the validated and trusted JSON response paths on brick-sized result sets.
+
+Usage:
+  uv run python tests/json_benchmark.py --duckdb /scratch/jmc/linkml-coral/cdm_store_bricks_full.db \
+      --table ddt_brick0000010 --table ddt_brick0000452 --rows 10000
+
+Without --duckdb, a synthetic ddt_brick-shaped table is generated in memory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.service.models import PaginationInfo, TableSelectResponse  # noqa: E402
+from src.service.serialization import dump_json, trusted  # noqa: E402
+
+SYNTHETIC_BRICK_SQL = """
+CREATE TABLE ddt_brick_synthetic AS
+SELECT
+    'Sample' || (i % 500)::VARCHAR AS sdt_sample_name,
+    'CHEBI:' || (i % 60)::VARCHAR AS molecule_from_list_sys_oterm_id,
+    'molecule ' || (i % 60)::VARCHAR AS molecule_from_list_sys_oterm_name,
+    (i % 60) * 12.011 AS molecule_molecular_weight_dalton,
+    CASE WHEN i % 97 = 0 THEN 'nan'::DOUBLE ELSE i / 7.0 END AS concentration_micromolar,
+    (i % 1000)::DECIMAL(10, 3) / 10 AS detection_limit_micromolar,
+    DATE '2014-01-01' + (i % 3000)::INTEGER AS collection_date,
+    ['rep' || (i % 3)::VARCHAR, 'rep' || ((i + 1) % 3)::VARCHAR] AS replicate_series,
+    CASE WHEN i % 5 = 0 THEN NULL ELSE 'dissolved' END AS physiochemical_state
+FROM range(?) t(i)
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of /tables/select pages.")
+    parser.add_argument("--duckdb", help="DuckDB file with ddt_brick tables (default: synthetic brick).")
+    parser.add_argument("--table", action="append", dest="tables", help="Table to read (repeatable).")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per page (default: 10000).")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per path (default: 7).")
+    return parser.parse_args()
+
+
+def load_rows(con: duckdb.DuckDBPyConnection, table: str, rows: int) -> List[Dict[str, Any]]:
+    # Same FLOAT -> DOUBLE widening as the /tables/select builder
+    columns = con.execute(f'DESCRIBE "{table}"').fetchall()
+    exprs = [
+        f'CAST("{name}" AS DOUBLE) AS "{name}"' if type_name in ("FLOAT", "REAL") else f'"{name}"'
+        for name, type_name, *_ in columns
+    ]
+    cur = con.execute(f'SELECT {", ".join(exprs)} FROM "{table}" LIMIT ?', [rows])
+    names = [d[0] for d in cur.description]
+    return [dict(zip(names, r)) for r in cur.fetchall()]
+
+
+def validated(data: List[Dict[str, Any]], pagination: PaginationInfo) -> bytes:
+    return TableSelectResponse(data=data, pagination=pagination).model_dump_json().encode("utf-8")
+
+
+def fast(data: List[Dict[str, Any]], pagination: PaginationInfo) -> bytes:
+    return dump_json(trusted(TableSelectResponse, data=data, pagination=pagination))
+
+
+def measure(fn: Callable[[], bytes], repeat: int) -> Tuple[float, bytes]:
+    body = fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), body
+
+
+def main() -> int:
+    args = parse_args()
+    if args.duckdb:
+        con = duckdb.connect(args.duckdb, read_only=True)
+        tables = args.tables or [
+            r[0]
+            for r in con.execute(
+                "SELECT table_name FROM duckdb_tables() WHERE table_name LIKE 'ddt_brick%' "
+                "ORDER BY estimated_size DESC LIMIT 3"
+            ).fetchall()
+        ]
+    else:
+        con = duckdb.connect()
+        con.execute(SYNTHETIC_BRICK_SQL, [args.rows])
+        tables = ["ddt_brick_synthetic"]
+
+    print(f"{'table':<24} {'rows':>7} {'cols':>5} {'validated ms':>13} {'trusted ms':>11} {'speedup':>8}")
+    for table in tables:
+        data = load_rows(con, table, args.rows)
+        pagination = PaginationInfo(limit=args.rows, offset=0, total_count=len(data), has_more=False)
+        slow_s, slow_body = measure(lambda: validated(data, pagination), args.repeat)
+        fast_s, fast_body = measure(lambda: fast(data, pagination), args.repeat)
+        if slow_body != fast_body:
+            print(f"[error] {table}: response bodies differ", file=sys.stderr)
+            return 1
+        cols = len(data[0]) if data else 0
+        print(
+            f"{table:<24} {len(data):>7} {cols:>5} {slow_s * 1000:>13.1f} {fast_s * 1000:>11.1f} "
+            f"{slow_s / fast_s if fast_s else float('nan'):>7.2f}x"
+        )
+    con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Measure /tables/select throughput of the server at several worker counts.
+
+Usage:
+  uv run python tests/load_test.py --workers 1 2 4 --concurrency 16 --seconds 20
+  uv run python tests/load_test.py --duckdb /scratch/jmc/linkml-coral/cdm_store_bricks_full.db \
+      --table sdt_sample --workers 1 4 8
+
+For each worker count the server is started with `python -m src.main` on a local
+port (WORKERS=n, result cache off so every request reaches DuckDB), and
+--concurrency client threads send filtered /tables/select requests with a
+random LIKE pattern for --seconds. Without --duckdb, a synthetic sdt_sample
+table is generated in a temporary file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import duckdb
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+ROOT_PATH = "/apis/mcp"
+
+SYNTHETIC_SAMPLE_SQL = """
+CREATE TABLE sdt_sample AS
+SELECT
+    'Sample' || i::VARCHAR AS sdt_sample_id,
+    'FW' || (i % 1000)::VARCHAR || '-' || (i * 7919 % 100000)::VARCHAR AS sdt_sample_name,
+    'Location' || (i % 300)::VARCHAR AS sdt_location_name,
+    (i % 5000) / 10.0 AS depth_meter,
+    DATE '2014-01-01' + (i % 3000)::INTEGER AS date
+FROM range(?) t(i)
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test /tables/select at several worker counts.")
+    parser.add_argument("--duckdb", help="DuckDB file to serve (default: synthetic sdt_sample table).")
+    parser.add_argument("--table", default="sdt_sample", help="Table to query (default: sdt_sample).")
+    parser.add_argument("--column", help="Column for the LIKE filter (default: <table>_name).")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Synthetic table rows (default: 2000000).")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test (default: 1 2 4)."
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="Client threads (default: 16).")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Measured seconds per run (default: 20).")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds per run (default: 3).")
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: a free one).")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        {
+            "HOST": "127.0.0.1",
+            "PORT": str(port),
+            "WORKERS": str(workers),
+            "DUCKDB_PATH": db_path,
+            "SERVICE_ROOT_PATH": ROOT_PATH,
+            "RESULT_CACHE_MAX_BYTES": "0",
+            "TABLE_STATS_PRECOMPUTE": "false",
+            "SEARCH_INDEX_PREBUILD": "false",
+        }
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "src.main"],
+        cwd=SERVER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(port: int, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", f"{ROOT_PATH}/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+            conn.close()
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not become ready within {timeout:g}s")
+
+
+def request_body(table: str, column: str) -> bytes:
+    return json.dumps(
+        {
+            "database": "enigma_coral",
+            "table": table,
+            "filters": [{"column": column, "operator": "LIKE", "value": f"%{random.randint(0, 99999)}%"}],
+            "limit": 100,
+        }
+    ).encode("utf-8")
+
+
+def run_clients(
+    port: int, table: str, column: str, concurrency: int, seconds: float
+) -> Tuple[List[float], int]:
+    """Latencies of successful requests, and the number of failed ones."""
+    deadline = time.monotonic() + seconds
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        mine: List[float] = []
+        failed = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request(
+                    "POST",
+                    f"{ROOT_PATH}/delta/tables/select",
+                    body=request_body(table, column),
+                    headers={"Content-Type": "application/json"},
+                )
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> int:
+    args = parse_args()
+    column = args.column or f"{args.table}_name"
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.duckdb
+        if not db_path:
+            db_path = str(Path(tmp) / "load_test.db")
+            con = duckdb.connect(db_path)
+            con.execute(SYNTHETIC_SAMPLE_SQL, [args.rows])
+            con.close()
+
+        print(f"cpus={os.cpu_count()} table={args.table} column={column} concurrency={args.concurrency}")
+        print(f"{'workers':>7} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'scaling':>8}")
+        baseline: Dict[str, float] = {}
+        for workers in args.workers:
+            port = args.port or free_port()
+            server = start_server(db_path, workers, port)
+            try:
+                wait_ready(port)
+                run_clients(port, args.table, column, args.concurrency, args.warmup)
+                latencies, errors = run_clients(port, args.table, column, args.concurrency, args.seconds)
+            finally:
+                server.terminate()
+                try:
+                    server.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                    server.wait()
+            rate = len(latencies) / args.seconds
+            baseline.setdefault("rate", rate)
+            print(
+                f"{workers:>7} {len(latencies):>9} {rate:>8.1f} "
+                f"{statistics.median(latencies) * 1000 if latencies else float('nan'):>8.1f} "
+                f"{percentile(latencies, 0.95) * 1000:>8.1f} {errors:>7} "
+                f"{rate / baseline['rate'] if baseline['rate'] else float('nan'):>7.2f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
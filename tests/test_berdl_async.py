@@ -0,0 +1,196 @@
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tools import berdl_client, walk_provenance  # noqa: E402
+from tools.berdl_async import AsyncBerdlClient  # noqa: E402
+
+BASE_URL = "http://berdl.test/apis/mcp"
+
+
+class ThreadRecordingCache(berdl_client.NullCache):
+    """Cache backend that records which thread each call ran on."""
+
+    def __init__(self):
+        self.threads = []
+
+    def get(self, url, payload):
+        self.threads.append(threading.get_ident())
+        return None
+
+    def set(self, url, payload, response):
+        self.threads.append(threading.get_ident())
+
+
+class FakeServer:
+    """httpx handler answering /tables/select from an in-memory table."""
+
+    def __init__(self, rows, responses=None, delay=0.01):
+        self.rows = rows
+        self.responses = list(responses or [])
+        self.delay = delay
+        self.payloads = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        payload = json.loads(request.content)
+        self.payloads.append(payload)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.responses:
+            status, headers = self.responses.pop(0)
+            return httpx.Response(status, headers=headers, json={"detail": "busy"})
+        offset, limit = payload["offset"], payload["limit"]
+        return httpx.Response(
+            200,
+            json={
+                "data": self.rows[offset:offset + limit],
+                "pagination": {
+                    "limit": limit,
+                    "offset": offset,
+                    "total_count": len(self.rows),
+                    "has_more": offset + limit < len(self.rows),
+                },
+            },
+        )
+
+
+class AsyncBerdlClientTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = [{"sdt_reads_id": f"Reads{i:04d}"} for i in range(950)]
+        self.sleeps = []
+        patcher = mock.patch.object(walk_provenance, "CURSOR_PAGINATION", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_with_client(self, server, body, cache=None, concurrency=4):
+        async def sleep(seconds):
+            self.sleeps.append(seconds)
+
+        async def main():
+            async with AsyncBerdlClient(
+                BASE_URL,
+                cache=cache or berdl_client.NullCache(),
+                concurrency=concurrency,
+                transport=httpx.MockTransport(server),
+                sleep=sleep,
+            ) as client:
+                return await body(client)
+
+        return asyncio.run(main())
+
+    def test_identical_in_flight_requests_are_coalesced(self):
+        server = FakeServer(self.rows)
+
+        async def body(client):
+            payload = {"table": "sdt_reads", "offset": 0, "limit": 10}
+            return await asyncio.gather(*(client.post_json("/delta/tables/select", payload, {}) for _ in range(5)))
+
+        results = self.run_with_client(server, body)
+        self.assertEqual(len(server.payloads), 1)
+        self.assertEqual([len(r["data"]) for r in results], [10] * 5)
+        results[1]["data"].clear()
+        self.assertEqual(len(results[0]["data"]), 10)
+
+    def test_concurrency_is_bounded(self):
+        server = FakeServer(self.rows)
+
+        async def body(client):
+            return await asyncio.gather(
+                *(
+                    client.post_json("/delta/tables/select", {"table": "sdt_reads", "offset": i, "limit": 1}, {})
+                    for i in range(20)
+                )
+            )
+
+        self.run_with_client(server, body, concurrency=3)
+        self.assertEqual(len(server.payloads), 20)
+        self.assertEqual(server.max_in_flight, 3)
+
+    def test_retries_honour_retry_after(self):
+        server = FakeServer(self.rows, responses=[(429, {"Retry-After": "2"})])
+
+        async def body(client):
+            return await client.post_json("/delta/tables/select", {"table": "sdt_reads", "offset": 0, "limit": 1}, {})
+
+        data = self.run_with_client(server, body)
+        self.assertEqual(data["data"], self.rows[:1])
+        self.assertEqual(self.sleeps, [2.0])
+
+    def test_server_timeouts_are_reported(self):
+        server = FakeServer(self.rows, responses=[(504, {})])
+        stderr = io.StringIO()
+
+        async def body(client):
+            return await client.post_json("/delta/tables/select", {"table": "sdt_reads", "offset": 0, "limit": 1}, {})
+
+        with contextlib.redirect_stderr(stderr):
+            self.run_with_client(server, body)
+        self.assertIn("[info] BERDL request timed out. path=/delta/tables/select", stderr.getvalue())
+
+    def test_cache_calls_run_off_the_event_loop(self):
+        server = FakeServer(self.rows)
+        cache = ThreadRecordingCache()
+
+        async def body(client):
+            await client.post_json("/delta/tables/select", {"table": "sdt_reads", "offset": 0, "limit": 1}, {})
+            return threading.get_ident()
+
+        loop_thread = self.run_with_client(server, body, cache=cache)
+        self.assertEqual(len(cache.threads), 2)
+        self.assertNotIn(loop_thread, cache.threads)
+
+    def test_client_errors_are_not_retried(self):
+        server = FakeServer(self.rows, responses=[(400, {})])
+
+        async def body(client):
+            return await client.post_json("/delta/tables/select", {"table": "sdt_reads"}, {})
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.run_with_client(server, body)
+        self.assertEqual(len(server.payloads), 1)
+
+    def test_shares_cache_entries_with_sync_client(self):
+        server = FakeServer(self.rows)
+        payload = {"table": "sdt_reads", "offset": 0, "limit": 5}
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = berdl_client.SqliteCache(tmp)
+
+            async def body(client):
+                await client.post_json("/delta/tables/select", payload, {})
+                return await client.post_json("/delta/tables/select", payload, {})
+
+            data = self.run_with_client(server, body, cache=cache)
+            self.assertEqual(len(server.payloads), 1)
+            self.assertEqual(cache.get(f"{BASE_URL}/delta/tables/select", payload), data)
+
+    def test_select_all_rows_async_fans_out_pages_in_order(self):
+        server = FakeServer(self.rows)
+
+        async def body(client):
+            return await walk_provenance.select_all_rows_async(client, {}, "sdt_reads", limit=100)
+
+        self.assertEqual(self.run_with_client(server, body), self.rows)
+        self.assertEqual(sorted(p["offset"] for p in server.payloads), list(range(0, 950, 100)))
+        self.assertEqual(server.max_in_flight, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
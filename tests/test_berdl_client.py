@@ -0,0 +1,230 @@
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import requests  # noqa: E402
+
+from tools import berdl_client  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append((self.path, body))
+        server.peers.add(self.client_address)
+        status, headers, payload = server.responses.pop(0) if server.responses else (200, {}, {"ok": True})
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class BerdlClientTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.requests = []
+        self.server.peers = set()
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/apis/mcp"
+        self._tmp = tempfile.TemporaryDirectory()
+        self.sleeps = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._tmp.cleanup()
+
+    def client(self, cache=None):
+        client = berdl_client.BerdlClient(
+            self.base_url, retries=3, cache=cache or berdl_client.NullCache(), sleep=self.sleeps.append
+        )
+        self.addCleanup(client.close)
+        return client
+
+    def test_requests_share_one_keep_alive_connection(self):
+        client = self.client()
+        for i in range(3):
+            self.assertEqual(client.post_json("/delta/tables/count", {"table": f"t{i}"}, {}), {"ok": True})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.peers), 1)
+
+    def test_retries_honour_retry_after(self):
+        self.server.responses = [(503, {"Retry-After": "7"}, {"detail": "busy"}), (200, {}, {"count": 3})]
+        data = self.client().post_json("/delta/tables/count", {"table": "sdt_strain"}, {})
+        self.assertEqual(data, {"count": 3})
+        self.assertEqual(self.sleeps, [7.0])
+
+    def test_client_errors_are_not_retried(self):
+        self.server.responses = [(404, {}, {"detail": "Not Found"})]
+        with self.assertRaises(requests.HTTPError):
+            self.client().post_json("/delta/tables/lookup", {"table": "sdt_strain"}, {})
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_gives_up_after_last_attempt(self):
+        self.server.responses = [(502, {}, {})] * 3
+        with self.assertRaises(requests.HTTPError):
+            self.client().post_json("/delta/tables/count", {"table": "sdt_strain"}, {})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(8):
+            backoff = min(berdl_client.RETRY_BACKOFF_SECONDS * 2 ** attempt, berdl_client.RETRY_BACKOFF_MAX_SECONDS)
+            delay = berdl_client.retry_delay(attempt)
+            self.assertTrue(backoff / 2 <= delay <= backoff, (attempt, delay))
+        response = requests.Response()
+        response.headers["Retry-After"] = formatdate(usegmt=True)
+        self.assertLess(berdl_client.retry_delay(0, response), 1.0)
+
+    def test_sqlite_cache_serves_repeat_requests(self):
+        cache = berdl_client.SqliteCache(self._tmp.name)
+        client = self.client(cache)
+        payload = {"database": "enigma_coral", "table": "sdt_strain"}
+        first = client.post_json("/delta/tables/count", payload, {})
+        self.assertEqual(client.post_json("/delta/tables/count", payload, {}), first)
+        self.assertEqual(len(self.server.requests), 1)
+        con = sqlite3.connect(cache.path)
+        self.addCleanup(con.close)
+        row = con.execute("SELECT path, table_name, url FROM responses").fetchone()
+        self.assertEqual(row, ("/delta/tables/count", "sdt_strain", f"{self.base_url}/delta/tables/count"))
+
+    def test_sqlite_cache_imports_json_files(self):
+        url = f"{self.base_url}/delta/tables/select"
+        directory = Path(self._tmp.name)
+        wrapped = {"query": {"url": url, "payload": {"table": "a"}}, "response": {"data": [1]}}
+        (directory / f"{berdl_client.cache_key(url, {'table': 'a'})}.json").write_text(json.dumps(wrapped))
+        (directory / f"{berdl_client.cache_key(url, {'table': 'b'})}.json").write_text(json.dumps({"data": [2]}))
+        cache = berdl_client.SqliteCache(self._tmp.name)
+        self.assertEqual(cache.get(url, {"table": "a"}), {"data": [1]})
+        self.assertEqual(cache.get(url, {"table": "b"}), {"data": [2]})
+        self.assertEqual(list(directory.glob("*.json")), [])
+
+    def test_sqlite_cache_ttl_per_endpoint_class(self):
+        cache = berdl_client.SqliteCache(self._tmp.name, ttl_seconds=3600, class_ttl_seconds={"count": 60})
+        count_url = f"{self.base_url}/delta/tables/count"
+        select_url = f"{self.base_url}/delta/tables/select"
+        with mock.patch.object(berdl_client.time, "time", return_value=1000.0):
+            cache.set(count_url, {"table": "x"}, {"count": 1})
+            cache.set(select_url, {"table": "x"}, {"data": []})
+        with mock.patch.object(berdl_client.time, "time", return_value=1120.0):
+            self.assertIsNone(cache.get(count_url, {"table": "x"}))
+            self.assertEqual(cache.get(select_url, {"table": "x"}), {"data": []})
+        with mock.patch.object(berdl_client.time, "time", return_value=5000.0):
+            self.assertIsNone(cache.get(select_url, {"table": "x"}))
+
+    def test_sqlite_cache_evicts_least_recently_used(self):
+        url = f"{self.base_url}/delta/tables/select"
+        blob_size = len(berdl_client._encode_response({"data": "x" * 100}))
+        cache = berdl_client.SqliteCache(self._tmp.name, max_bytes=blob_size * 3)
+        for i in range(3):
+            with mock.patch.object(berdl_client.time, "time", return_value=1000.0 + i * 100):
+                cache.set(url, {"offset": i}, {"data": "x" * 100})
+        with mock.patch.object(berdl_client.time, "time", return_value=1500.0):
+            # Touch the oldest entry so the next oldest is evicted instead
+            self.assertIsNotNone(cache.get(url, {"offset": 0}))
+            cache.set(url, {"offset": 3}, {"data": "x" * 100})
+        self.assertIsNotNone(cache.get(url, {"offset": 0}))
+        self.assertIsNone(cache.get(url, {"offset": 1}))
+        self.assertIsNotNone(cache.get(url, {"offset": 3}))
+        self.assertLessEqual(cache.total_bytes(), blob_size * 3)
+
+    def test_sqlite_cache_drops_only_changed_tables(self):
+        cache = berdl_client.SqliteCache(self._tmp.name)
+        select_url = f"{self.base_url}/delta/tables/select"
+        joined = {"table": "sdt_genome", "joins": [{"table": "sdt_strain"}]}
+        cache.set(select_url, {"table": "sdt_genome"}, {"data": [1]})
+        cache.set(select_url, {"table": "sdt_reads"}, {"data": [2]})
+        cache.set(select_url, joined, {"data": [3]})
+        cache.set(f"{self.base_url}/delta/tables/query", {"query": "SELECT 1"}, {"data": [4]})
+        self.assertEqual(cache.cached_tables(), ["sdt_genome", "sdt_reads", "sdt_strain"])
+
+        versions = {"sdt_genome": "a", "sdt_reads": "b", "sdt_strain": "c"}
+        self.assertEqual(cache.apply_table_versions(versions), ["sdt_genome", "sdt_reads", "sdt_strain"])
+        cache.set(select_url, {"table": "sdt_genome"}, {"data": [1]})
+        cache.set(select_url, {"table": "sdt_reads"}, {"data": [2]})
+        cache.set(select_url, joined, {"data": [3]})
+        cache.set(f"{self.base_url}/delta/tables/query", {"query": "SELECT 1"}, {"data": [4]})
+
+        self.assertEqual(cache.apply_table_versions(versions), [])
+        self.assertEqual(cache.get(f"{self.base_url}/delta/tables/query", {"query": "SELECT 1"}), {"data": [4]})
+
+        self.assertEqual(cache.apply_table_versions(dict(versions, sdt_strain="d")), ["sdt_strain"])
+        self.assertEqual(cache.get(select_url, {"table": "sdt_genome"}), {"data": [1]})
+        self.assertEqual(cache.get(select_url, {"table": "sdt_reads"}), {"data": [2]})
+        self.assertIsNone(cache.get(select_url, joined))
+        self.assertIsNone(cache.get(f"{self.base_url}/delta/tables/query", {"query": "SELECT 1"}))
+
+    def test_sqlite_cache_tracks_tables_of_older_entries(self):
+        url = f"{self.base_url}/delta/tables/select"
+        cache = berdl_client.SqliteCache(self._tmp.name)
+        cache.set(url, {"table": "sdt_genome"}, {"data": [1]})
+        cache.set(url, {"table": "sdt_strain"}, {"data": [2]})
+        # A database written before tables were tracked per entry
+        con = sqlite3.connect(cache.path)
+        with con:
+            con.execute("DELETE FROM response_tables")
+            con.execute("PRAGMA user_version = 0")
+        con.close()
+        cache = berdl_client.SqliteCache(self._tmp.name)
+        self.assertEqual(cache.cached_tables(), ["sdt_genome", "sdt_strain"])
+        cache.apply_table_versions({"sdt_strain": "a"})
+        self.assertEqual(cache.get(url, {"table": "sdt_genome"}), {"data": [1]})
+        self.assertIsNone(cache.get(url, {"table": "sdt_strain"}))
+
+    def test_manifest_and_probe_table_versions(self):
+        manifest = Path(self._tmp.name) / "current.json"
+        manifest.write_text(
+            json.dumps(
+                {
+                    "tables": [
+                        {"table": "sdt_genome", "hashes": {"table_sha256": "abc"}},
+                        {"table": "sdt_strain", "hashes": {"data_sha256": "def"}},
+                    ]
+                }
+            )
+        )
+        self.assertEqual(berdl_client.manifest_table_versions(str(manifest)), {"sdt_genome": "sha256:abc"})
+        self.server.responses = [(200, {}, {"count": 6}), (404, {}, {"detail": "Not Found"})]
+        versions = berdl_client.probe_table_versions(self.client(), {}, "enigma_coral", ["sdt_genome", "sdt_old"])
+        self.assertEqual(versions, {"sdt_genome": "count:6", "sdt_old": "missing"})
+        self.assertEqual(self.server.requests[0][1], {"database": "enigma_coral", "table": "sdt_genome"})
+
+    def test_cache_from_env(self):
+        with mock.patch.dict("os.environ", {"BERDL_CACHE_DISABLE": "1"}):
+            self.assertIsInstance(berdl_client.cache_from_env(), berdl_client.NullCache)
+        env = {
+            "BERDL_CACHE_DIR": self._tmp.name,
+            "BERDL_CACHE_TTL_SECONDS": "60",
+            "BERDL_CACHE_TTL_SCHEMA_SECONDS": "86400",
+        }
+        with mock.patch.dict("os.environ", env):
+            cache = berdl_client.cache_from_env()
+        self.assertEqual((cache.directory, cache.ttl_seconds), (self._tmp.name, 60))
+        self.assertEqual(cache.ttl_for("/delta/databases/tables/schema"), 86400)
+        self.assertEqual(cache.ttl_for("/delta/tables/select"), 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
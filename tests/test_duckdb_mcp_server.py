@@ -0,0 +1,1106 @@
+import asyncio
+import fcntl
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+SERVER = Path(__file__).resolve().parents[1] / "duckdb-mcp-server"
+sys.path.insert(0, str(SERVER))
+
+import brotli
+import duckdb
+import pyarrow as pa
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from src import compression
+from src import (
+    catalog, db, executor, metrics, parquet_store, prepared, provenance, result_cache, search_index, table_stats,
+)
+from src.main import create_application
+from src.service import budget as budget_module
+from src.service import sql_validation, streaming
+from src.service.streaming import dedupe_column_names
+from src.settings import get_settings
+
+
+def _write_database(path: Path, strain_names) -> None:
+    con = duckdb.connect(str(path))
+    try:
+        con.execute(
+            "CREATE TABLE sdt_strain (sdt_strain_id VARCHAR, sdt_strain_name VARCHAR, growth FLOAT)"
+        )
+        con.executemany(
+            "INSERT INTO sdt_strain VALUES (?, ?, ?)",
+            [(f"Strain{i:07d}", name, i + 0.5) for i, name in enumerate(strain_names)],
+        )
+    finally:
+        con.close()
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / "coral.db"
+        _write_database(self.db_path, ["FW106", "MT42", "GW101"])
+        self._env = dict(os.environ)
+        os.environ["DUCKDB_PATH"] = str(self.db_path)
+        os.environ["SERVICE_ROOT_PATH"] = ""
+        os.environ["DUCKDB_FILE_CHECK_INTERVAL_SECONDS"] = "0"
+        os.environ["TABLE_STATS_PRECOMPUTE"] = "false"
+        os.environ["SEARCH_INDEX_PREBUILD"] = "false"
+        os.environ.update(self.extra_env())
+        get_settings.cache_clear()
+        catalog.clear_catalog()
+        result_cache.clear_result_cache()
+        executor.close_executor()
+        db.close_pool()
+        prepared.clear_prepared_statements()
+        metrics.clear_metrics()
+        table_stats.clear_table_stats()
+        search_index.clear_search_index()
+        provenance.clear_provenance_graph()
+        self.client = TestClient(create_application())
+        self.client.__enter__()
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        catalog.clear_catalog()
+        db.close_pool()
+        os.environ.clear()
+        os.environ.update(self._env)
+        get_settings.cache_clear()
+        self._tmp.cleanup()
+
+    def extra_env(self):
+        return {}
+
+    def wait_for_generation(self, number, timeout=10):
+        """Wait for the background snapshot switch the file check started."""
+        pool = db.get_pool()
+        deadline = time.monotonic() + timeout
+        while pool.generation() != number and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(pool.generation(), number)
+
+    def post(self, path, payload):
+        resp = self.client.post(path, json=payload)
+        self.assertEqual(resp.status_code, 200, resp.text)
+        return resp.json()
+
+    def get(self, path):
+        resp = self.client.get(path)
+        self.assertEqual(resp.status_code, 200, resp.text)
+        return resp.json()
+
+
+class ConnectionPoolTests(ServerTestCase):
+    def test_requests_reuse_one_database_handle(self):
+        for _ in range(3):
+            self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})
+        stats = db.get_pool().stats()
+        self.assertEqual(stats["generation"], 1)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertGreaterEqual(stats["idle"], 1)
+
+    def test_reconnects_when_file_is_replaced(self):
+        count = self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(count["count"], 3)
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["FW106"])
+        os.replace(replacement, self.db_path)
+        count = self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(count["count"], 1)
+        self.assertEqual(db.get_pool().stats()["reconnects"], 1)
+
+    def test_exhausted_pool_times_out(self):
+        pool = db.DuckDBPool(str(self.db_path), size=1, acquire_timeout=0.05)
+        try:
+            with pool.connection():
+                with self.assertRaises(db.PoolTimeout):
+                    pool.acquire()
+        finally:
+            pool.close()
+
+    def test_health_reports_pool(self):
+        health = self.get("/health")
+        names = [c["name"] for c in health["components"]]
+        self.assertEqual(names, ["duckdb", "duckdb_pool", "duckdb_executor", "result_cache", "prepared_statements"])
+        self.assertEqual(health["status"], "healthy")
+
+
+class WorkerConfigTests(ServerTestCase):
+    def extra_env(self):
+        return {"WORKERS": "4", "DUCKDB_MEMORY_LIMIT": "256MB"}
+
+    def test_workers_split_duckdb_threads(self):
+        expected_threads = max(1, (os.cpu_count() or 1) // 4)
+        self.assertEqual(db.duckdb_config(get_settings()), {"threads": expected_threads, "memory_limit": "256MB"})
+        with db.duckdb_conn() as con:
+            threads, memory_limit = con.execute(
+                "SELECT current_setting('threads'), current_setting('memory_limit')"
+            ).fetchone()
+        reference = duckdb.connect(config={"memory_limit": "256MB"})
+        try:
+            expected_limit = reference.execute("SELECT current_setting('memory_limit')").fetchone()[0]
+        finally:
+            reference.close()
+        self.assertEqual((threads, memory_limit), (expected_threads, expected_limit))
+
+    def test_single_worker_keeps_duckdb_defaults(self):
+        settings = get_settings().model_copy(update={"workers": 1, "duckdb_memory_limit": None})
+        self.assertEqual(db.duckdb_config(settings), {})
+        settings = settings.model_copy(update={"workers": 2})
+        self.assertEqual(set(db.duckdb_config(settings)), {"threads", "memory_limit"})
+
+
+class CatalogTests(ServerTestCase):
+    def extra_env(self):
+        markdown = Path(self._tmp.name) / "schema.md"
+        markdown.write_text(
+            "## Table: sdt_strain\n\n"
+            "**Table Description:** Microbial strains\n\n"
+            "### Schema\n\n"
+            "| Column Name | Data Type | Nullable | Comment |\n"
+            "|---|---|---|---|\n"
+            "| sdt_strain_id | string | No | primary key |\n",
+            encoding="utf-8",
+        )
+        return {"SCHEMA_MARKDOWN_PATH": str(markdown)}
+
+    def test_structure_merges_markdown_comments(self):
+        data = self.post("/delta/databases/structure", {"with_schema": True})
+        (table,) = data["structure"]["enigma_coral"]["tables"]
+        self.assertEqual(table["name"], "sdt_strain")
+        self.assertEqual(table["description"], "Microbial strains")
+        self.assertEqual(
+            table["columns"][0],
+            {"name": "sdt_strain_id", "type": "string", "nullable": "No", "comment": "primary key"},
+        )
+        self.assertEqual(table["columns"][2]["type"], "FLOAT")
+
+    def test_catalog_is_reused_until_file_changes(self):
+        first = catalog.get_catalog()
+        self.assertIs(catalog.get_catalog(), first)
+        self.assertEqual(
+            first.table("sdt_strain").columns, ["sdt_strain_id", "sdt_strain_name", "growth"]
+        )
+        replacement = Path(self._tmp.name) / "next.db"
+        con = duckdb.connect(str(replacement))
+        con.execute("CREATE TABLE sdt_sample (sdt_sample_id VARCHAR)")
+        con.close()
+        os.replace(replacement, self.db_path)
+        tables = self.post("/delta/databases/tables/list", {"database": "enigma_coral"})
+        self.assertEqual(tables["tables"], ["sdt_sample"])
+        missing = self.client.post(
+            "/delta/databases/tables/schema", json={"database": "enigma_coral", "table": "sdt_strain"}
+        )
+        self.assertEqual(missing.status_code, 404)
+
+
+class StreamingTests(ServerTestCase):
+    def test_query_streams_ndjson(self):
+        resp = self.client.post(
+            "/delta/tables/query",
+            json={"query": "SELECT sdt_strain_name, growth FROM sdt_strain ORDER BY 1", "format": "ndjson"},
+        )
+        self.assertEqual(resp.status_code, 200, resp.text)
+        self.assertTrue(resp.headers["content-type"].startswith("application/x-ndjson"))
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        self.assertEqual(lines[0], {"sdt_strain_name": "FW106", "growth": 0.5})
+        self.assertEqual(len(lines), 3)
+
+    def test_select_streams_arrow_with_pagination_headers(self):
+        resp = self.client.post(
+            "/delta/tables/select",
+            json={
+                "database": "enigma_coral",
+                "table": "sdt_strain",
+                "order_by": [{"column": "sdt_strain_id"}],
+                "limit": 2,
+                "format": "arrow",
+            },
+        )
+        self.assertEqual(resp.status_code, 200, resp.text)
+        self.assertEqual(resp.headers["x-total-count"], "3")
+        self.assertEqual(resp.headers["x-has-more"], "true")
+        table = pa.ipc.open_stream(resp.content).read_all()
+        self.assertEqual(table.column("sdt_strain_id").to_pylist(), ["Strain0000000", "Strain0000001"])
+        self.assertEqual(table.schema.field("growth").type, pa.float64())
+        self.assertEqual(db.get_pool().stats()["in_use"], 0)
+
+    def test_failed_streamed_query_releases_connection(self):
+        with self.assertRaises(duckdb.Error):
+            self.client.post(
+                "/delta/tables/query", json={"query": "SELECT nope FROM sdt_strain", "format": "ndjson"}
+            )
+        self.assertEqual(db.get_pool().stats()["in_use"], 0)
+
+
+async def _read_body(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+class StreamingLaneTests(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lane = executor.Lane("test", workers=1, max_queue=4, timeout=5, max_streams=1)
+        self.addCleanup(self.lane.shutdown)
+
+    def stream(self, sql="SELECT * FROM sdt_strain", lane=None):
+        return asyncio.run((lane or self.lane).run(streaming.stream_query, "ndjson", sql))
+
+    def test_stream_holds_its_lane_slot_until_the_body_is_sent(self):
+        response = self.stream()
+        self.assertEqual(self.lane.stats()["streaming"], 1)
+        self.assertEqual(db.get_pool().stats()["in_use"], 1)
+        # The lane's only slot belongs to the stream, so other work waits for it
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(asyncio.run(self.lane.run(lambda: "done"))))
+        waiter.start()
+        time.sleep(0.2)
+        self.assertEqual(results, [])
+        self.assertEqual(len(asyncio.run(_read_body(response)).splitlines()), 3)
+        waiter.join(5)
+        self.assertEqual(results, ["done"])
+        self.assertEqual(self.lane.stats()["streaming"], 0)
+        self.assertEqual(db.get_pool().stats()["in_use"], 0)
+
+    def test_streams_beyond_the_limit_are_rejected(self):
+        lane = executor.Lane("test2", workers=2, max_queue=4, timeout=5, max_streams=1)
+        self.addCleanup(lane.shutdown)
+        response = asyncio.run(lane.run(streaming.stream_query, "ndjson", "SELECT 1 AS x"))
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(lane.run(streaming.stream_query, "ndjson", "SELECT 2 AS x"))
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(lane.stats()["rejected_streams"], 1)
+        self.assertEqual(db.get_pool().stats()["in_use"], 1)
+        # A body that is never iterated is released by the response's background task
+        asyncio.run(response.background())
+        self.assertEqual((lane.stats()["streaming"], db.get_pool().stats()["in_use"]), (0, 0))
+
+    def test_lane_timeout_interrupts_batch_fetches(self):
+        lane = executor.Lane("test2", workers=1, max_queue=4, timeout=0.5)
+        self.addCleanup(lane.shutdown)
+        started = time.monotonic()
+        response = self.stream("SELECT a.range * b.range AS x FROM range(100000) a, range(100000) b", lane)
+        with self.assertRaises(streaming.StreamTimeout):
+            asyncio.run(_read_body(response))
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual((lane.stats()["streaming"], db.get_pool().stats()["in_use"]), (0, 0))
+
+    def test_lane_timeout_releases_an_unread_stream(self):
+        lane = executor.Lane("test2", workers=1, max_queue=4, timeout=0.3)
+        self.addCleanup(lane.shutdown)
+        response = self.stream(lane=lane)
+        deadline = time.monotonic() + 5
+        while db.get_pool().stats()["in_use"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual((lane.stats()["streaming"], db.get_pool().stats()["in_use"]), (0, 0))
+        with self.assertRaises(streaming.StreamTimeout):
+            asyncio.run(_read_body(response))
+
+
+class PaginationTests(ServerTestCase):
+    def select(self, **payload):
+        return self.post(
+            "/delta/tables/select", {"database": "enigma_coral", "table": "sdt_strain", **payload}
+        )
+
+    def test_cursor_pages_cover_all_rows(self):
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["FW106", "MT42", "GW101", None, "FW106"])
+        os.replace(replacement, self.db_path)
+        request = {"order_by": [{"column": "sdt_strain_name", "direction": "DESC"}], "limit": 2}
+        page = self.select(pagination_mode="cursor", **request)
+        seen = [r["sdt_strain_id"] for r in page["data"]]
+        self.assertNotIn("__cursor_key_0", page["data"][0])
+        while page["pagination"]["has_more"]:
+            page = self.select(cursor=page["pagination"]["next_cursor"], **request)
+            self.assertEqual(page["pagination"]["total_count"], 5)
+            seen.extend(r["sdt_strain_id"] for r in page["data"])
+        self.assertIsNone(page["pagination"]["next_cursor"])
+        self.assertEqual(page["pagination"]["offset"], 4)
+        everything = self.select(order_by=request["order_by"], limit=10)["data"]
+        self.assertEqual(seen, [r["sdt_strain_id"] for r in everything])
+        self.assertEqual(seen, ["Strain0000001", "Strain0000002", "Strain0000000", "Strain0000004", "Strain0000003"])
+
+    def test_cursor_must_match_query(self):
+        page = self.select(pagination_mode="cursor", limit=1)
+        resp = self.client.post(
+            "/delta/tables/select",
+            json={
+                "database": "enigma_coral",
+                "table": "sdt_strain",
+                "filters": [{"column": "growth", "operator": ">", "value": 1}],
+                "cursor": page["pagination"]["next_cursor"],
+            },
+        )
+        self.assertEqual(resp.status_code, 400)
+
+    def test_count_modes(self):
+        self.assertIsNone(self.select(count_mode="none", limit=1)["pagination"]["total_count"])
+        self.assertTrue(self.select(count_mode="none", limit=1)["pagination"]["has_more"])
+        estimated = self.select(count_mode="estimate", limit=1)["pagination"]
+        self.assertTrue(estimated["total_count_estimated"])
+        self.assertIsInstance(estimated["total_count"], int)
+        exact = self.select(limit=1)["pagination"]
+        self.assertEqual((exact["total_count"], exact["total_count_estimated"]), (3, False))
+        # Exact counts are cached and then preferred over an estimate
+        cached = self.select(count_mode="estimate", limit=2)["pagination"]
+        self.assertEqual((cached["total_count"], cached["total_count_estimated"]), (3, False))
+
+
+class LookupTests(ServerTestCase):
+    def test_lookup_groups_rows_by_key(self):
+        data = self.post(
+            "/delta/tables/lookup",
+            {
+                "database": "enigma_coral",
+                "table": "sdt_strain",
+                "key_column": "sdt_strain_name",
+                "keys": ["MT42", "nope", "FW106", "MT42"],
+                "columns": ["sdt_strain_id", "growth"],
+            },
+        )
+        self.assertEqual(
+            data["results"],
+            {"MT42": [{"sdt_strain_id": "Strain0000001", "growth": 1.5}],
+             "FW106": [{"sdt_strain_id": "Strain0000000", "growth": 0.5}]},
+        )
+        self.assertEqual(data["missing"], ["nope"])
+
+    def test_lookup_rejects_unknown_columns(self):
+        resp = self.client.post(
+            "/delta/tables/lookup",
+            json={"database": "enigma_coral", "table": "sdt_strain", "key_column": "x", "keys": ["a"]},
+        )
+        self.assertEqual(resp.status_code, 400)
+
+
+class ExecutorTests(ServerTestCase):
+    def extra_env(self):
+        return {"DUCKDB_QUERY_TIMEOUT_SECONDS": "0.5", "DUCKDB_QUERY_WORKERS": "1"}
+
+    def test_slow_query_is_interrupted(self):
+        started = time.monotonic()
+        resp = self.client.post(
+            "/delta/tables/query", json={"query": "SELECT SUM(a.range * b.range) FROM range(100000) a, range(100000) b"}
+        )
+        self.assertEqual(resp.status_code, 504, resp.text)
+        self.assertLess(time.monotonic() - started, 30)
+        lane = executor.get_executor().lane("query")
+        deadline = time.monotonic() + 10
+        while lane.stats()["running"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(lane.stats()["timeouts"], 1)
+        self.assertEqual(lane.stats()["running"], 0)
+        self.assertEqual(db.get_pool().stats()["in_use"], 0)
+        # The worker is free again for the next request
+        self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})
+
+    def test_metadata_lane_is_separate(self):
+        self.post("/delta/databases/tables/list", {"database": "enigma_coral"})
+        stats = executor.get_executor().stats()
+        self.assertEqual(stats["metadata"]["completed"], 1)
+        self.assertEqual(stats["query"]["completed"], 0)
+        health = self.get("/health")
+        (component,) = [c for c in health["components"] if c["name"] == "duckdb_executor"]
+        self.assertEqual(component["details"]["metadata"]["completed"], 2)
+
+    def test_full_queue_is_rejected(self):
+        lane = executor.Lane("test", workers=1, max_queue=0, timeout=1)
+        try:
+            with self.assertRaises(HTTPException) as ctx:
+                asyncio.run(lane.run(lambda: None))
+            self.assertEqual(ctx.exception.status_code, 503)
+            self.assertEqual(lane.stats()["rejected"], 1)
+        finally:
+            lane.shutdown()
+
+
+class PreparedStatementTests(ServerTestCase):
+    def extra_env(self):
+        # Every lookup has to reach DuckDB
+        return {"RESULT_CACHE_MAX_BYTES": "0", "DUCKDB_POOL_SIZE": "1"}
+
+    def lookup(self, strain_id):
+        return self.post(
+            "/delta/tables/select",
+            {
+                "database": "enigma_coral",
+                "table": "sdt_strain",
+                "filters": [{"column": "sdt_strain_id", "operator": "=", "value": strain_id}],
+                "limit": 1,
+            },
+        )["data"]
+
+    def test_point_lookups_reuse_one_statement(self):
+        names = [self.lookup(f"Strain{i:07d}")[0]["sdt_strain_name"] for i in range(3)]
+        self.assertEqual(names, ["FW106", "MT42", "GW101"])
+        self.assertEqual(self.lookup("it's missing"), [])
+        stats = prepared.get_prepared_statements().stats()
+        # One page statement and one count statement, prepared once each
+        self.assertEqual(stats["prepares"], 2)
+        self.assertEqual(stats["reuses"], 6)
+        self.assertEqual(stats["fallbacks"], 0)
+
+    def test_literals_round_trip(self):
+        con = duckdb.connect()
+        for value in ("O'Brien \\ %", -3, 2.5e-300, float("inf"), True, None):
+            literal = prepared.sql_literal(value)
+            self.assertEqual(con.execute(f"SELECT {literal}").fetchone()[0], value)
+        self.assertIsNone(prepared.sql_literal("bad\x00"))
+        self.assertIsNone(prepared.sql_literal([1]))
+        con.close()
+
+    def test_statements_are_evicted_per_connection(self):
+        statements = prepared.PreparedStatements(max_per_connection=1)
+        con = duckdb.connect()
+        statements.execute(con, "SELECT ?", [1])
+        self.assertEqual(statements.execute(con, "SELECT ? + 1", [1]).fetchone()[0], 2)
+        self.assertEqual(statements.execute(con, "SELECT ?", ["x"]).fetchone()[0], "x")
+        self.assertEqual(statements.stats()["evictions"], 2)
+        con.close()
+
+
+class ResultCacheTests(ServerTestCase):
+    def cache_stats(self):
+        (component,) = [c for c in self.get("/health")["components"] if c["name"] == "result_cache"]
+        return component["details"]
+
+    def test_repeated_requests_hit_until_file_changes(self):
+        request = {"table": "sdt_strain", "database": "enigma_coral"}
+        first = self.client.post("/delta/tables/count", json=request)
+        self.assertEqual(first.headers["x-cache"], "MISS")
+        # Key order and explicit defaults do not change the canonical request
+        again = self.client.post("/delta/tables/count", json={"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(again.headers["x-cache"], "HIT")
+        self.assertEqual(again.json(), {"count": 3})
+        stats = self.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["FW106"])
+        os.replace(replacement, self.db_path)
+        after = self.client.post("/delta/tables/count", json=request)
+        self.assertEqual(after.headers["x-cache"], "MISS")
+        self.assertEqual(after.json(), {"count": 1})
+        self.assertEqual(self.cache_stats()["invalidations"], 1)
+
+    def test_lru_eviction_respects_byte_budget(self):
+        cache = result_cache.ResultCache(max_bytes=10, ttl_seconds=60)
+        self.assertIsNone(cache.get("a", None))
+        cache.put("a", None, b"aaaa")
+        cache.put("b", None, b"bbbb")
+        self.assertEqual(cache.get("a", None), b"aaaa")
+        cache.put("c", None, b"cccc")
+        self.assertIsNone(cache.get("b", None))
+        self.assertEqual(cache.get("a", None), b"aaaa")
+        cache.put("huge", None, b"x" * 11)
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        cache = result_cache.ResultCache(max_bytes=100, ttl_seconds=60)
+        cache.get("a", None)
+        cache.put("a", None, b"aaaa", ttl_seconds=0)
+        self.assertIsNone(cache.get("a", None))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+
+class SnapshotSwitchTests(ServerTestCase):
+    def extra_env(self):
+        self.snapshots = Path(self._tmp.name) / "snapshots"
+        self.snapshots.mkdir()
+        os.replace(self.db_path, self.snapshots / "v1.db")
+        self.current = Path(self._tmp.name) / "current.db"
+        os.symlink(self.snapshots / "v1.db", self.current)
+        return {"DUCKDB_PATH": str(self.current), "ADMIN_TOKEN": "secret"}
+
+    def count(self):
+        return self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})["count"]
+
+    def test_symlink_flip_switches_while_old_snapshot_drains(self):
+        self.assertEqual(self.count(), 3)
+        _write_database(self.snapshots / "v2.db", ["FW106"])
+        pool = db.get_pool()
+        with pool.connection() as in_flight:
+            tmp_link = Path(self._tmp.name) / "next.link"
+            os.symlink(self.snapshots / "v2.db", tmp_link)
+            os.replace(tmp_link, self.current)
+            self.wait_for_generation(2)
+            self.assertEqual(self.count(), 1)
+            self.assertEqual(pool.stats()["retiring"], 1)
+            self.assertEqual(in_flight.execute("SELECT COUNT(*) FROM sdt_strain").fetchone()[0], 3)
+        stats = pool.stats()
+        self.assertEqual((stats["generation"], stats["retiring"]), (2, 0))
+        self.assertEqual(stats["open_path"], os.path.realpath(self.snapshots / "v2.db"))
+        # The catalog was built while the snapshot was warmed
+        self.assertEqual(catalog.get_catalog().generation, 2)
+        # SEARCH_INDEX_PREBUILD=false: the search index waits for the first search
+        self.assertIsNone(search_index._PRIMED)
+
+    def test_admin_reload_switches_to_new_path(self):
+        _write_database(self.snapshots / "v2.db", ["FW106", "MT42"])
+        body = {"path": str(self.snapshots / "v2.db")}
+        self.assertEqual(self.client.post("/admin/snapshot/reload", json=body).status_code, 403)
+        headers = {"X-Admin-Token": "secret"}
+        resp = self.client.post("/admin/snapshot/reload", json=body, headers=headers)
+        self.assertEqual(resp.status_code, 200, resp.text)
+        self.assertEqual(resp.json()["generation"], 2)
+        self.assertEqual(self.count(), 2)
+        missing = self.client.post(
+            "/admin/snapshot/reload", json={"path": str(self.snapshots / "v3.db")}, headers=headers
+        )
+        self.assertEqual(missing.status_code, 400)
+        (self.snapshots / "broken.db").write_bytes(b"not a database")
+        broken = self.client.post(
+            "/admin/snapshot/reload", json={"path": str(self.snapshots / "broken.db")}, headers=headers
+        )
+        self.assertEqual(broken.status_code, 400)
+        current = self.client.get("/admin/snapshot", headers=headers).json()
+        self.assertEqual(current["path"], str(self.snapshots / "v2.db"))
+        self.assertEqual(self.count(), 2)
+
+
+class MultiWorkerSnapshotTests(ServerTestCase):
+    def extra_env(self):
+        return {"WORKERS": "2", "ADMIN_TOKEN": "secret"}
+
+    def test_path_reload_is_rejected_with_several_workers(self):
+        other = Path(self._tmp.name) / "other.db"
+        _write_database(other, ["FW106"])
+        headers = {"X-Admin-Token": "secret"}
+        resp = self.client.post("/admin/snapshot/reload", json={"path": str(other)}, headers=headers)
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("DUCKDB_PATH", resp.json()["detail"])
+        self.assertEqual(db.get_pool().stats()["path"], str(self.db_path))
+        # Reopening the configured path is still allowed
+        self.assertEqual(self.client.post("/admin/snapshot/reload", json={}, headers=headers).status_code, 200)
+
+
+class ParquetSnapshotTests(ServerTestCase):
+    def extra_env(self):
+        self.parquet_dir = Path(self._tmp.name) / "parquet"
+        parquet_store.export_database(str(self.db_path), self.parquet_dir, row_group_size=2, file_size="1KB")
+        return {"DUCKDB_PARQUET_DIR": str(self.parquet_dir)}
+
+    def test_export_writes_sorted_zstd_parquet_and_manifest(self):
+        manifest = parquet_store.read_manifest(self.parquet_dir)
+        entry = manifest["tables"]["sdt_strain"]
+        self.assertEqual(entry["rows"], 3)
+        self.assertEqual(entry["sort_key"], "sdt_strain_id")
+        con = duckdb.connect()
+        files = [str(self.parquet_dir / f) for f in entry["files"]]
+        meta = con.execute(
+            "SELECT DISTINCT compression, stats_min FROM parquet_metadata(?) WHERE path_in_schema = 'sdt_strain_id'",
+            [files],
+        ).fetchall()
+        con.close()
+        self.assertEqual({m[0] for m in meta}, {"ZSTD"})
+        self.assertIn("Strain0000000", {m[1] for m in meta})
+
+    def test_serves_snapshot_views(self):
+        tables = self.post("/delta/databases/tables/list", {"database": "enigma_coral"})
+        self.assertEqual(tables["tables"], ["sdt_strain"])
+        schema = self.post("/delta/databases/tables/schema", {"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(schema["columns"], ["sdt_strain_id", "sdt_strain_name", "growth"])
+        page = self.post(
+            "/delta/tables/select",
+            {"database": "enigma_coral", "table": "sdt_strain", "filters": [
+                {"column": "sdt_strain_id", "operator": "=", "value": "Strain0000002"}
+            ]},
+        )
+        self.assertEqual(page["data"], [{"sdt_strain_id": "Strain0000002", "sdt_strain_name": "GW101", "growth": 2.5}])
+        self.assertEqual(db.get_pool().stats()["mode"], "parquet")
+
+    def test_single_table_refresh_reloads_views(self):
+        count = self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(count["count"], 3)
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["FW106"])
+        for _ in range(2):
+            parquet_store.export_database(str(replacement), self.parquet_dir, tables=["sdt_strain"])
+        self.wait_for_generation(2)
+        count = self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(count["count"], 1)
+        self.assertEqual(len(list((self.parquet_dir / "sdt_strain").iterdir())), 2)
+
+    def test_stats_are_keyed_by_the_served_manifest(self):
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["FW106"])
+        store = table_stats.get_table_stats_store()
+        with db.duckdb_snapshot_conn() as (gen, con):
+            parquet_store.export_database(str(replacement), self.parquet_dir, tables=["sdt_strain"])
+            # Computed from the views of the previous manifest while the switch is pending
+            stale = store.get(gen, con, "sdt_strain", {"sdt_strain_name": "VARCHAR"})
+        self.assertEqual(stale["row_count"], 3)
+        self.wait_for_generation(2)
+        stats = self.post("/delta/tables/stats", {"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(stats["row_count"], 1)
+        self.assertTrue((self.parquet_dir / "_stats" / "sdt_strain.json").exists())
+
+    def test_snapshot_database_cannot_read_other_files(self):
+        with db.get_pool().connection() as con:
+            with self.assertRaises(duckdb.Error):
+                con.execute(f"SELECT * FROM read_csv('{self.db_path}')").fetchall()
+            with self.assertRaises(duckdb.Error):
+                con.execute("SET enable_external_access = true")
+
+
+class TableStatsTests(ServerTestCase):
+    def stats(self):
+        return self.post("/delta/tables/stats", {"database": "enigma_coral", "table": "sdt_strain"})
+
+    def test_stats_are_computed_once_and_persisted(self):
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["FW106", "MT42", None, "FW106"])
+        os.replace(replacement, self.db_path)
+        data = self.stats()
+        self.assertEqual(data["row_count"], 4)
+        name = next(c for c in data["columns"] if c["name"] == "sdt_strain_name")
+        self.assertEqual(name["null_count"], 1)
+        self.assertEqual(name["distinct_estimate"], 2)
+        self.assertEqual((name["min"], name["max"]), ("FW106", "MT42"))
+        self.assertEqual(name["top_values"][0], "FW106")
+        growth = next(c for c in data["columns"] if c["name"] == "growth")
+        self.assertEqual((growth["type"], growth["min"], growth["max"]), ("FLOAT", 0.5, 3.5))
+        self.assertEqual(self.stats(), data)
+        self.assertEqual(table_stats.get_table_stats_store().computed, 1)
+        self.assertTrue((Path(str(self.db_path) + ".stats") / "sdt_strain.json").exists())
+
+        table_stats.clear_table_stats()
+        self.assertEqual(self.stats(), data)
+        store = table_stats.get_table_stats_store()
+        self.assertEqual((store.loaded, store.computed), (1, 0))
+
+    def test_concurrent_workers_compute_stats_once(self):
+        # Separate stores stand in for worker processes sharing the stats directory
+        stores = [table_stats.TableStatsStore(None, 10) for _ in range(4)]
+        results = []
+
+        def fetch(store):
+            with db.duckdb_snapshot_conn() as (gen, con):
+                results.append(store.get(gen, con, "sdt_strain", {"sdt_strain_name": "VARCHAR"}))
+
+        threads = [threading.Thread(target=fetch, args=(store,)) for store in stores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sum(store.computed for store in stores), 1)
+        self.assertEqual(sum(store.loaded for store in stores), 3)
+
+    def test_stats_lock_held_elsewhere_gives_503(self):
+        store = table_stats.TableStatsStore(None, 10, lock_wait_seconds=0.2)
+        lock_path = Path(str(self.db_path) + ".stats") / "sdt_strain.lock"
+        lock_path.parent.mkdir()
+        with open(lock_path, "a") as other_worker:
+            fcntl.flock(other_worker, fcntl.LOCK_EX)
+            with db.duckdb_snapshot_conn() as (gen, con):
+                with self.assertRaises(HTTPException) as ctx:
+                    store.get(gen, con, "sdt_strain", {"sdt_strain_name": "VARCHAR"})
+            self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(self.stats()["row_count"], 3)
+
+    def test_new_snapshot_recomputes_stats(self):
+        self.assertEqual(self.stats()["row_count"], 3)
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["FW106"])
+        os.replace(replacement, self.db_path)
+        self.assertEqual(self.stats()["row_count"], 1)
+
+    def test_unknown_table_is_404(self):
+        resp = self.client.post("/delta/tables/stats", json={"database": "enigma_coral", "table": "nope"})
+        self.assertEqual(resp.status_code, 404)
+
+
+class TableStatsPrecomputeTests(ServerTestCase):
+    def extra_env(self):
+        return {"TABLE_STATS_PRECOMPUTE": "true"}
+
+    def test_background_precompute_fills_store(self):
+        store = table_stats.get_table_stats_store()
+        deadline = time.monotonic() + 5
+        generation = catalog.get_catalog().generation
+        while store.cached(generation, "sdt_strain") is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertIsNotNone(store.cached(generation, "sdt_strain"))
+        self.assertEqual(self.post("/delta/tables/stats", {"database": "enigma_coral", "table": "sdt_strain"})["row_count"], 3)
+        self.assertEqual(store.computed, 1)
+
+    def test_precompute_waits_for_background_cursor(self):
+        settings = get_settings()
+        self.assertEqual(
+            type(settings).model_fields["duckdb_pool_size"].default,
+            settings.duckdb_query_workers + settings.duckdb_metadata_workers + 1,
+        )
+        store = table_stats.TableStatsStore(str(Path(self._tmp.name) / "stats2"), top_k=10)
+        precomputer = table_stats.StatsPrecomputer(store, poll_seconds=0.05)
+        self.addCleanup(precomputer.stop)
+        with db.background_cursor():
+            precomputer.start()
+            time.sleep(0.3)
+            self.assertEqual(store.computed, 0)
+        deadline = time.monotonic() + 5
+        while precomputer.completed_generation is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(precomputer.completed_generation, catalog.get_catalog().generation)
+
+
+class SearchTests(ServerTestCase):
+    def extra_env(self):
+        markdown = Path(self._tmp.name) / "schema.md"
+        markdown.write_text(
+            "## Table: sdt_strain\n\n"
+            "**Table Description:** Microbial strains isolated from groundwater wells\n\n"
+            "### Schema\n\n"
+            "| Column Name | Data Type | Nullable | Comment |\n"
+            "|---|---|---|---|\n"
+            "| growth | float | Yes | optical density after 24 hours |\n",
+            encoding="utf-8",
+        )
+        return {"SCHEMA_MARKDOWN_PATH": str(markdown)}
+
+    def search(self, query, **extra):
+        return self.post("/delta/search", {"database": "enigma_coral", "query": query, **extra})["hits"]
+
+    def test_exact_name_ranks_first(self):
+        hits = self.search("fw106")
+        self.assertEqual(
+            hits[0],
+            {"kind": "object", "table": "sdt_strain", "id": "Strain0000000", "name": "FW106",
+             "description": None, "score": 1.0},
+        )
+
+    def test_misspelled_and_partial_names_match(self):
+        self.assertEqual(self.search("FW-106")[0]["name"], "FW106")
+        self.assertEqual(self.search("GW10")[0]["name"], "GW101")
+        self.assertEqual(self.search("zzzz"), [])
+
+    def test_descriptions_are_searchable(self):
+        hits = self.search("groundwater wells", kinds=["table", "column"])
+        self.assertEqual((hits[0]["kind"], hits[0]["table"], hits[0]["name"]), ("table", "sdt_strain", "sdt_strain"))
+        (column,) = self.search("optical density", kinds=["column"])
+        self.assertEqual((column["name"], column["description"]), ("growth", "optical density after 24 hours"))
+
+    def test_table_filter_and_unknown_table(self):
+        self.assertEqual(self.search("FW106", tables=["sdt_strain"], kinds=["object"])[0]["id"], "Strain0000000")
+        resp = self.client.post(
+            "/delta/search", json={"database": "enigma_coral", "query": "FW106", "tables": ["sdt_nope"]}
+        )
+        self.assertEqual(resp.status_code, 404)
+
+    def test_new_snapshot_is_reindexed(self):
+        self.assertEqual(self.search("MT42")[0]["name"], "MT42")
+        replacement = Path(self._tmp.name) / "next.db"
+        _write_database(replacement, ["MT43"])
+        os.replace(replacement, self.db_path)
+        hits = self.search("MT42", kinds=["object"])
+        self.assertEqual([h["name"] for h in hits], ["MT43"])
+        self.assertEqual(search_index.search_index_stats()["documents"], 3)
+
+
+class ProvenanceTests(ServerTestCase):
+    def extra_env(self):
+        # Sample -> strain -> reads -> assembly, plus a growth assay on the strain
+        con = duckdb.connect(str(self.db_path))
+        try:
+            con.execute(
+                "CREATE TABLE sys_process (sys_process_id VARCHAR, process_sys_oterm_name VARCHAR, date_end VARCHAR)"
+            )
+            con.execute(
+                "INSERT INTO sys_process VALUES ('P1', 'Isolation', '2019'), ('P2', 'Sequencing', NULL), "
+                "('P3', 'Assembly', NULL), ('P4', 'Assay Growth', NULL)"
+            )
+            con.execute(
+                "CREATE TABLE sys_process_input (sys_process_id VARCHAR, sdt_sample_id VARCHAR, "
+                "sdt_strain_id VARCHAR, sdt_reads_id VARCHAR)"
+            )
+            con.execute(
+                "INSERT INTO sys_process_input VALUES ('P1', 'Sample1', NULL, NULL), "
+                "('P2', NULL, 'Strain0000000', NULL), ('P3', NULL, NULL, 'Reads1'), ('P3', NULL, NULL, 'Reads2'), "
+                "('P4', NULL, 'Strain0000000', NULL)"
+            )
+            con.execute(
+                "CREATE TABLE sys_process_output (sys_process_id VARCHAR, sdt_strain_id VARCHAR, "
+                "sdt_reads_id VARCHAR, sdt_assembly_id VARCHAR, ddt_ndarray_id VARCHAR)"
+            )
+            con.execute(
+                "INSERT INTO sys_process_output VALUES ('P1', 'Strain0000000', NULL, NULL, NULL), "
+                "('P2', NULL, 'Reads1', NULL, NULL), ('P3', NULL, NULL, 'Assembly1', NULL), "
+                "('P4', NULL, NULL, NULL, 'Brick0000001')"
+            )
+        finally:
+            con.close()
+        return {}
+
+    def walk(self, direction, table, obj_id, **extra):
+        payload = {"database": "enigma_coral", "table": table, "id": obj_id, **extra}
+        return self.post(f"/delta/provenance/{direction}", payload)
+
+    def test_upstream_walk_returns_lineage(self):
+        data = self.walk("upstream", "sdt_strain", "Strain0000000")
+        self.assertEqual(
+            data["processes"],
+            [
+                {"id": "P1", "depth": 1, "process_term_name": "Isolation", "person_term_name": None,
+                 "protocol": None, "date_end": "2019", "inputs": ["sdt_sample:Sample1"],
+                 "outputs": ["sdt_strain:Strain0000000"]},
+            ],
+        )
+        self.assertEqual((data["start"], data["depth_limited"], data["truncated"]),
+                         ("sdt_strain:Strain0000000", False, False))
+
+    def test_downstream_walk_follows_outputs(self):
+        data = self.walk("downstream", "sdt_strain", "Strain0000000")
+        self.assertEqual([(p["id"], p["depth"]) for p in data["processes"]], [("P2", 1), ("P4", 1), ("P3", 2)])
+        self.assertEqual(data["processes"][2]["inputs"], ["sdt_reads:Reads1", "sdt_reads:Reads2"])
+
+    def test_depth_and_process_limits(self):
+        data = self.walk("downstream", "sdt_strain", "Strain0000000", max_depth=1)
+        self.assertEqual([p["id"] for p in data["processes"]], ["P2", "P4"])
+        self.assertTrue(data["depth_limited"])
+        data = self.walk("downstream", "sdt_strain", "Strain0000000", max_processes=1)
+        self.assertEqual([p["id"] for p in data["processes"]], ["P2"])
+        self.assertTrue(data["truncated"])
+
+    def test_unknown_object_has_no_processes(self):
+        self.assertEqual(self.walk("upstream", "sdt_strain", "Strain9999999")["processes"], [])
+        resp = self.client.post(
+            "/delta/provenance/upstream", json={"database": "enigma_coral", "table": "sdt_nope", "id": "x"}
+        )
+        self.assertEqual(resp.status_code, 404)
+
+
+class CompressionTests(ServerTestCase):
+    def extra_env(self):
+        replacement = Path(self._tmp.name) / "large.db"
+        _write_database(replacement, [f"FW{i:04d}" for i in range(200)])
+        os.replace(replacement, self.db_path)
+        return {}
+
+    def raw_post(self, path, payload, encoding):
+        with self.client.stream("POST", path, json=payload, headers={"Accept-Encoding": encoding}) as resp:
+            self.assertEqual(resp.status_code, 200)
+            return resp.headers, b"".join(resp.iter_raw())
+
+    def select_all(self, encoding):
+        return self.raw_post("/delta/tables/select", {"database": "enigma_coral", "table": "sdt_strain"}, encoding)
+
+    def test_negotiation_prefers_zstd_then_brotli_then_gzip(self):
+        self.assertEqual(compression.negotiate("gzip, deflate, br, zstd"), "zstd")
+        self.assertEqual(compression.negotiate("gzip, br"), "br")
+        self.assertEqual(compression.negotiate("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(compression.negotiate("zstd;q=0, *"), "br")
+        self.assertIsNone(compression.negotiate("identity"))
+
+    def test_large_responses_are_compressed(self):
+        _, plain = self.select_all("identity")
+        headers, body = self.select_all("gzip, br, zstd")
+        self.assertEqual(headers["content-encoding"], "zstd")
+        self.assertEqual(headers["vary"], "Accept-Encoding")
+        self.assertEqual(int(headers["content-length"]), len(body))
+        self.assertEqual(compression.zstd.decompress(body), plain)
+        headers, body = self.select_all("gzip")
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_small_responses_are_not_compressed(self):
+        headers, body = self.raw_post(
+            "/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"}, "zstd"
+        )
+        self.assertNotIn("content-encoding", headers)
+        self.assertEqual(json.loads(body), {"count": 200})
+
+    def test_streamed_responses_are_compressed_incrementally(self):
+        payload = {"query": "SELECT * FROM sdt_strain ORDER BY 1", "format": "ndjson"}
+        headers, body = self.raw_post("/delta/tables/query", payload, "br")
+        self.assertEqual(headers["content-encoding"], "br")
+        self.assertNotIn("content-length", headers)
+        lines = brotli.decompress(body).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 200)
+        self.assertEqual(json.loads(lines[0])["sdt_strain_name"], "FW0000")
+
+
+class MetricsTests(ServerTestCase):
+    def extra_env(self):
+        return {"SLOW_QUERY_SECONDS": "0.000001", "SLOW_QUERY_EXPLAIN_ANALYZE": "true", "ADMIN_TOKEN": "secret"}
+
+    def test_metrics_report_routes_tables_and_phases(self):
+        self.post("/delta/tables/select", {"database": "enigma_coral", "table": "sdt_strain", "limit": 2})
+        resp = self.client.post(
+            "/delta/tables/query", json={"query": "SELECT * FROM sdt_strain", "format": "ndjson"}
+        )
+        self.assertEqual(resp.status_code, 200)
+        text = self.client.get("/metrics").text
+        self.assertIn(
+            'duckdb_mcp_request_duration_seconds_count{route="/delta/tables/select",method="POST",status="200"} 1',
+            text,
+        )
+        self.assertIn('duckdb_mcp_table_rows_returned_total{route="/delta/tables/select",table="sdt_strain"} 2', text)
+        self.assertIn('duckdb_mcp_rows_returned_sum{route="/delta/tables/query"} 3', text)
+        for phase in ("queue", "duckdb", "serialize", "respond"):
+            self.assertIn(f'duckdb_mcp_request_phase_seconds_count{{route="/delta/tables/select",phase="{phase}"}}', text)
+        self.assertIn('duckdb_mcp_request_phase_seconds_count{route="/delta/tables/query",phase="serialize"}', text)
+        self.assertIn('duckdb_mcp_executor_queued{lane="query"} 0', text)
+
+    def test_slow_requests_are_logged_with_profile(self):
+        with self.assertLogs("duckdb_mcp.slow_query", level="WARNING"):
+            self.post("/delta/tables/count", {"database": "enigma_coral", "table": "sdt_strain"})
+        self.assertEqual(self.client.get("/admin/slow-queries").status_code, 403)
+        deadline = time.monotonic() + 5
+        while True:
+            entries = self.client.get("/admin/slow-queries", headers={"X-Admin-Token": "secret"}).json()
+            count = next(e for e in entries if e["route"] == "/delta/tables/count")
+            if "profile" in count or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        self.assertEqual(count["table"], "sdt_strain")
+        self.assertEqual(count["sql"], 'SELECT COUNT(*) FROM "sdt_strain"')
+        self.assertIn("sdt_strain", count["request"])
+        self.assertIn("duckdb", count["phases_ms"])
+        self.assertIn("Total Time", count["profile"])
+
+
+class QueryTests(ServerTestCase):
+    def test_query_runs_once_and_widens_floats(self):
+        query = "SELECT sdt_strain_name AS name, growth, growth AS NAME FROM sdt_strain WHERE growth < 1"
+        data = self.post("/delta/tables/query", {"query": query})
+        self.assertEqual(data["result"], [{"name": "FW106", "growth": 0.5, "NAME_1": 0.5}])
+        resp = self.client.post("/delta/tables/query", json={"query": query, "format": "arrow"})
+        table = pa.ipc.open_stream(resp.content).read_all()
+        self.assertEqual(table.schema.names, ["name", "growth", "NAME_1"])
+        self.assertEqual(table.schema.field("growth").type, pa.float64())
+
+    def test_json_rows_serialize_like_validated_models(self):
+        from src.service.models import TableQueryResponse
+
+        query = (
+            "SELECT 1.25::DECIMAL(10, 2) AS d, DATE '2024-02-29' AS day, [1, 2] AS ids, "
+            "'nan'::DOUBLE AS nan, {'a': 1} AS s, NULL AS missing"
+        )
+        resp = self.client.post("/delta/tables/query", json={"query": query})
+        self.assertEqual(resp.status_code, 200, resp.text)
+        with duckdb.connect() as con:
+            rows = con.execute(query).fetchall()
+            names = [d[0] for d in con.description]
+        expected = TableQueryResponse(result=[dict(zip(names, r)) for r in rows]).model_dump_json(
+            exclude={"truncated", "truncated_reason"}
+        )
+        self.assertEqual(resp.content.decode("utf-8"), expected)
+        self.assertEqual(
+            resp.json()["result"],
+            [{"d": "1.25", "day": "2024-02-29", "ids": [1, 2], "nan": None, "s": {"a": 1}, "missing": None}],
+        )
+
+    def test_validation_allows_keyword_like_column_names(self):
+        query = "SELECT sdt_strain_id AS date_update, sdt_strain_name AS replaced_by FROM sdt_strain -- latest\n"
+        data = self.post("/delta/tables/query", {"query": query + "ORDER BY 1 LIMIT 1"})
+        self.assertEqual(data["result"], [{"date_update": "Strain0000000", "replaced_by": "FW106"}])
+
+    def test_validation_rejects_non_select_and_system_sources(self):
+        for query in (
+            "DROP TABLE sdt_strain",
+            "SELECT 1; SELECT 2",
+            "SELECT * FROM information_schema.tables",
+            "SELECT * FROM read_csv('/etc/passwd')",
+            "SELECT * FROM '/tmp/data.parquet'",
+            "SELECT getenv('HOME')",
+            "DESCRIBE sdt_strain",
+            "SELECT FROM WHERE",
+        ):
+            resp = self.client.post("/delta/tables/query", json={"query": query})
+            self.assertEqual(resp.status_code, 400, query)
+        self.assertIsNone(sql_validation.validation_error("SELECT * FROM range(3)"))
+
+    def test_sample_where_clause_cannot_escape_the_filter(self):
+        sample = {"database": "enigma_coral", "table": "sdt_strain", "limit": 1}
+        for clause in (
+            "1=1 LIMIT 100000 OFFSET ? --",
+            "1=1 --",
+            "1=1 /* x",
+            "1=1); SELECT 1 FROM sdt_strain WHERE (1=1",
+            "1=1) UNION SELECT * FROM sdt_strain WHERE (1=1",
+            "1=1) ORDER BY 1 LIMIT 100000 OFFSET 0 --",
+            "1=1) LIMIT 100000 OFFSET (0",
+            "getenv('HOME') IS NOT NULL",
+        ):
+            resp = self.client.post("/delta/tables/sample", json={**sample, "where_clause": clause})
+            self.assertEqual(resp.status_code, 400, clause)
+        rows = self.post(
+            "/delta/tables/sample", {**sample, "limit": 10, "where_clause": "sdt_strain_name = 'MT42' OR growth > 2"}
+        )["sample"]
+        self.assertEqual([r["sdt_strain_name"] for r in rows], ["MT42", "GW101"])
+
+    def test_dedupe_column_names_matches_duckdb(self):
+        con = duckdb.connect()
+        for query in ("SELECT 1 AS x, 2 AS X, 3 AS x_1", "SELECT 1 AS x, 2 AS x, 3 AS x, 4 AS x_2"):
+            described = [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM ({query}) subq").fetchall()]
+            con.execute(query)
+            self.assertEqual(dedupe_column_names([d[0] for d in con.description]), described)
+        con.close()
+
+
+class QueryBudgetTests(ServerTestCase):
+    def extra_env(self):
+        return {"QUERY_MAX_ROWS": "2"}
+
+    def test_row_budget_truncates_and_flags(self):
+        resp = self.client.post("/delta/tables/query", json={"query": "SELECT sdt_strain_name FROM sdt_strain ORDER BY 1"})
+        self.assertEqual(resp.status_code, 200, resp.text)
+        self.assertEqual(resp.headers["X-Query-Truncated"], "rows")
+        self.assertEqual(
+            resp.json(),
+            {
+                "result": [{"sdt_strain_name": "FW106"}, {"sdt_strain_name": "GW101"}],
+                "truncated": True,
+                "truncated_reason": "rows",
+            },
+        )
+        resp = self.client.post("/delta/tables/query", json={"query": "SELECT 1 AS x UNION ALL SELECT 2;"})
+        self.assertNotIn("X-Query-Truncated", resp.headers)
+        self.assertEqual(resp.json(), {"result": [{"x": 1}, {"x": 2}]})
+
+    def test_streamed_results_are_exempt(self):
+        resp = self.client.post("/delta/tables/query", json={"query": "SELECT * FROM sdt_strain", "format": "ndjson"})
+        self.assertEqual(len(resp.text.splitlines()), 3)
+
+    def test_byte_budget_keeps_rows_that_fit(self):
+        con = duckdb.connect()
+        try:
+            budget = budget_module.QueryBudget(max_bytes=30)
+            result = budget_module.run_budgeted_query(con, "SELECT i FROM range(10) t(i)", budget)
+        finally:
+            con.close()
+        self.assertEqual((result.rows, result.truncated), (2, "bytes"))
+        self.assertEqual(json.loads(result.body)["result"], [{"i": 0}, {"i": 1}])
+
+    def test_time_budget_interrupts_statement(self):
+        con = duckdb.connect()
+        try:
+            budget = budget_module.QueryBudget(max_seconds=0.2)
+            result = budget_module.run_budgeted_query(con, "SELECT i FROM range(1000000000000) t(i)", budget)
+            self.assertEqual(result.truncated, "time")
+            self.assertGreater(result.rows, 0)
+            with self.assertRaises(HTTPException) as raised:
+                budget_module.run_budgeted_query(
+                    con, "SELECT COUNT(*) FROM range(100000000) a, range(100000) b", budget
+                )
+            self.assertEqual(raised.exception.status_code, 504)
+            # The pooled cursor stays usable after the interrupt
+            self.assertEqual(con.execute("SELECT 42").fetchone(), (42,))
+        finally:
+            con.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tools import walk_provenance  # noqa: E402
+
+
+class FakeSelect:
+    """Answers /tables/select from an in-memory table, like an offset-paging server."""
+
+    def __init__(self, rows, max_limit=10000, total_count=True, delay=0.0):
+        self.rows = rows
+        self.max_limit = max_limit
+        self.total_count = total_count
+        self.delay = delay
+        self.offsets = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, path, payload, headers):
+        with self.lock:
+            self.offsets.append(payload["offset"])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            limit = min(payload["limit"], self.max_limit)
+            offset = payload["offset"]
+            page = self.rows[offset:offset + limit]
+            return {
+                "data": page,
+                "pagination": {
+                    "limit": limit,
+                    "offset": offset,
+                    "total_count": len(self.rows) if self.total_count else None,
+                    "has_more": offset + limit < len(self.rows),
+                },
+            }
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class SelectAllRowsTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = [{"sys_process_id": f"Process{i:04d}"} for i in range(2500)]
+        patcher = mock.patch.object(walk_provenance, "CURSOR_PAGINATION", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def select_all(self, fake, **kwargs):
+        with mock.patch.object(walk_provenance, "post_json", fake):
+            return walk_provenance.select_all_rows({}, "sys_process", **kwargs)
+
+    def test_pages_are_fetched_concurrently_and_kept_in_order(self):
+        fake = FakeSelect(self.rows, delay=0.05)
+        rows = self.select_all(fake, limit=100, concurrency=4)
+        self.assertEqual(rows, self.rows)
+        self.assertEqual(sorted(fake.offsets), list(range(0, 2500, 100)))
+        self.assertEqual(fake.max_in_flight, 4)
+
+    def test_page_size_follows_server_cap(self):
+        fake = FakeSelect(self.rows, max_limit=300)
+        self.assertEqual(self.select_all(fake, limit=1000, concurrency=3), self.rows)
+        self.assertEqual(sorted(fake.offsets), list(range(0, 2500, 300)))
+
+    def test_without_total_count_pages_in_series(self):
+        fake = FakeSelect(self.rows, total_count=False)
+        self.assertEqual(self.select_all(fake, limit=1000, concurrency=4), self.rows)
+        self.assertEqual(fake.offsets, [0, 1000, 2000])
+        self.assertEqual(fake.max_in_flight, 1)
+
+    def test_rows_added_after_count_are_still_read(self):
+        fake = FakeSelect(self.rows[:2000])
+        original = fake.__call__
+
+        def growing(path, payload, headers):
+            data = original(path, payload, headers)
+            if payload["offset"] == 0:
+                fake.rows = self.rows
+            return data
+
+        self.assertEqual(self.select_all(growing, limit=1000, concurrency=4), self.rows)
+        self.assertEqual(sorted(fake.offsets), [0, 1000, 2000])
+
+    def test_failed_page_raises(self):
+        fake = FakeSelect(self.rows)
+
+        def failing(path, payload, headers):
+            if payload["offset"] == 1000:
+                raise ValueError("boom")
+            return fake(path, payload, headers)
+
+        with self.assertRaises(ValueError):
+            self.select_all(failing, limit=500, concurrency=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
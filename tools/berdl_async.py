@@ -0,0 +1,120 @@
+"""asyncio client for the BERDL MCP API, for lookups that fan out.
+
+``AsyncBerdlClient`` posts with httpx and keeps at most ``concurrency`` requests
+in flight. Identical payloads that are already in flight share one request.
+Responses go through the same cache backend and keys as ``berdl_client``, so
+sync and async callers hit each other's entries, and failures are retried with
+the same statuses and backoff. Cache reads and writes (SQLite I/O and
+compression) run in worker threads, so they do not stall requests in flight.
+
+Environment:
+- ``BERDL_ASYNC_CONCURRENCY``: requests in flight per client (default 8).
+- The timeout, retry and cache variables read by ``berdl_client``.
+"""
+
+import asyncio
+import copy
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from tools.berdl_client import (
+    DEFAULT_BASE_URL,
+    REQUEST_RETRIES,
+    REQUEST_TIMEOUT,
+    RETRY_STATUSES,
+    CacheBackend,
+    cache_from_env,
+    cache_key,
+    debug,
+    report_timeout,
+    retry_delay,
+    summarize_payload,
+)
+
+ASYNC_CONCURRENCY = int(os.environ.get("BERDL_ASYNC_CONCURRENCY", "8"))
+
+
+def _retryable(exc: httpx.HTTPError) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status in RETRY_STATUSES or status >= 500
+    return isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError))
+
+
+class AsyncBerdlClient:
+    """POSTs JSON to the MCP API from coroutines; use as ``async with AsyncBerdlClient(...) as client``."""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = REQUEST_TIMEOUT,
+        retries: int = REQUEST_RETRIES,
+        cache: Optional[CacheBackend] = None,
+        concurrency: int = ASYNC_CONCURRENCY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.base_url = base_url
+        self.retries = max(1, retries)
+        self.cache: CacheBackend = cache if cache is not None else cache_from_env()
+        self.sleep = sleep
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._in_flight: Dict[str, "asyncio.Task[Any]"] = {}
+        limits = httpx.Limits(max_connections=max(1, concurrency), max_keepalive_connections=max(1, concurrency))
+        self._client = httpx.AsyncClient(timeout=timeout, limits=limits, transport=transport)
+
+    async def __aenter__(self) -> "AsyncBerdlClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def post_json(self, path: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Any:
+        url = f"{self.base_url}{path}"
+        cached = await asyncio.to_thread(self.cache.get, url, payload)
+        if cached is not None:
+            debug(f"BERDL cache hit {path} ({summarize_payload(payload)})")
+            return cached
+        key = cache_key(url, payload)
+        task = self._in_flight.get(key)
+        if task is not None:
+            debug(f"BERDL coalesced {path} ({summarize_payload(payload)})")
+            # Each waiter gets its own copy, as it would from a separate request
+            return copy.deepcopy(await asyncio.shield(task))
+        task = asyncio.ensure_future(self._post(url, path, payload, headers))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        # Shielded so that cancelling the first caller does not fail the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter was cancelled
+            task.exception()
+
+    async def _post(self, url: str, path: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Any:
+        for attempt in range(self.retries):
+            try:
+                async with self._semaphore:
+                    debug(f"BERDL POST {path} ({summarize_payload(payload)}) attempt={attempt + 1}")
+                    resp = await self._client.post(url, json=payload, headers=headers)
+                resp.raise_for_status()
+                data = resp.json()
+            except httpx.HTTPError as exc:
+                response = exc.response if isinstance(exc, httpx.HTTPStatusError) else None
+                if not _retryable(exc) or attempt == self.retries - 1:
+                    raise
+                report_timeout(path, payload, response.status_code if response is not None else None)
+                delay = retry_delay(attempt, response)
+                debug(f"BERDL {path} failed ({type(exc).__name__}: {exc}); retrying in {delay:.1f}s")
+                await self.sleep(delay)
+                continue
+            await asyncio.to_thread(self.cache.set, url, payload, data)
+            return data
+        raise RuntimeError(f"Request failed for {url}")
@@ -0,0 +1,640 @@
+"""Shared HTTP client for the BERDL MCP API.
+
+Every tool posts through one ``requests.Session`` per process, so connections
+(and TLS sessions) are kept alive and reused instead of opened per request.
+Failed requests are retried with exponential backoff and jitter, honouring
+``Retry-After``; responses can be cached through a pluggable backend, by default
+a SQLite database in the ``.berdl_cache`` directory. Cached responses record
+the tables they were read from, so that a sync only invalidates the tables
+whose data version changed (``tools/invalidate_berdl_cache.py``).
+
+Environment:
+- ``BERDL_REQUEST_TIMEOUT`` / ``BERDL_REQUEST_RETRIES``: per-attempt timeout
+  (seconds, default 180) and attempts (default 5).
+- ``BERDL_POOL_SIZE``: keep-alive connections per host (default 16).
+- ``BERDL_CACHE_DISABLE``, ``BERDL_CACHE_DIR``, ``BERDL_CACHE_TTL_SECONDS``:
+  response cache switch, location (default ``./.berdl_cache``) and max age.
+- ``BERDL_CACHE_TTL_SCHEMA_SECONDS``, ``BERDL_CACHE_TTL_COUNT_SECONDS``,
+  ``BERDL_CACHE_TTL_ROWS_SECONDS``: max age per endpoint class, overriding
+  ``BERDL_CACHE_TTL_SECONDS`` (see ``CACHE_ENDPOINT_CLASSES``).
+- ``BERDL_CACHE_MAX_BYTES``: compressed size above which the least recently
+  used responses are evicted (default 2 GiB, 0 for no limit).
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Protocol
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+DEFAULT_BASE_URL = "https://hub.berdl.kbase.us/apis/mcp"
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in {"1", "true", "yes"}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "")
+    return int(value) if value.isdigit() else default
+
+
+REQUEST_TIMEOUT = _env_int("BERDL_REQUEST_TIMEOUT", 180)
+REQUEST_RETRIES = max(1, _env_int("BERDL_REQUEST_RETRIES", 5))
+# Backoff before retry n (0-based): a random wait in [b/2, b] for b = base * 2**n, capped
+RETRY_BACKOFF_SECONDS = 4.0
+RETRY_BACKOFF_MAX_SECONDS = 60.0
+# Longest Retry-After the client is willing to wait
+RETRY_AFTER_MAX_SECONDS = 300.0
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+POOL_SIZE = _env_int("BERDL_POOL_SIZE", 16)
+
+_DEBUG = _env_flag("BERDL_DEBUG")
+
+
+def set_debug(enabled: bool) -> None:
+    global _DEBUG
+    _DEBUG = enabled
+
+
+def debug_enabled() -> bool:
+    return _DEBUG
+
+
+def debug(message: str) -> None:
+    if _DEBUG:
+        print(f"[debug] {message}", file=sys.stderr)
+
+
+def summarize_payload(payload: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for key in ["database", "table", "limit", "offset"]:
+        if key in payload:
+            parts.append(f"{key}={payload[key]}")
+    columns = payload.get("columns")
+    if isinstance(columns, list):
+        parts.append(f"columns={len(columns)}")
+    filters = payload.get("filters")
+    if isinstance(filters, list):
+        parts.append(f"filters={len(filters)}")
+    order_by = payload.get("order_by")
+    if isinstance(order_by, list):
+        parts.append(f"order_by={len(order_by)}")
+    return ", ".join(parts)
+
+
+# ---- response cache ----
+def cache_key(url: str, payload: Dict[str, Any]) -> str:
+    raw = json.dumps({"url": url, "payload": payload}, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class CacheBackend(Protocol):
+    def get(self, url: str, payload: Dict[str, Any]) -> Optional[Any]:
+        ...
+
+    def set(self, url: str, payload: Dict[str, Any], response: Any) -> None:
+        ...
+
+
+class NullCache:
+    """Cache backend that never stores anything (live reads, BERDL_CACHE_DISABLE)."""
+
+    def get(self, url: str, payload: Dict[str, Any]) -> Optional[Any]:
+        return None
+
+    def set(self, url: str, payload: Dict[str, Any], response: Any) -> None:
+        return None
+
+
+# Endpoint class of each cached path, for per-class TTLs; every other path is "rows"
+CACHE_ENDPOINT_CLASSES = {
+    "/delta/databases/list": "schema",
+    "/delta/databases/tables/list": "schema",
+    "/delta/databases/tables/schema": "schema",
+    "/delta/databases/structure": "schema",
+    "/delta/tables/count": "count",
+    "/delta/tables/stats": "count",
+}
+CACHE_MAX_BYTES = _env_int("BERDL_CACHE_MAX_BYTES", 2 * 1024**3)
+# Hits refresh an entry's LRU timestamp at most this often
+CACHE_ACCESS_RESOLUTION_SECONDS = 60.0
+
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    path TEXT,
+    table_name TEXT,
+    url TEXT,
+    payload TEXT,
+    response BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_path_table ON responses (path, table_name);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses
+    BEGIN UPDATE totals SET bytes = bytes + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses
+    BEGIN UPDATE totals SET bytes = bytes - OLD.size + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses
+    BEGIN UPDATE totals SET bytes = bytes - OLD.size; END;
+CREATE TABLE IF NOT EXISTS response_tables (
+    key TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    PRIMARY KEY (key, table_name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS response_tables_table ON response_tables (table_name);
+CREATE TRIGGER IF NOT EXISTS responses_delete_tables AFTER DELETE ON responses
+    BEGIN DELETE FROM response_tables WHERE key = OLD.key; END;
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+# PRAGMA user_version of a database whose responses all have response_tables rows
+_CACHE_SCHEMA_VERSION = 1
+
+# Endpoints whose response depends only on the tables named in the payload;
+# any other response (SQL queries, search, provenance, listings) depends on "*"
+CACHE_TABLE_SCOPED_PATHS = {
+    "/delta/databases/tables/schema",
+    "/delta/tables/count",
+    "/delta/tables/sample",
+    "/delta/tables/select",
+    "/delta/tables/lookup",
+    "/delta/tables/stats",
+}
+ANY_TABLE = "*"
+
+
+def endpoint_path(url: str) -> str:
+    """The API path of a request URL, without the server's base path (``/delta/tables/select``)."""
+    path = urllib.parse.urlparse(url).path
+    index = path.find("/delta/")
+    return path[index:] if index >= 0 else path
+
+
+def endpoint_class(path: str) -> str:
+    return CACHE_ENDPOINT_CLASSES.get(path, "rows")
+
+
+def response_tables(path: Optional[str], payload: Any) -> List[str]:
+    """Tables whose data a cached response was read from, or ``["*"]`` if that is not known."""
+    if path not in CACHE_TABLE_SCOPED_PATHS or not isinstance(payload, dict):
+        return [ANY_TABLE]
+    tables = [payload.get("table")]
+    for join in payload.get("joins") or []:
+        if isinstance(join, dict):
+            tables.append(join.get("table"))
+    if not all(isinstance(table, str) and table for table in tables):
+        return [ANY_TABLE]
+    return sorted(set(tables))
+
+
+def _encode_response(response: Any) -> bytes:
+    return zlib.compress(json.dumps(response, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode_response(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+class SqliteCache:
+    """Responses in one SQLite database (WAL mode) in ``directory``, zlib-compressed.
+
+    Entries are indexed by endpoint path and by the tables they were read from.
+    ``ttl_seconds`` is the max age of every entry, unless ``class_ttl_seconds``
+    sets one for its endpoint class ("schema", "count" or "rows").
+    ``apply_table_versions`` drops only the entries of tables whose data version
+    changed, so the rest stay warm across syncs. Least recently used entries are
+    evicted once the compressed responses exceed ``max_bytes``. ``<sha256>.json`` files
+    left in the directory by the previous one-file-per-request cache are imported
+    and removed on first use.
+    """
+
+    FILENAME = "cache.sqlite3"
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: Optional[int] = None,
+        class_ttl_seconds: Optional[Dict[str, int]] = None,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILENAME)
+        self.ttl_seconds = ttl_seconds
+        self.class_ttl_seconds = dict(class_ttl_seconds or {})
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._unavailable = False
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        con = getattr(self._local, "con", None)
+        if con is not None or self._unavailable:
+            return con
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            con = sqlite3.connect(self.path, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    con.executescript(_CACHE_SCHEMA)
+                    self._upgrade(con)
+                    self._import_json_files(con)
+                    self._initialized = True
+        except (OSError, sqlite3.Error) as exc:
+            debug(f"BERDL cache unavailable at {self.path}: {exc}")
+            self._unavailable = True
+            return None
+        self._local.con = con
+        return con
+
+    def ttl_for(self, path: str) -> Optional[int]:
+        return self.class_ttl_seconds.get(endpoint_class(path), self.ttl_seconds)
+
+    def get(self, url: str, payload: Dict[str, Any]) -> Optional[Any]:
+        con = self._connect()
+        if con is None:
+            return None
+        key = cache_key(url, payload)
+        try:
+            row = con.execute(
+                "SELECT response, created, accessed FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            blob, created, accessed = row
+            now = time.time()
+            ttl = self.ttl_for(endpoint_path(url))
+            if ttl is not None and now - created > ttl:
+                return None
+            if now - accessed > CACHE_ACCESS_RESOLUTION_SECONDS:
+                with con:
+                    con.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            return _decode_response(blob)
+        except (sqlite3.Error, zlib.error, ValueError):
+            return None
+
+    def set(self, url: str, payload: Dict[str, Any], response: Any) -> None:
+        con = self._connect()
+        if con is None:
+            return
+        path = endpoint_path(url)
+        blob = _encode_response(response)
+        now = time.time()
+        key = cache_key(url, payload)
+        try:
+            with con:
+                con.execute(
+                    "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET response = excluded.response, size = excluded.size, "
+                    "created = excluded.created, accessed = excluded.accessed",
+                    (
+                        key,
+                        path,
+                        payload.get("table"),
+                        url,
+                        json.dumps(payload, sort_keys=True, default=str),
+                        blob,
+                        len(blob),
+                        now,
+                        now,
+                    ),
+                )
+                con.executemany(
+                    "INSERT OR IGNORE INTO response_tables VALUES (?, ?)",
+                    [(key, table) for table in response_tables(path, payload)],
+                )
+            self._evict(con)
+        except sqlite3.Error as exc:
+            debug(f"BERDL cache write failed: {exc}")
+
+    def apply_table_versions(self, versions: Dict[str, str]) -> List[str]:
+        """Record each table's data version and drop the entries of tables whose version changed.
+
+        A table changed if its version differs from the one last applied, or none
+        was applied yet. Entries not tied to specific tables ("*") are dropped
+        whenever any table changed. Returns the changed tables.
+        """
+        con = self._connect()
+        if con is None:
+            return []
+        now = time.time()
+        try:
+            with con:
+                applied = dict(con.execute("SELECT table_name, version FROM table_versions"))
+                changed = sorted(table for table, version in versions.items() if applied.get(table) != version)
+                if changed:
+                    con.executemany(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM response_tables WHERE table_name = ?)",
+                        [(table,) for table in changed + [ANY_TABLE]],
+                    )
+                con.executemany(
+                    "INSERT INTO table_versions VALUES (?, ?, ?) ON CONFLICT (table_name) DO UPDATE "
+                    "SET version = excluded.version, updated = excluded.updated",
+                    [(table, versions[table], now) for table in changed],
+                )
+        except sqlite3.Error as exc:
+            debug(f"BERDL cache invalidation failed: {exc}")
+            return []
+        return changed
+
+    def cached_tables(self) -> List[str]:
+        """Tables that at least one cached response was read from."""
+        con = self._connect()
+        if con is None:
+            return []
+        rows = con.execute(
+            "SELECT DISTINCT table_name FROM response_tables WHERE table_name != ? ORDER BY table_name", (ANY_TABLE,)
+        )
+        return [row[0] for row in rows]
+
+    def total_bytes(self) -> int:
+        con = self._connect()
+        if con is None:
+            return 0
+        return int(con.execute("SELECT bytes FROM totals").fetchone()[0])
+
+    def _evict(self, con: sqlite3.Connection) -> None:
+        if not self.max_bytes:
+            return
+        total = con.execute("SELECT bytes FROM totals").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so that the next few writes do not evict again
+        excess = total - int(self.max_bytes * 0.9)
+        keys = []
+        for key, size in con.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        with con:
+            con.executemany("DELETE FROM responses WHERE key = ?", keys)
+
+    def _upgrade(self, con: sqlite3.Connection) -> None:
+        """Add the response_tables rows of entries written before they were tracked."""
+        if con.execute("PRAGMA user_version").fetchone()[0] >= _CACHE_SCHEMA_VERSION:
+            return
+        rows = []
+        for key, path, payload in con.execute("SELECT key, path, payload FROM responses"):
+            try:
+                payload = json.loads(payload) if payload is not None else None
+            except ValueError:
+                payload = None
+            rows.extend((key, table) for table in response_tables(path, payload))
+        with con:
+            con.executemany("INSERT OR IGNORE INTO response_tables VALUES (?, ?)", rows)
+            con.execute(f"PRAGMA user_version = {_CACHE_SCHEMA_VERSION}")
+
+    def _import_json_files(self, con: sqlite3.Connection) -> None:
+        """Move ``<sha256>.json`` entries of the file-per-request cache into the database."""
+        try:
+            names = [entry.name for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        except OSError:
+            return
+        if not names:
+            return
+        debug(f"importing {len(names)} cache files from {self.directory}")
+        for start in range(0, len(names), 1000):
+            rows = []
+            tables = []
+            imported = []
+            for name in names[start : start + 1000]:
+                file_path = os.path.join(self.directory, name)
+                try:
+                    with open(file_path, "r", encoding="utf-8") as handle:
+                        cached = json.load(handle)
+                    created = os.path.getmtime(file_path)
+                except (OSError, ValueError):
+                    continue
+                url = payload = None
+                response = cached
+                if isinstance(cached, dict) and "query" in cached and "response" in cached:
+                    query = cached.get("query") or {}
+                    url, payload, response = query.get("url"), query.get("payload"), cached["response"]
+                path = endpoint_path(url) if isinstance(url, str) else None
+                table = payload.get("table") if isinstance(payload, dict) else None
+                blob = _encode_response(response)
+                key = name[: -len(".json")]
+                tables.extend((key, table_name) for table_name in response_tables(path, payload))
+                rows.append(
+                    (
+                        key,
+                        path,
+                        table,
+                        url,
+                        json.dumps(payload, sort_keys=True, default=str) if payload is not None else None,
+                        blob,
+                        len(blob),
+                        created,
+                        created,
+                    )
+                )
+                imported.append(file_path)
+            with con:
+                con.executemany("INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                con.executemany("INSERT OR IGNORE INTO response_tables VALUES (?, ?)", tables)
+            for file_path in imported:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+
+
+def cache_from_env() -> CacheBackend:
+    if _env_flag("BERDL_CACHE_DISABLE"):
+        return NullCache()
+    directory = os.environ.get("BERDL_CACHE_DIR", os.path.join(os.getcwd(), ".berdl_cache"))
+    ttl = os.environ.get("BERDL_CACHE_TTL_SECONDS")
+    class_ttl = {}
+    for name in ("schema", "count", "rows"):
+        value = os.environ.get(f"BERDL_CACHE_TTL_{name.upper()}_SECONDS", "")
+        if value.isdigit():
+            class_ttl[name] = int(value)
+    return SqliteCache(directory, int(ttl) if ttl and ttl.isdigit() else None, class_ttl)
+
+
+# ---- retries ----
+def _retry_after_seconds(response: Optional[Any]) -> Optional[float]:
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def retry_delay(attempt: int, response: Optional[Any] = None) -> float:
+    """Seconds to wait before retry ``attempt`` (0-based), given a requests or httpx response."""
+    retry_after = _retry_after_seconds(response)
+    if retry_after is not None:
+        return min(retry_after, RETRY_AFTER_MAX_SECONDS)
+    # Jitter keeps parallel workers from retrying in lockstep
+    backoff = min(RETRY_BACKOFF_SECONDS * 2 ** attempt, RETRY_BACKOFF_MAX_SECONDS)
+    return random.uniform(backoff / 2, backoff)
+
+
+def report_timeout(path: str, payload: Dict[str, Any], status: Optional[int]) -> None:
+    """Tell the user about a request the server timed out (408/504) before it is retried."""
+    if status in {408, 504}:
+        print(
+            "[info] BERDL request timed out. "
+            f"path={path} payload={json.dumps(payload, sort_keys=True, default=str)}",
+            file=sys.stderr,
+        )
+
+
+def _retryable(exc: requests.RequestException) -> bool:
+    if isinstance(exc, requests.HTTPError):
+        response = exc.response
+        return response is None or response.status_code in RETRY_STATUSES or response.status_code >= 500
+    return isinstance(exc, (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError))
+
+
+class BerdlClient:
+    """POSTs JSON to the MCP API over a pooled session, with retries and a response cache."""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = REQUEST_TIMEOUT,
+        retries: int = REQUEST_RETRIES,
+        cache: Optional[CacheBackend] = None,
+        pool_size: int = POOL_SIZE,
+        proxies: Optional[Dict[str, str]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.cache: CacheBackend = cache if cache is not None else cache_from_env()
+        self.sleep = sleep
+        self.session = requests.Session()
+        # Retries are handled here (with Retry-After and jitter), not by urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Every encoding urllib3 can decode here: zstd and br with urllib3[brotli,zstd], else gzip
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        if proxies:
+            self.session.proxies.update(proxies)
+
+    def post_json(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        base_url: Optional[str] = None,
+    ) -> Any:
+        url = f"{base_url or self.base_url}{path}"
+        cached = self.cache.get(url, payload)
+        if cached is not None:
+            debug(f"BERDL cache hit {path} ({summarize_payload(payload)})")
+            return cached
+        for attempt in range(self.retries):
+            try:
+                debug(f"BERDL POST {path} ({summarize_payload(payload)}) attempt={attempt + 1}")
+                resp = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+                resp.raise_for_status()
+                data = resp.json()
+            except requests.RequestException as exc:
+                response = getattr(exc, "response", None)
+                if not _retryable(exc) or attempt == self.retries - 1:
+                    raise
+                report_timeout(path, payload, response.status_code if response is not None else None)
+                delay = retry_delay(attempt, response)
+                debug(f"BERDL {path} failed ({type(exc).__name__}: {exc}); retrying in {delay:.1f}s")
+                self.sleep(delay)
+                continue
+            self.cache.set(url, payload, data)
+            return data
+        raise RuntimeError(f"Request failed for {url}")
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_CLIENT: Optional[BerdlClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> BerdlClient:
+    """The process-wide client, created on first use from the environment."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = BerdlClient(os.environ.get("BERDL_BASE_URL", DEFAULT_BASE_URL))
+        return _CLIENT
+
+
+def set_client(client: Optional[BerdlClient]) -> None:
+    """Replace the process-wide client (e.g. a different cache backend); None resets it."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        previous, _CLIENT = _CLIENT, client
+    if previous is not None and previous is not client:
+        previous.close()
+
+
+def post_json(path: str, payload: Dict[str, Any], headers: Dict[str, str], base_url: Optional[str] = None) -> Any:
+    return get_client().post_json(path, payload, headers, base_url=base_url)
+
+
+# ---- table data versions ----
+def manifest_table_versions(manifest_path: str) -> Dict[str, str]:
+    """``table_sha256`` of every table in a sync manifest (``manifests/current.json``)."""
+    with open(manifest_path, "r", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    versions = {}
+    for row in manifest.get("tables", []):
+        version = (row.get("hashes") or {}).get("table_sha256")
+        if row.get("table") and version:
+            versions[row["table"]] = f"sha256:{version}"
+    return versions
+
+
+def probe_table_versions(
+    client: BerdlClient, headers: Dict[str, str], database: str, tables: List[str]
+) -> Dict[str, str]:
+    """Row count of each table as its version, read live; a table the server rejects is "missing".
+
+    Cheaper than a manifest but weaker: a sync that rewrites rows without
+    changing their number is not seen as a change.
+    """
+    versions = {}
+    for table in tables:
+        try:
+            data = client.post_json("/delta/tables/count", {"database": database, "table": table}, headers)
+        except requests.HTTPError as exc:
+            if exc.response is None or exc.response.status_code >= 500:
+                raise
+            versions[table] = "missing"
+            continue
+        versions[table] = f"count:{data.get('count')}"
+    return versions
@@ -16,6 +16,7 @@ It generates:
 from __future__ import annotations
 
 import argparse
+import asyncio
 import csv
 import json
 import os
@@ -37,13 +38,17 @@ from tools.walk_provenance import (  # noqa: E402
     discover_tables,
     get_table_schema,
     load_process_cache,
+    lookup_rows,
     NameResolver,
     parse_token,
+    reachable_tokens,
     select_all_rows,
+    select_all_rows_async,
     set_debug,
     walk_provenance,
 )
 from tools import walk_provenance as walk_provenance_module  # noqa: E402
+from tools.berdl_async import AsyncBerdlClient  # noqa: E402
 
 
 FASTQ_HOST = "genomics.lbl.gov"
@@ -497,16 +502,60 @@ def get_table_columns(
     return columns
 
 
+# (table, filters, columns) arguments of a select_first_row call
+FirstRowQuery = Tuple[str, List[Dict[str, Any]], Sequence[str]]
+
+# select_first_row results looked up ahead of time by prefetch_first_rows
+_PREFETCHED_FIRST_ROWS: Dict[str, Optional[Dict[str, Any]]] = {}
+
+
+def _first_row_key(table: str, filters: List[Dict[str, Any]], columns: Sequence[str]) -> str:
+    return json.dumps([table, filters, list(columns)], sort_keys=True, default=str)
+
+
 def select_first_row(
     headers: Dict[str, str],
     table: str,
     filters: List[Dict[str, Any]],
     columns: Sequence[str],
 ) -> Optional[Dict[str, Any]]:
+    key = _first_row_key(table, filters, columns)
+    if key in _PREFETCHED_FIRST_ROWS:
+        return _PREFETCHED_FIRST_ROWS[key]
     rows = select_all_rows(headers, table, columns=columns, filters=filters, limit=1)
     return rows[0] if rows else None
 
 
+def prefetch_first_rows(headers: Dict[str, str], queries: Iterable[FirstRowQuery]) -> None:
+    """Run independent select_first_row lookups concurrently, ahead of the code that needs them.
+
+    A lookup that fails here is left to select_first_row, which retries it and
+    reports the error as usual.
+    """
+    pending: Dict[str, FirstRowQuery] = {}
+    for table, filters, columns in queries:
+        key = _first_row_key(table, filters, columns)
+        if key not in _PREFETCHED_FIRST_ROWS:
+            pending[key] = (table, filters, columns)
+    if not pending:
+        return
+
+    async def fetch_all() -> List[Any]:
+        async with AsyncBerdlClient(walk_provenance_module.BASE_URL) as client:
+            return await asyncio.gather(
+                *(
+                    select_all_rows_async(client, headers, table, columns=columns, filters=filters, limit=1)
+                    for table, filters, columns in pending.values()
+                ),
+                return_exceptions=True,
+            )
+
+    for key, rows in zip(pending, asyncio.run(fetch_all())):
+        if isinstance(rows, BaseException):
+            continue
+        _PREFETCHED_FIRST_ROWS[key] = rows[0] if rows else None
+
+
 def select_row_by_id(
     headers: Dict[str, str],
     table: str,
@@ -518,6 +567,18 @@ def select_row_by_id(
     return select_first_row(headers, table, filters, columns)
 
 
+def select_rows_by_ids(
+    headers: Dict[str, str],
+    table: str,
+    obj_ids: Iterable[str],
+    columns: Sequence[str],
+) -> Dict[str, Dict[str, Any]]:
+    """First row for each id, fetched with one batch lookup instead of a request per id."""
+    id_col = f"{table}_id"
+    rows = lookup_rows(headers, table, id_col, obj_ids, columns)
+    return {obj_id: matches[0] for obj_id, matches in rows.items() if matches}
+
+
 def normalize_protocol_names(protocol_field: Any) -> List[str]:
     if protocol_field is None:
         return []
@@ -669,11 +730,9 @@ def find_oldest_reads_with_fastq(
             return False
         return ".fastq" in link_lower or ".fq" in link_lower
 
-    def get_reads_data(obj_id: str) -> Dict[str, Any]:
-        if obj_id in read_cache:
-            return read_cache[obj_id]
+    def reads_columns() -> List[str]:
         columns = get_table_columns(headers, "sdt_reads", column_cache)
-        desired = [
+        return [
             col
             for col in [
                 "sdt_reads_id",
@@ -684,11 +743,34 @@ def find_oldest_reads_with_fastq(
             ]
             if col in columns
         ]
-        row = select_row_by_id(headers, "sdt_reads", obj_id, desired)
+
+    def get_reads_data(obj_id: str) -> Dict[str, Any]:
+        if obj_id in read_cache:
+            return read_cache[obj_id]
+        row = select_row_by_id(headers, "sdt_reads", obj_id, reads_columns())
         reads_data = row or {}
         read_cache[obj_id] = reads_data
         return reads_data
 
+    def prefetch_reads_data() -> None:
+        # Every reads object the walks below can visit: the genome's upstream
+        # lineage plus everything downstream of the reads in it.
+        upstream = reachable_tokens(genome_token, out_lookup, "input_objs")
+        tokens = list(upstream)
+        for token in upstream:
+            if parse_token(token)[0] == "sdt_reads":
+                tokens.extend(reachable_tokens(token, downstream_lookup, "output_obj"))
+        reads_ids = []
+        for token in tokens:
+            table_name, obj_id = parse_token(token)
+            if table_name == "sdt_reads" and obj_id and obj_id not in read_cache:
+                reads_ids.append(obj_id)
+        if not reads_ids:
+            return
+        rows_by_id = select_rows_by_ids(headers, "sdt_reads", reads_ids, reads_columns())
+        for obj_id in reads_ids:
+            read_cache[obj_id] = rows_by_id.get(obj_id) or {}
+
     def reads_process_flags(reads_token: str) -> Tuple[bool, bool, bool]:
         produced_by_copy = False
         produced_by_reads_processing = False
@@ -1364,6 +1446,7 @@ def find_oldest_reads_with_fastq(
             reads["source_sequencing_technology"] = ancestor_seq_tech
         return chosen
 
+    prefetch_reads_data()
     reads_inputs = collect_reads_inputs(genome_token)
     if reads_inputs:
         log_info(f"{log_label or ''}Assembly reads inputs: {len(reads_inputs)}")
@@ -1439,6 +1522,30 @@ def find_samples_from_genome(
     visited: set[str] = set()
     samples_found: List[Dict[str, Any]] = []
 
+    # Fetch every upstream sample in one lookup instead of one request per sample
+    sample_ids = [
+        obj_id
+        for table_name, obj_id in map(parse_token, reachable_tokens(genome_token, out_lookup, "input_objs"))
+        if table_name == "sdt_sample" and obj_id
+    ]
+    sample_rows: Dict[str, Dict[str, Any]] = {}
+    if sample_ids:
+        columns = get_table_columns(headers, "sdt_sample", column_cache)
+        desired = [
+            col
+            for col in [
+                "sdt_sample_id",
+                "sdt_sample_name",
+                "sdt_location_name",
+                "date",
+                "depth_meter",
+                "material_sys_oterm_name",
+                "sdt_sample_description",
+            ]
+            if col in columns
+        ]
+        sample_rows = select_rows_by_ids(headers, "sdt_sample", sample_ids, desired)
+
     def walk_upstream(obj_token: str, current_protocol: Optional[str] = None) -> None:
         if obj_token in visited:
             return
@@ -1449,21 +1556,7 @@ def find_samples_from_genome(
             return
 
         if table_name == "sdt_sample":
-            columns = get_table_columns(headers, "sdt_sample", column_cache)
-            desired = [
-                col
-                for col in [
-                    "sdt_sample_id",
-                    "sdt_sample_name",
-                    "sdt_location_name",
-                    "date",
-                    "depth_meter",
-                    "material_sys_oterm_name",
-                    "sdt_sample_description",
-                ]
-                if col in columns
-            ]
-            sample_row = select_row_by_id(headers, "sdt_sample", obj_id, desired)
+            sample_row = sample_rows.get(obj_id)
             if sample_row:
                 samples_found.append(
                     {
@@ -1537,23 +1630,41 @@ def get_location_info(
     }
 
 
-def get_strain_info(
+def genome_row_query(genome_name: str, columns: Sequence[str]) -> FirstRowQuery:
+    return ("sdt_genome", [{"column": "sdt_genome_name", "operator": "=", "value": genome_name}], columns)
+
+
+def strain_info_query(
     headers: Dict[str, str],
     strain_name: str,
     column_cache: Dict[str, List[str]],
-) -> Optional[Dict[str, Any]]:
-    if not strain_name:
-        return None
+) -> FirstRowQuery:
     columns = get_table_columns(headers, "sdt_strain", column_cache)
     desired = [
         col for col in ["sdt_strain_name", "sdt_strain_description"] if col in columns
     ]
-    row = select_first_row(
-        headers,
-        "sdt_strain",
-        [{"column": "sdt_strain_name", "operator": "=", "value": strain_name}],
-        desired,
-    )
+    return ("sdt_strain", [{"column": "sdt_strain_name", "operator": "=", "value": strain_name}], desired)
+
+
+def strain_id_query(
+    headers: Dict[str, str],
+    strain_name: str,
+    column_cache: Dict[str, List[str]],
+) -> Optional[FirstRowQuery]:
+    columns = get_table_columns(headers, "sdt_strain", column_cache)
+    if "sdt_strain_id" not in columns or "sdt_strain_name" not in columns:
+        return None
+    return ("sdt_strain", [{"column": "sdt_strain_name", "operator": "=", "value": strain_name}], ["sdt_strain_id"])
+
+
+def get_strain_info(
+    headers: Dict[str, str],
+    strain_name: str,
+    column_cache: Dict[str, List[str]],
+) -> Optional[Dict[str, Any]]:
+    if not strain_name:
+        return None
+    row = select_first_row(headers, *strain_info_query(headers, strain_name, column_cache))
     if not row:
         return None
     return {
@@ -1569,18 +1680,35 @@ def get_strain_id(
 ) -> Optional[str]:
     if not strain_name:
         return None
-    columns = get_table_columns(headers, "sdt_strain", column_cache)
-    if "sdt_strain_id" not in columns or "sdt_strain_name" not in columns:
+    query = strain_id_query(headers, strain_name, column_cache)
+    if query is None:
         return None
-    row = select_first_row(
-        headers,
-        "sdt_strain",
-        [{"column": "sdt_strain_name", "operator": "=", "value": strain_name}],
-        ["sdt_strain_id"],
-    )
+    row = select_first_row(headers, *query)
     return row.get("sdt_strain_id") if row else None
 
 
+def prefetch_genome_and_strain_rows(
+    headers: Dict[str, str],
+    genome_names: Sequence[str],
+    genome_columns: Sequence[str],
+    column_cache: Dict[str, List[str]],
+) -> None:
+    """Look up every genome's row, then every strain's rows, one concurrent level at a time."""
+    prefetch_first_rows(headers, [genome_row_query(name, genome_columns) for name in genome_names])
+    strain_names: Set[str] = set()
+    for name in genome_names:
+        genome_row = select_first_row(headers, *genome_row_query(name, genome_columns))
+        if genome_row and genome_row.get("sdt_strain_name"):
+            strain_names.add(genome_row["sdt_strain_name"])
+    queries: List[FirstRowQuery] = []
+    for strain_name in sorted(strain_names):
+        id_query = strain_id_query(headers, strain_name, column_cache)
+        if id_query is not None:
+            queries.append(id_query)
+        queries.append(strain_info_query(headers, strain_name, column_cache))
+    prefetch_first_rows(headers, queries)
+
+
 def load_biosample_template_workbook(output_dir: str) -> Tuple[Path, Any, int, Dict[str, int]]:
     candidates = list(BIOSAMPLE_TEMPLATE_CANDIDATES)
     candidates.extend(
@@ -4653,14 +4781,12 @@ def process_genomes_for_submission(
     genome_data: List[Dict[str, Any]] = []
     warnings: List[str] = []
 
+    log_info(f"Looking up genome and strain rows for {len(genome_names)} genome(s)")
+    prefetch_genome_and_strain_rows(headers, genome_names, genome_desired, column_cache)
+
     for idx, genome_name in enumerate(genome_names, start=1):
         log_info(f"[{idx}/{len(genome_names)}] Processing genome {genome_name}")
-        genome_row = select_first_row(
-            headers,
-            "sdt_genome",
-            [{"column": "sdt_genome_name", "operator": "=", "value": genome_name}],
-            genome_desired,
-        )
+        genome_row = select_first_row(headers, *genome_row_query(genome_name, genome_desired))
         if not genome_row:
             warnings.append(f"Genome {genome_name} not found in sdt_genome table")
             continue
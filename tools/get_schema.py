@@ -2,18 +2,21 @@ import argparse
 import json
 import os
 import sys
-import time
+from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import requests
 
-DEFAULT_BASE_URL = "https://hub.berdl.kbase.us/apis/mcp"
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from tools import berdl_client  # noqa: E402
+from tools.berdl_client import DEFAULT_BASE_URL  # noqa: E402
+
 BASE_URL = os.environ.get("BERDL_BASE_URL", DEFAULT_BASE_URL)
 DB_NAME = "enigma_coral"
 OUTPUT_PATH = os.path.join("schema", "enigma_coral_schema.md")
-REQUEST_TIMEOUT = 120
-REQUEST_RETRIES = 3
-REQUEST_RETRY_DELAY = 2
 DEBUG = os.environ.get("BERDL_DEBUG", "").lower() in {"1", "true", "yes"}
 SAMPLE_ROWS = 5
 SCHEMA_MARKDOWN_PATHS = [
@@ -25,39 +28,13 @@ SCHEMA_MARKDOWN_PATHS = [
 
 
 def post_json(path: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Any:
-    url = f"{BASE_URL}{path}"
-    last_error: Optional[Exception] = None
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            if DEBUG:
-                print(
-                    f"[debug] POST {url} attempt={attempt + 1}/{REQUEST_RETRIES} "
-                    f"payload_keys={list(payload.keys())}",
-                    file=sys.stderr,
-                )
-            resp = requests.post(url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
-            resp.raise_for_status()
-            data = resp.json()
-            if DEBUG:
-                print(
-                    f"[debug] {path} keys={list(data.keys()) if isinstance(data, dict) else type(data)}",
-                    file=sys.stderr,
-                )
-            return data
-        except (requests.Timeout, requests.ConnectionError, requests.HTTPError) as exc:
-            last_error = exc
-            if DEBUG:
-                print(
-                    f"[debug] request error on {path}: {type(exc).__name__} ({exc})",
-                    file=sys.stderr,
-                )
-            if attempt < REQUEST_RETRIES - 1:
-                time.sleep(REQUEST_RETRY_DELAY)
-            else:
-                raise
-    if last_error is not None:
-        raise last_error
-    raise RuntimeError(f"Request failed for {url}")
+    data = berdl_client.post_json(path, payload, headers, base_url=BASE_URL)
+    if DEBUG:
+        print(
+            f"[debug] {path} keys={list(data.keys()) if isinstance(data, dict) else type(data)}",
+            file=sys.stderr,
+        )
+    return data
 
 
 def try_db_structure(headers: Dict[str, str]) -> Optional[List[Dict[str, Any]]]:
@@ -363,6 +340,7 @@ def main() -> int:
     BASE_URL = args.base_url
     if args.debug:
         DEBUG = True
+    berdl_client.set_debug(DEBUG)
     if DEBUG:
         print(f"[debug] base_url={BASE_URL}", file=sys.stderr)
     output_path = OUTPUT_PATH
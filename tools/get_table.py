@@ -2,18 +2,19 @@ import argparse
 import json
 import os
 import sys
-import time
+from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-import requests
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from tools import berdl_client  # noqa: E402
+from tools.berdl_client import DEFAULT_BASE_URL  # noqa: E402
 
-DEFAULT_BASE_URL = "https://hub.berdl.kbase.us/apis/mcp"
 BASE_URL = os.environ.get("BERDL_BASE_URL", DEFAULT_BASE_URL)
 DB_NAME = os.environ.get("BERDL_DATABASE", "enigma_coral")
 OUTPUT_DIR = os.environ.get("BERDL_OUTPUT_DIR", "schema")
-REQUEST_TIMEOUT = 120
-REQUEST_RETRIES = 3
-REQUEST_RETRY_DELAY = 2
 DEBUG = os.environ.get("BERDL_DEBUG", "").lower() in {"1", "true", "yes"}
 SCHEMA_MARKDOWN_PATHS = [
     os.environ.get("BERDL_SCHEMA_MARKDOWN_PATH"),
@@ -24,28 +25,13 @@ SCHEMA_MARKDOWN_PATHS = [
 
 
 def post_json(path: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Any:
-    url = f"{BASE_URL}{path}"
-    last_error: Optional[Exception] = None
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
-            resp.raise_for_status()
-            data = resp.json()
-            if DEBUG:
-                print(
-                    f"[debug] {path} keys={list(data.keys()) if isinstance(data, dict) else type(data)}",
-                    file=sys.stderr,
-                )
-            return data
-        except (requests.Timeout, requests.ConnectionError, requests.HTTPError) as exc:
-            last_error = exc
-            if attempt < REQUEST_RETRIES - 1:
-                time.sleep(REQUEST_RETRY_DELAY)
-            else:
-                raise
-    if last_error is not None:
-        raise last_error
-    raise RuntimeError(f"Request failed for {url}")
+    data = berdl_client.post_json(path, payload, headers, base_url=BASE_URL)
+    if DEBUG:
+        print(
+            f"[debug] {path} keys={list(data.keys()) if isinstance(data, dict) else type(data)}",
+            file=sys.stderr,
+        )
+    return data
 
 
 def parse_schema_markdown(
@@ -247,6 +233,7 @@ def main() -> int:
     BASE_URL = args.base_url
     if args.debug:
         DEBUG = True
+    berdl_client.set_debug(DEBUG)
     token = os.environ.get("KB_AUTH_TOKEN")
     if not token:
         print("KB_AUTH_TOKEN is not set", file=sys.stderr)
@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from tools import berdl_client  # noqa: E402
+from tools.berdl_client import DEFAULT_BASE_URL  # noqa: E402
+
+DB_NAME = os.environ.get("BERDL_DATABASE", "enigma_coral")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Drop cached BERDL responses of tables whose data changed since the last run."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--manifest",
+        help="Sync manifest (manifests/current.json); tables are versioned by their table_sha256.",
+    )
+    source.add_argument(
+        "--probe-counts",
+        action="store_true",
+        help="Version the cached tables by their live BERDL row counts (requires KB_AUTH_TOKEN).",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=os.environ.get("BERDL_BASE_URL", DEFAULT_BASE_URL),
+        help=f"MCP base URL for --probe-counts (default: {DEFAULT_BASE_URL})",
+    )
+    parser.add_argument("--database", default=DB_NAME, help=f"Database for --probe-counts (default: {DB_NAME})")
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Enable verbose debugging, including BERDL API calls.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.debug:
+        berdl_client.set_debug(True)
+    cache = berdl_client.cache_from_env()
+    if not isinstance(cache, berdl_client.SqliteCache):
+        print("BERDL cache is disabled; nothing to invalidate", file=sys.stderr)
+        return 0
+
+    if args.manifest:
+        versions = berdl_client.manifest_table_versions(args.manifest)
+    else:
+        token = os.environ.get("KB_AUTH_TOKEN")
+        if not token:
+            print("KB_AUTH_TOKEN is not set", file=sys.stderr)
+            return 2
+        # Counts are read live, not from the cache being checked
+        client = berdl_client.BerdlClient(args.base_url, cache=berdl_client.NullCache())
+        try:
+            versions = berdl_client.probe_table_versions(
+                client, {"Authorization": f"Bearer {token}"}, args.database, cache.cached_tables()
+            )
+        finally:
+            client.close()
+
+    changed = cache.apply_table_versions(versions)
+    print(f"{len(changed)} of {len(versions)} tables changed")
+    for table in changed:
+        print(table)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,14 +7,18 @@ import argparse
 import csv
 import json
 import os
+import sys
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Iterable
 
 import requests
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
-DEFAULT_BASE_URL = "https://hub.berdl.kbase.us/apis/mcp"
+from tools.berdl_client import DEFAULT_BASE_URL, BerdlClient, NullCache  # noqa: E402
 
 
 def parse_args() -> argparse.Namespace:
@@ -96,8 +100,19 @@ def compare_live_rows(
     return results
 
 
+def live_client(args: argparse.Namespace) -> BerdlClient:
+    """Uncached client: this recheck must see the live tables."""
+    return BerdlClient(
+        args.base_url.rstrip("/"),
+        timeout=args.timeout,
+        cache=NullCache(),
+        proxies={"https": args.https_proxy} if args.https_proxy else None,
+    )
+
+
 def post_select(
     *,
+    client: BerdlClient,
     args: argparse.Namespace,
     token: str,
     table: str,
@@ -114,19 +129,13 @@ def post_select(
         "limit": 1000,
         "offset": 0,
     }
-    response = requests.post(
-        f"{args.base_url.rstrip('/')}/delta/tables/select",
-        json=payload,
-        headers={"Authorization": f"Bearer {token}"},
-        proxies={"https": args.https_proxy} if args.https_proxy else None,
-        timeout=args.timeout,
-    )
-    if not response.ok:
+    try:
+        body = client.post_json("/delta/tables/select", payload, {"Authorization": f"Bearer {token}"})
+    except requests.HTTPError as exc:
         raise RuntimeError(
-            f"BERDL {table} select failed with HTTP {response.status_code}: "
-            f"{response.text[:2000]}"
-        )
-    body = response.json()
+            f"BERDL {table} select failed with HTTP {exc.response.status_code}: "
+            f"{exc.response.text[:2000]}"
+        ) from exc
     rows = body.get("data") if isinstance(body, dict) else None
     if not isinstance(rows, list):
         raise ValueError(f"Unexpected BERDL {table} response: {json.dumps(body)[:500]}")
@@ -156,7 +165,9 @@ def main() -> int:
     filters = [
         {"column": "sdt_strain_name", "operator": "IN", "values": names}
     ]
+    client = live_client(args)
     live_rows = post_select(
+        client=client,
         args=args,
         token=token,
         table="sdt_strain",
@@ -165,6 +176,7 @@ def main() -> int:
         order_column="sdt_strain_name",
     )
     live_genomes = post_select(
+        client=client,
         args=args,
         token=token,
         table="sdt_genome",
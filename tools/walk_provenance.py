@@ -1,127 +1,27 @@
 import argparse
-import hashlib
-import json
+import asyncio
 import os
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import requests
 
-DEFAULT_BASE_URL = "https://hub.berdl.kbase.us/apis/mcp"
-BASE_URL = os.environ.get("BERDL_BASE_URL", DEFAULT_BASE_URL)
-DB_NAME = os.environ.get("BERDL_DATABASE", "enigma_coral")
-REQUEST_TIMEOUT = 180
-REQUEST_RETRIES = 5
-REQUEST_RETRY_DELAY = 4
-_DEBUG = os.environ.get("BERDL_DEBUG", "").lower() in {"1", "true", "yes"}
-CACHE_DISABLED = os.environ.get("BERDL_CACHE_DISABLE", "").lower() in {"1", "true", "yes"}
-CACHE_DIR = os.environ.get("BERDL_CACHE_DIR", os.path.join(os.getcwd(), ".berdl_cache"))
-_CACHE_TTL = os.environ.get("BERDL_CACHE_TTL_SECONDS")
-CACHE_TTL_SECONDS = int(_CACHE_TTL) if _CACHE_TTL and _CACHE_TTL.isdigit() else None
-
-
-def set_debug(enabled: bool) -> None:
-    global _DEBUG
-    _DEBUG = enabled
-
-
-def debug(message: str) -> None:
-    if _DEBUG:
-        print(f"[debug] {message}", file=sys.stderr)
-
-
-def _summarize_payload(payload: Dict[str, Any]) -> str:
-    parts: List[str] = []
-    for key in ["database", "table", "limit", "offset"]:
-        if key in payload:
-            parts.append(f"{key}={payload[key]}")
-    columns = payload.get("columns")
-    if isinstance(columns, list):
-        parts.append(f"columns={len(columns)}")
-    filters = payload.get("filters")
-    if isinstance(filters, list):
-        parts.append(f"filters={len(filters)}")
-    order_by = payload.get("order_by")
-    if isinstance(order_by, list):
-        parts.append(f"order_by={len(order_by)}")
-    return ", ".join(parts)
-
-
-def _cache_path(url: str, payload: Dict[str, Any]) -> str:
-    raw = json.dumps({"url": url, "payload": payload}, sort_keys=True, default=str).encode("utf-8")
-    digest = hashlib.sha256(raw).hexdigest()
-    return os.path.join(CACHE_DIR, f"{digest}.json")
-
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
-def _build_cache_entry(url: str, payload: Dict[str, Any], response: Any) -> Dict[str, Any]:
-    return {"query": {"url": url, "payload": payload}, "response": response}
+from tools import berdl_client  # noqa: E402
+from tools.berdl_async import AsyncBerdlClient  # noqa: E402
+from tools.berdl_client import DEFAULT_BASE_URL, debug, debug_enabled, set_debug  # noqa: E402
 
-
-def _load_cache(path: str, url: Optional[str] = None, payload: Optional[Dict[str, Any]] = None) -> Optional[Any]:
-    try:
-        if CACHE_TTL_SECONDS is not None:
-            age = time.time() - os.path.getmtime(path)
-            if age > CACHE_TTL_SECONDS:
-                return None
-        with open(path, "r", encoding="utf-8") as handle:
-            cached = json.load(handle)
-        if isinstance(cached, dict) and "query" in cached and "response" in cached:
-            return cached["response"]
-        if url is not None and payload is not None:
-            _store_cache(path, _build_cache_entry(url, payload, cached))
-        return cached
-    except (FileNotFoundError, json.JSONDecodeError, OSError):
-        return None
-
-
-def _store_cache(path: str, data: Any) -> None:
-    try:
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        tmp_path = f"{path}.tmp"
-        with open(tmp_path, "w", encoding="utf-8") as handle:
-            json.dump(data, handle)
-        os.replace(tmp_path, path)
-    except OSError:
-        return
+BASE_URL = os.environ.get("BERDL_BASE_URL", DEFAULT_BASE_URL)
+DB_NAME = os.environ.get("BERDL_DATABASE", "enigma_coral")
 
 
 def post_json(path: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Any:
-    url = f"{BASE_URL}{path}"
-    cache_path = None
-    if not CACHE_DISABLED:
-        cache_path = _cache_path(url, payload)
-        cached = _load_cache(cache_path, url, payload)
-        if cached is not None:
-            debug(f"BERDL cache hit {path} ({_summarize_payload(payload)})")
-            return cached
-    last_error: Optional[Exception] = None
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            debug(f"BERDL POST {path} ({_summarize_payload(payload)}) attempt={attempt + 1}")
-            resp = requests.post(url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
-            resp.raise_for_status()
-            data = resp.json()
-            if cache_path is not None:
-                _store_cache(cache_path, _build_cache_entry(url, payload, data))
-            return data
-        except (requests.Timeout, requests.ConnectionError, requests.HTTPError) as exc:
-            if isinstance(exc, requests.HTTPError):
-                resp = exc.response
-                if resp is not None and resp.status_code in {408, 504}:
-                    print(
-                        "[info] BERDL request timed out. "
-                        f"path={path} payload={json.dumps(payload, sort_keys=True, default=str)}",
-                        file=sys.stderr,
-                    )
-            last_error = exc
-            if attempt < REQUEST_RETRIES - 1:
-                time.sleep(REQUEST_RETRY_DELAY)
-            else:
-                raise
-    if last_error is not None:
-        raise last_error
-    raise RuntimeError(f"Request failed for {url}")
+    return berdl_client.post_json(path, payload, headers, base_url=BASE_URL)
 
 
 def list_tables(headers: Dict[str, str]) -> List[str]:
@@ -150,15 +50,23 @@ def count_table_rows(headers: Dict[str, str], table: str) -> int:
     raise ValueError(f"Unexpected count response for {table}: {data}")
 
 
-def select_rows(
-    headers: Dict[str, str],
+# Learned from the first /tables/select response: True when the server returns
+# pagination.next_cursor (keyset pagination), False for offset-only servers.
+CURSOR_PAGINATION: Optional[bool] = None
+# Pages select_all_rows fetches at once when the first page reports total_count
+PAGE_CONCURRENCY = int(os.environ.get("BERDL_PAGE_CONCURRENCY", "4"))
+
+
+def _select_payload(
     table: str,
-    columns: Optional[Sequence[str]] = None,
-    filters: Optional[List[Dict[str, Any]]] = None,
-    order_by: Optional[List[Dict[str, str]]] = None,
-    limit: int = 1000,
-    offset: int = 0,
-) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    columns: Optional[Sequence[str]],
+    filters: Optional[List[Dict[str, Any]]],
+    order_by: Optional[List[Dict[str, str]]],
+    limit: int,
+    offset: int,
+    cursor: Optional[str],
+    pagination_mode: Optional[str],
+) -> Dict[str, Any]:
     payload: Dict[str, Any] = {"database": DB_NAME, "table": table, "limit": limit, "offset": offset}
     if columns:
         payload["columns"] = [{"column": col} for col in columns]
@@ -166,14 +74,83 @@ def select_rows(
         payload["filters"] = filters
     if order_by:
         payload["order_by"] = order_by
-    data = post_json("/delta/tables/select", payload, headers)
+    if cursor:
+        payload["cursor"] = cursor
+        payload["offset"] = 0
+    if pagination_mode:
+        payload["pagination_mode"] = pagination_mode
+    return payload
+
+
+def _select_result(table: str, data: Any) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    global CURSOR_PAGINATION
     rows = data.get("data") if isinstance(data, dict) else None
     pagination = data.get("pagination") if isinstance(data, dict) else None
     if not isinstance(rows, list) or not isinstance(pagination, dict):
         raise ValueError(f"Unexpected select response for {table}: {data}")
+    if CURSOR_PAGINATION is None:
+        CURSOR_PAGINATION = "next_cursor" in pagination
     return rows, pagination
 
 
+def select_rows(
+    headers: Dict[str, str],
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    order_by: Optional[List[Dict[str, str]]] = None,
+    limit: int = 1000,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    pagination_mode: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    payload = _select_payload(table, columns, filters, order_by, limit, offset, cursor, pagination_mode)
+    return _select_result(table, post_json("/delta/tables/select", payload, headers))
+
+
+def _select_all_query(
+    columns: Optional[Sequence[str]],
+    filters: Optional[List[Dict[str, Any]]],
+    order_by: Optional[List[Dict[str, str]]],
+) -> Dict[str, Any]:
+    # Only ask for cursors once the server has shown it understands them.
+    return {
+        "columns": columns,
+        "filters": filters,
+        "order_by": order_by,
+        "pagination_mode": "cursor" if CURSOR_PAGINATION else None,
+    }
+
+
+def _remaining_offsets(batch: List[Dict[str, Any]], pagination: Dict[str, Any]) -> Sequence[int]:
+    """Offsets of the pages after the first, when it reports an exact total_count."""
+    total = pagination.get("total_count")
+    if not batch or not pagination.get("has_more") or not isinstance(total, int):
+        return []
+    if pagination.get("total_count_estimated"):
+        return []
+    # Step by the rows actually returned, in case the server caps the page size
+    return range(len(batch), total, len(batch))
+
+
+def _select_pages(
+    headers: Dict[str, str],
+    table: str,
+    offsets: Sequence[int],
+    page_size: int,
+    concurrency: int,
+    **query: Any,
+) -> List[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """Pages at ``offsets``, fetched with up to ``concurrency`` requests in flight, in offset order."""
+
+    def fetch(offset: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        # Each page is its own request, so a transient failure retries that page only
+        return select_rows(headers, table, limit=page_size, offset=offset, **query)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(offsets)))) as pool:
+        return list(pool.map(fetch, offsets))
+
+
 def select_all_rows(
     headers: Dict[str, str],
     table: str,
@@ -181,26 +158,220 @@ def select_all_rows(
     filters: Optional[List[Dict[str, Any]]] = None,
     order_by: Optional[List[Dict[str, str]]] = None,
     limit: int = 1000,
+    concurrency: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    offset = 0
-    while True:
+    """Every matching row, in server order.
+
+    Once the first page reports an exact total_count, the remaining offsets are
+    fetched ``concurrency`` pages at a time (default PAGE_CONCURRENCY). Rows past
+    that count, or all pages when there is none, are read one page after another.
+    """
+    workers = PAGE_CONCURRENCY if concurrency is None else concurrency
+    query = _select_all_query(columns, filters, order_by)
+    batch, pagination = select_rows(headers, table, limit=limit, offset=0, **query)
+    rows: List[Dict[str, Any]] = list(batch)
+    offsets = _remaining_offsets(batch, pagination)
+    if workers > 1 and offsets:
+        for batch, pagination in _select_pages(headers, table, offsets, len(batch), workers, **query):
+            rows.extend(batch)
+    while pagination.get("has_more") and batch:
         batch, pagination = select_rows(
             headers,
             table,
-            columns=columns,
-            filters=filters,
-            order_by=order_by,
             limit=limit,
-            offset=offset,
+            offset=len(rows),
+            cursor=pagination.get("next_cursor"),
+            **query,
         )
         rows.extend(batch)
-        if not pagination.get("has_more") or not batch:
-            break
-        offset += len(batch)
     return rows
 
 
+async def select_rows_async(
+    client: AsyncBerdlClient,
+    headers: Dict[str, str],
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    order_by: Optional[List[Dict[str, str]]] = None,
+    limit: int = 1000,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    pagination_mode: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """select_rows through an AsyncBerdlClient (which sets the base URL)."""
+    payload = _select_payload(table, columns, filters, order_by, limit, offset, cursor, pagination_mode)
+    return _select_result(table, await client.post_json("/delta/tables/select", payload, headers))
+
+
+async def select_all_rows_async(
+    client: AsyncBerdlClient,
+    headers: Dict[str, str],
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    order_by: Optional[List[Dict[str, str]]] = None,
+    limit: int = 1000,
+) -> List[Dict[str, Any]]:
+    """select_all_rows through an AsyncBerdlClient; pages after the first are bounded by its concurrency."""
+    query = _select_all_query(columns, filters, order_by)
+    batch, pagination = await select_rows_async(client, headers, table, limit=limit, offset=0, **query)
+    rows: List[Dict[str, Any]] = list(batch)
+    offsets = _remaining_offsets(batch, pagination)
+    if offsets:
+        page_size = len(batch)
+        pages = await asyncio.gather(
+            *(
+                select_rows_async(client, headers, table, limit=page_size, offset=offset, **query)
+                for offset in offsets
+            )
+        )
+        for batch, pagination in pages:
+            rows.extend(batch)
+    while pagination.get("has_more") and batch:
+        batch, pagination = await select_rows_async(
+            client,
+            headers,
+            table,
+            limit=limit,
+            offset=len(rows),
+            cursor=pagination.get("next_cursor"),
+            **query,
+        )
+        rows.extend(batch)
+    return rows
+
+
+# Learned from the first /tables/lookup call: False when the server has no such
+# endpoint (BERDL), in which case lookups fall back to IN filters on /tables/select.
+LOOKUP_SUPPORTED: Optional[bool] = None
+LOOKUP_BATCH_SIZE = 5000
+SELECT_IN_BATCH_SIZE = 500
+
+
+def _is_missing_endpoint(exc: requests.HTTPError) -> bool:
+    resp = exc.response
+    if resp is None or resp.status_code not in {404, 405}:
+        return False
+    try:
+        detail = resp.json().get("detail")
+    except ValueError:
+        return True
+    # A missing table is also a 404, but with a specific message
+    return detail in {"Not Found", "Method Not Allowed"}
+
+
+def _lookup_via_select(
+    headers: Dict[str, str],
+    table: str,
+    key_column: str,
+    keys: Sequence[Any],
+    columns: Optional[Sequence[str]],
+) -> Dict[str, List[Dict[str, Any]]]:
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    select_columns = list(columns) + [key_column] if columns and key_column not in columns else columns
+    for start in range(0, len(keys), SELECT_IN_BATCH_SIZE):
+        chunk = list(keys[start : start + SELECT_IN_BATCH_SIZE])
+        filters = [{"column": key_column, "operator": "IN", "values": chunk}]
+        for row in select_all_rows(headers, table, columns=select_columns, filters=filters):
+            key = str(row.get(key_column))
+            if columns and key_column not in columns:
+                row = {col: value for col, value in row.items() if col != key_column}
+            results.setdefault(key, []).append(row)
+    return results
+
+
+def lookup_rows(
+    headers: Dict[str, str],
+    table: str,
+    key_column: str,
+    keys: Iterable[Any],
+    columns: Optional[Sequence[str]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Rows whose key_column matches any of keys, grouped by str(key); unmatched keys are absent."""
+    global LOOKUP_SUPPORTED
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+    if LOOKUP_SUPPORTED is False:
+        return _lookup_via_select(headers, table, key_column, unique_keys, columns)
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for start in range(0, len(unique_keys), LOOKUP_BATCH_SIZE):
+        payload: Dict[str, Any] = {
+            "database": DB_NAME,
+            "table": table,
+            "key_column": key_column,
+            "keys": unique_keys[start : start + LOOKUP_BATCH_SIZE],
+        }
+        if columns:
+            payload["columns"] = list(columns)
+        try:
+            data = post_json("/delta/tables/lookup", payload, headers)
+        except requests.HTTPError as exc:
+            if LOOKUP_SUPPORTED is None and _is_missing_endpoint(exc):
+                debug("BERDL has no /delta/tables/lookup; using IN filters on /delta/tables/select")
+                LOOKUP_SUPPORTED = False
+                return _lookup_via_select(headers, table, key_column, unique_keys, columns)
+            raise
+        batch = data.get("results") if isinstance(data, dict) else None
+        if not isinstance(batch, dict):
+            raise ValueError(f"Unexpected lookup response for {table}: {data}")
+        LOOKUP_SUPPORTED = True
+        for key, rows in batch.items():
+            results.setdefault(key, []).extend(rows)
+    return results
+
+
+# Learned from the first /tables/stats call; BERDL has no such endpoint
+STATS_SUPPORTED: Optional[bool] = None
+
+
+def table_stats(headers: Dict[str, str], table: str) -> Optional[Dict[str, Any]]:
+    """Precomputed row count and column statistics, or None when the server cannot provide them."""
+    global STATS_SUPPORTED
+    if STATS_SUPPORTED is False:
+        return None
+    try:
+        data = post_json("/delta/tables/stats", {"database": DB_NAME, "table": table}, headers)
+    except requests.HTTPError as exc:
+        if STATS_SUPPORTED is None and _is_missing_endpoint(exc):
+            debug("BERDL has no /delta/tables/stats; using count, schema and sample")
+            STATS_SUPPORTED = False
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("columns"), list):
+        return None
+    STATS_SUPPORTED = True
+    return data
+
+
+# Learned from the first /delta/search call; BERDL has no such endpoint
+SEARCH_SUPPORTED: Optional[bool] = None
+
+
+def search_names(
+    headers: Dict[str, str], query: str, table: Optional[str] = None, limit: int = 5
+) -> List[Dict[str, Any]]:
+    """Closest object names from the server's search index, or [] when the server has none."""
+    global SEARCH_SUPPORTED
+    if SEARCH_SUPPORTED is False:
+        return []
+    payload: Dict[str, Any] = {"database": DB_NAME, "query": query, "kinds": ["object"], "limit": limit}
+    if table:
+        payload["tables"] = [table]
+    try:
+        data = post_json("/delta/search", payload, headers)
+    except requests.HTTPError as exc:
+        if SEARCH_SUPPORTED is None and _is_missing_endpoint(exc):
+            debug("BERDL has no /delta/search; name suggestions disabled")
+            SEARCH_SUPPORTED = False
+        return []
+    hits = data.get("hits") if isinstance(data, dict) else None
+    if not isinstance(hits, list):
+        return []
+    SEARCH_SUPPORTED = True
+    return hits
+
+
 def discover_tables(headers: Dict[str, str]) -> List[str]:
     all_tables = list_tables(headers)
     matching_tables: List[str] = []
@@ -301,6 +472,71 @@ def load_process_cache(
     return _PROCESS_CACHE
 
 
+# Learned from the first /delta/provenance call; BERDL has no such endpoint
+PROVENANCE_SUPPORTED: Optional[bool] = None
+PROVENANCE_MAX_DEPTH = 200
+
+
+def fetch_lineage(
+    headers: Dict[str, str], token: str, direction: str
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """out_lookup covering the object's lineage from one server-side walk.
+
+    Returns None when the server has no provenance endpoint or the walk was cut
+    short, so the caller falls back to the full sys_process table.
+    """
+    global PROVENANCE_SUPPORTED
+    table_name, obj_id = parse_token(token)
+    if PROVENANCE_SUPPORTED is False or not table_name or not obj_id:
+        return None
+    payload = {"database": DB_NAME, "table": table_name, "id": obj_id, "max_depth": PROVENANCE_MAX_DEPTH}
+    try:
+        data = post_json(f"/delta/provenance/{direction}", payload, headers)
+    except requests.HTTPError as exc:
+        if PROVENANCE_SUPPORTED is None and _is_missing_endpoint(exc):
+            debug("BERDL has no /delta/provenance; loading all of sys_process")
+            PROVENANCE_SUPPORTED = False
+        return None
+    processes = data.get("processes") if isinstance(data, dict) else None
+    if not isinstance(processes, list):
+        return None
+    PROVENANCE_SUPPORTED = True
+    if data.get("depth_limited") or data.get("truncated"):
+        debug(f"server-side {direction} walk from {token} was cut short; loading all of sys_process")
+        return None
+    debug(f"server-side {direction} walk from {token}: {len(processes)} process(es)")
+    out_lookup: Dict[str, List[Dict[str, Any]]] = {}
+    for proc in processes:
+        for output_token in proc.get("outputs") or []:
+            out_lookup.setdefault(output_token, []).append(
+                {
+                    "id": proc.get("id"),
+                    "process_term_name": proc.get("process_term_name"),
+                    "person_term_name": proc.get("person_term_name"),
+                    "protocol": proc.get("protocol"),
+                    "date_end": proc.get("date_end"),
+                    "input_objs": list(proc.get("inputs") or []),
+                }
+            )
+    return out_lookup
+
+
+def lineage_lookup(
+    headers: Dict[str, str],
+    resolver: "NameResolver",
+    discovered_tables: Sequence[str],
+    table_name: str,
+    object_name: str,
+    direction: str = "upstream",
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Upstream out_lookup (or downstream lookup) that covers the named object's lineage."""
+    token = object_token_from_name(resolver, table_name, object_name)
+    out_lookup = fetch_lineage(headers, token, direction)
+    if out_lookup is None:
+        out_lookup = load_process_cache(headers, discovered_tables).out_lookup
+    return build_downstream_lookup(out_lookup) if direction == "downstream" else out_lookup
+
+
 class NameResolver:
     def __init__(self, headers: Dict[str, str]) -> None:
         self.headers = headers
@@ -332,13 +568,44 @@ class NameResolver:
         filters = [{"column": name_col, "operator": "=", "value": object_name}]
         rows = select_all_rows(self.headers, table, columns=[id_col], filters=filters)
         if not rows:
-            raise ValueError(f"Object name '{object_name}' not found in table '{table}'.")
+            suggestions = [str(hit.get("name")) for hit in search_names(self.headers, object_name, table)]
+            hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+            raise ValueError(f"Object name '{object_name}' not found in table '{table}'.{hint}")
         object_id = rows[0].get(id_col)
         if object_id is None:
             raise ValueError(f"Object name '{object_name}' returned no id in table '{table}'.")
         self.name_to_id[cache_key] = object_id
         return object_id
 
+    def prefetch_ids(self, table: str, object_names: Iterable[str]) -> None:
+        """Resolve many names in one lookup so later resolve_name_to_id calls hit the cache."""
+        id_col, name_col = self._load_table_meta(table)
+        pending = [name for name in object_names if (table, name) not in self.name_to_id]
+        for name, rows in lookup_rows(self.headers, table, name_col, pending, [id_col]).items():
+            if rows and rows[0].get(id_col) is not None:
+                self.name_to_id[(table, name)] = rows[0][id_col]
+
+    def prefetch_names(self, table: str, object_ids: Iterable[str]) -> None:
+        """Resolve many ids in one lookup so later resolve_id_to_name calls hit the cache."""
+        id_col, name_col = self._load_table_meta(table)
+        pending = [obj_id for obj_id in object_ids if (table, obj_id) not in self.id_to_name]
+        for obj_id, rows in lookup_rows(self.headers, table, id_col, pending, [name_col]).items():
+            if rows and rows[0].get(name_col) is not None:
+                self.id_to_name[(table, obj_id)] = rows[0][name_col]
+
+    def prefetch_tokens(self, tokens: Iterable[str]) -> None:
+        by_table: Dict[str, List[str]] = {}
+        for token in tokens:
+            table_name, obj_id = parse_token(token)
+            if table_name and obj_id:
+                by_table.setdefault(table_name, []).append(obj_id)
+        for table_name, ids in by_table.items():
+            try:
+                self.prefetch_names(table_name, ids)
+            except ValueError:
+                # Table without *_name column: resolve_name leaves these tokens as-is
+                continue
+
     def resolve_id_to_name(self, table: str, object_id: str) -> Optional[str]:
         cache_key = (table, object_id)
         cached = self.id_to_name.get(cache_key)
@@ -433,6 +700,26 @@ def build_provenance_lookup(
     return out_lookup
 
 
+def reachable_tokens(
+    start: str,
+    lookup: Dict[str, List[Dict[str, Any]]],
+    link_field: str,
+) -> List[str]:
+    """Tokens reachable from start by following link_field ("input_objs" upstream, "output_obj" downstream)."""
+    seen = {start}
+    order = [start]
+    stack = [start]
+    while stack:
+        for proc in lookup.get(stack.pop(), []):
+            linked = proc.get(link_field)
+            for token in linked if isinstance(linked, list) else [linked]:
+                if token and token not in seen:
+                    seen.add(token)
+                    order.append(token)
+                    stack.append(token)
+    return order
+
+
 def walk_provenance(
     output_obj: str,
     out_lookup: Dict[str, List[Dict[str, Any]]],
@@ -447,7 +734,7 @@ def walk_provenance(
     if proc_list is None:
         print(f"{indent}{output_obj}  <-- (no upstream process)")
         return
-    if _DEBUG and (depth == 0 or len(proc_list) > 1):
+    if debug_enabled() and (depth == 0 or len(proc_list) > 1):
         debug(f"object {output_obj} has {len(proc_list)} producing process(es)")
     processes_traversed = 0
     for proc_idx, proc in enumerate(proc_list):
@@ -477,7 +764,7 @@ def walk_provenance(
                 walk_provenance(inp, out_lookup, resolver, depth + 2, visited)
         else:
             print(f"{indent}  (no inputs)")
-    if _DEBUG and len(proc_list) > 1 and processes_traversed < len(proc_list):
+    if debug_enabled() and len(proc_list) > 1 and processes_traversed < len(proc_list):
         debug(
             f"only {processes_traversed} of {len(proc_list)} processes were traversed for {output_obj}"
         )
@@ -491,6 +778,7 @@ def walk_provenance_by_name(
 ) -> None:
     token = object_token_from_name(resolver, table_name, object_name)
     print(f"{object_name}  ({token})")
+    resolver.prefetch_tokens(reachable_tokens(token, out_lookup, "input_objs"))
     walk_provenance(token, out_lookup, resolver, depth=1)
 
 
@@ -528,7 +816,7 @@ def walk_downstream_provenance(
     if proc_list is None:
         print(f"{indent}{input_obj}  <-- (no downstream process)")
         return
-    if _DEBUG and (depth == 0 or len(proc_list) > 1):
+    if debug_enabled() and (depth == 0 or len(proc_list) > 1):
         debug(f"object {input_obj} has {len(proc_list)} downstream process(es)")
     processes_traversed = 0
     for proc_idx, proc in enumerate(proc_list):
@@ -557,7 +845,7 @@ def walk_downstream_provenance(
             walk_downstream_provenance(output_obj, downstream_lookup, resolver, depth + 2, visited)
         else:
             print(f"{indent}  (no outputs)")
-    if _DEBUG and len(proc_list) > 1 and processes_traversed < len(proc_list):
+    if debug_enabled() and len(proc_list) > 1 and processes_traversed < len(proc_list):
         debug(
             f"only {processes_traversed} of {len(proc_list)} processes were traversed for {input_obj}"
         )
@@ -571,6 +859,7 @@ def walk_downstream_provenance_by_name(
 ) -> None:
     token = object_token_from_name(resolver, table_name, object_name)
     print(f"{object_name}  ({token})")
+    resolver.prefetch_tokens(reachable_tokens(token, downstream_lookup, "output_obj"))
     walk_downstream_provenance(token, downstream_lookup, resolver, depth=1)
 
 
@@ -718,29 +1007,38 @@ def list_all_processes_for_object(
 def show_available_tables(headers: Dict[str, str], discovered_tables: Sequence[str]) -> None:
     print("Available tables with name mappings:")
     for table in sorted(discovered_tables):
-        try:
-            columns = get_table_schema(headers, table)
-        except ValueError as exc:
-            debug(f"schema error for {table}: {exc}")
-            continue
         id_col = f"{table}_id"
         name_col = f"{table}_name"
-        if id_col not in columns or name_col not in columns:
-            continue
-        try:
-            count = count_table_rows(headers, table)
-        except ValueError as exc:
-            debug(f"count error for {table}: {exc}")
-            count = -1
-        sample_payload = {"database": DB_NAME, "table": table, "limit": 3, "columns": [name_col]}
-        data = post_json("/delta/tables/sample", sample_payload, headers)
-        sample = data.get("sample") if isinstance(data, dict) else None
-        sample_names = []
-        if isinstance(sample, list):
-            for row in sample:
-                name = row.get(name_col)
-                if name:
-                    sample_names.append(str(name))
+        # One /tables/stats call replaces schema + count + sample where the server supports it
+        stats = table_stats(headers, table)
+        if stats is not None:
+            columns = {c.get("name"): c for c in stats["columns"]}
+            if id_col not in columns or name_col not in columns:
+                continue
+            count = int(stats.get("row_count", -1))
+            sample_names = [str(v) for v in columns[name_col].get("top_values") or [] if v][:3]
+        else:
+            try:
+                schema = get_table_schema(headers, table)
+            except ValueError as exc:
+                debug(f"schema error for {table}: {exc}")
+                continue
+            if id_col not in schema or name_col not in schema:
+                continue
+            try:
+                count = count_table_rows(headers, table)
+            except ValueError as exc:
+                debug(f"count error for {table}: {exc}")
+                count = -1
+            sample_payload = {"database": DB_NAME, "table": table, "limit": 3, "columns": [name_col]}
+            data = post_json("/delta/tables/sample", sample_payload, headers)
+            sample = data.get("sample") if isinstance(data, dict) else None
+            sample_names = []
+            if isinstance(sample, list):
+                for row in sample:
+                    name = row.get(name_col)
+                    if name:
+                        sample_names.append(str(name))
         count_str = str(count) if count >= 0 else "unknown"
         print(f"  {table}: {count_str} objects")
         if sample_names:
@@ -791,6 +1089,12 @@ def parse_args() -> argparse.Namespace:
         metavar=("TABLE", "NAME"),
         help="List all processes for the object from the provenance lookup.",
     )
+    parser.add_argument(
+        "--page-concurrency",
+        type=int,
+        default=PAGE_CONCURRENCY,
+        help=f"Pages fetched in parallel when reading whole tables (default: {PAGE_CONCURRENCY}).",
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -801,8 +1105,9 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> int:
     args = parse_args()
-    global BASE_URL
+    global BASE_URL, PAGE_CONCURRENCY
     BASE_URL = args.base_url
+    PAGE_CONCURRENCY = max(1, args.page_concurrency)
     token = os.environ.get("KB_AUTH_TOKEN")
     if not token:
         print("KB_AUTH_TOKEN is not set", file=sys.stderr)
@@ -832,39 +1137,31 @@ def main() -> int:
     if args.show_tables:
         show_available_tables(headers, discovered_tables)
 
-    needs_process_data = any(
-        [
-            args.walk_provenance,
-            args.walk_downstream,
-            args.coassembly,
-            args.sys_process,
-            args.list_processes,
-        ]
-    )
-
+    # Lineage actions walk server-side where possible; only --sys-process needs every row
     process_rows: List[Dict[str, Any]] = []
-    out_lookup: Dict[str, List[Dict[str, Any]]] = {}
-    downstream_lookup: Dict[str, List[Dict[str, Any]]] = {}
     meta_columns: Dict[str, Optional[str]] = {}
-    if needs_process_data:
+    if args.sys_process:
         cache = load_process_cache(headers, discovered_tables)
         process_rows = cache.process_rows
-        out_lookup = cache.out_lookup
-        downstream_lookup = build_downstream_lookup(out_lookup)
         meta_columns = cache.meta_columns
 
     if args.walk_provenance:
         table_name, object_name = args.walk_provenance
+        out_lookup = lineage_lookup(headers, resolver, discovered_tables, table_name, object_name)
         walk_provenance_by_name(resolver, out_lookup, table_name, object_name)
 
     if args.walk_downstream:
         table_name, object_name = args.walk_downstream
+        downstream_lookup = lineage_lookup(
+            headers, resolver, discovered_tables, table_name, object_name, "downstream"
+        )
         walk_downstream_provenance_by_name(
             resolver, downstream_lookup, table_name, object_name
         )
 
     if args.coassembly:
         table_name, object_name = args.coassembly
+        out_lookup = lineage_lookup(headers, resolver, discovered_tables, table_name, object_name)
         result = has_coassembled_assembly_by_name(
             resolver, out_lookup, discovered_tables, table_name, object_name
         )
@@ -887,6 +1184,7 @@ def main() -> int:
 
     if args.list_processes:
         table_name, object_name = args.list_processes
+        out_lookup = lineage_lookup(headers, resolver, discovered_tables, table_name, object_name)
         list_all_processes_for_object(resolver, out_lookup, table_name, object_name)
 
     return 0